@@ -0,0 +1,246 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+import os
+import json
+import time
+import shutil
+import threading
+
+ARTIFACTS_DIR = "model_artifacts"
+
+# Caché de variantes optimizadas de cada modelo:
+#   model_artifacts/<modelo>/<revisión>/<backend>-<precisión>.pt  (+ .json con metadatos)
+# La revisión sale del registro de modelos; si el snapshot cambia, las
+# carpetas de revisiones anteriores se borran. torch se importa dentro de
+# cada función para que las rutas se puedan consultar sin él.
+#
+# Al construir una variante se compara contra el modelo fp32 en unas ventanas
+# de prueba fijas; el resultado queda en el .json y una variante que no pasa
+# la comprobación de paridad nunca se carga (se usa fp32).
+
+PARITY_WINDOWS = 6
+PARITY_SECONDS = 2.0
+PARITY_MAX_PROB_DIFF = 0.05 # Diferencia máxima de probabilidad por clase
+
+def accelerator_available():
+    import torch
+    return torch.cuda.is_available() or torch.backends.mps.is_available()
+
+def default_precision(device):
+    """int8 dinámico en CPU, fp16 en GPU."""
+    import torch
+    return "int8" if torch.device(device).type == "cpu" else "fp16"
+
+def freeze_parametrizations(model):
+    """
+    Fija los pesos parametrizados (weight_norm de pos_conv_embed) como tensores
+    normales: el módulo se puede serializar entero y no recalcula la norma en
+    cada pasada. El resultado numérico es el mismo.
+    """
+    from torch.nn.utils import parametrize
+    for module in model.modules():
+        if parametrize.is_parametrized(module):
+            for name in list(module.parametrizations.keys()):
+                parametrize.remove_parametrizations(module, name, leave_parametrized=True)
+            # weight_norm deja un hook local (no serializable) para checkpoints antiguos
+            for hook_id, hook in list(module._load_state_dict_pre_hooks.items()):
+                if "weight_norm" in getattr(hook, "__qualname__", "") or "weight_norm" in repr(hook):
+                    del module._load_state_dict_pre_hooks[hook_id]
+    return model
+
+def build_int8(model):
+    """Cuantización dinámica de las capas lineales (solo se ejecuta en CPU)."""
+    import torch
+    from torch.ao.quantization import quantize_dynamic
+    model = freeze_parametrizations(model.cpu().eval())
+    return quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def build_fp16(model):
+    # Copia: el modelo fp32 sigue haciendo falta como referencia de paridad
+    import copy
+    return copy.deepcopy(freeze_parametrizations(model.cpu().eval())).half()
+
+# precisión -> (constructor, ¿se puede usar en este equipo?)
+VARIANT_BUILDERS = {
+    "int8": (build_int8, lambda: True),
+    "fp16": (build_fp16, accelerator_available),
+}
+
+def cast_inputs_to_model(model):
+    """
+    Las variantes fp16 reciben audio en float32 (buffers del preprocesado y de
+    la caché convolucional); se convierte a la entrada del encoder convolucional.
+    """
+    import torch
+    dtype = next(model.parameters()).dtype
+    if dtype == torch.float32: return
+    model.wav2vec2.feature_extractor.register_forward_pre_hook(
+        lambda module, args: tuple(a.to(dtype) for a in args))
+
+def parity_inputs(rate=16000):
+    """Ventanas de prueba fijas (tonos armónicos con vibrato y ruido), ya normalizadas como el extractor."""
+    import numpy as np
+    import torch
+    rng = np.random.default_rng(0)
+    t = np.arange(int(rate * PARITY_SECONDS)) / rate
+    windows = []
+    for i in range(PARITY_WINDOWS):
+        f0 = 110 + 35 * i
+        phase = 2 * np.pi * f0 * (t + 0.02 * np.sin(2 * np.pi * 4 * t) / (2 * np.pi * 4))
+        tone = sum(np.sin(k * phase) / k for k in range(1, 6))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * (1 + i) * t)
+        x = tone * envelope + rng.standard_normal(t.size) * 0.05 * (i + 1)
+        windows.append((x - x.mean()) / np.sqrt(x.var() + 1e-7))
+    return torch.from_numpy(np.stack(windows).astype(np.float32))
+
+def model_probs(model, inputs):
+    """Probabilidades por ventana, en el dispositivo y tipo de la variante."""
+    import torch
+    param = next(model.parameters())
+    with torch.no_grad():
+        logits = model(inputs.to(param.device, param.dtype)).logits
+    return torch.softmax(logits.float(), dim=-1).cpu()
+
+def parity_report(reference, probs):
+    agreement = float((reference.argmax(-1) == probs.argmax(-1)).float().mean())
+    max_diff = float((reference - probs).abs().max())
+    return {"windows": int(reference.shape[0]), "top1_agreement": agreement, "max_prob_diff": round(max_diff, 5),
+            "passed": agreement == 1.0 and max_diff <= PARITY_MAX_PROB_DIFF}
+
+def read_meta(path):
+    try:
+        with open(os.path.splitext(path)[0] + ".json", "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+class ArtifactCache:
+    def __init__(self, root=ARTIFACTS_DIR):
+        self.root = root
+        self.lock = threading.Lock()
+
+    def variant_path(self, model_key, revision, backend, precision):
+        return os.path.join(self.root, model_key, revision, f"{backend}-{precision}.pt")
+
+    def lookup(self, config, backend="torch", precision="int8"):
+        """Ruta de la variante si existe para la revisión actual, o None."""
+        revision = config.get("revision")
+        if not revision: return None
+        path = self.variant_path(config["key"], revision, backend, precision)
+        return path if os.path.isfile(path) else None
+
+    def missing_variants(self, config, precisions, backend="torch"):
+        """Variantes por construir; también las que se construyeron sin comprobación de paridad."""
+        missing = []
+        for p in precisions:
+            if p not in VARIANT_BUILDERS or not VARIANT_BUILDERS[p][1](): continue
+            path = self.lookup(config, backend, p)
+            if path is None or "parity" not in read_meta(path):
+                missing.append(p)
+        return missing
+
+    def invalidate_stale(self, config):
+        """Borra las variantes construidas para revisiones anteriores del modelo."""
+        model_dir = os.path.join(self.root, config["key"])
+        if not os.path.isdir(model_dir): return
+        for revision in os.listdir(model_dir):
+            if revision != config.get("revision"):
+                print(f"🧹 Variantes obsoletas eliminadas: {config['key']}/{revision}")
+                shutil.rmtree(os.path.join(model_dir, revision), ignore_errors=True)
+
+    def load(self, config, backend="torch", precision="int8"):
+        path = self.lookup(config, backend, precision)
+        if path is None: return None
+        import torch
+        meta = read_meta(path)
+        if not meta.get("parity", {}).get("passed"):
+            parity = meta.get("parity")
+            detail = (f"coincidencia {parity['top1_agreement']:.0%}, Δp máx {parity['max_prob_diff']:.3f}"
+                      if parity else "sin comprobar")
+            print(f"ℹ️ Variante {precision} descartada por paridad con fp32 ({detail}), se usa fp32.")
+            return None
+        built_with = meta.get("torch_version")
+        if built_with != torch.__version__:
+            # El formato serializado depende de la versión de torch: se reconstruye
+            print(f"♻️ Variante {precision} construida con torch {built_with}, se reconstruirá.")
+            os.remove(path)
+            return None
+        try:
+            # Módulo completo serializado (los modelos cuantizados no se reconstruyen desde el state_dict)
+            model = torch.load(path, map_location="cpu", weights_only=False)
+        except Exception as e:
+            print(f"⚠️ Variante {precision} ilegible, se descarta: {e}")
+            os.remove(path)
+            return None
+        cast_inputs_to_model(model)
+        return model
+
+    def check_parity(self, model, variant, precision):
+        """Compara la variante con el modelo fp32 del que sale en las ventanas de prueba."""
+        import torch
+        inputs = parity_inputs()
+        reference = model_probs(model.cpu().eval(), inputs)
+        if precision == "fp16":
+            variant = variant.to("cuda" if torch.cuda.is_available() else "mps")
+        return parity_report(reference, model_probs(variant, inputs))
+
+    def build(self, config, model, backend="torch", precision="int8", should_stop=None):
+        """
+        Construye y guarda una variante a partir del modelo fp32 (se modifica: pasar una copia).
+        Devuelve la ruta, o None si should_stop() pidió cortar antes de guardar.
+        """
+        import torch
+        builder, _ = VARIANT_BUILDERS[precision]
+        start = time.perf_counter()
+        variant = builder(model)
+        if should_stop is not None and should_stop(): return None
+        path = self.variant_path(config["key"], config["revision"], backend, precision)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self.lock:
+            tmp = path + ".tmp"
+            try:
+                torch.save(variant, tmp)
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp): os.remove(tmp)
+            # Después de guardar: la primera pasada de transformers deja hooks que no se serializan
+            parity = self.check_parity(model, variant, precision)
+            meta = {
+                "model_id": config["id"],
+                "revision": config["revision"],
+                "backend": backend,
+                "precision": precision,
+                "torch_version": torch.__version__,
+                "build_seconds": round(time.perf_counter() - start, 2),
+                "size_bytes": os.path.getsize(path),
+                "parity": parity,
+            }
+            with open(os.path.splitext(path)[0] + ".json", "w") as f:
+                json.dump(meta, f, indent=4)
+        print(f"📦 Variante {precision} lista: {path} ({meta['size_bytes'] / 1024 / 1024:.0f} MB)")
+        if not parity["passed"]:
+            print(f"⚠️ La variante {precision} no coincide con fp32 (coincidencia {parity['top1_agreement']:.0%}, "
+                  f"Δp máx {parity['max_prob_diff']:.3f}): no se usará.")
+        return path
+
+_cache = None
+
+def get_artifact_cache():
+    global _cache
+    if _cache is None:
+        _cache = ArtifactCache()
+    return _cache
@@ -0,0 +1,89 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+from collections import namedtuple
+from PyQt6.QtCore import Qt, QObject, QTimer, QElapsedTimer, pyqtSignal
+
+# Estado del avatar en un único lugar. Cada cambio (boca, emoción, mute, volteo,
+# sombra) reemplaza la instantánea y la marca sucia; el render se pide una sola
+# vez por frame de pantalla y pinta la instantánea más reciente. Así, una boca
+# y una emoción que llegan en el mismo frame cuestan un render, no dos.
+
+# Instantánea inmutable: se reemplaza entera con _replace, nunca se modifica
+AvatarState = namedtuple("AvatarState", "emotion speaking muted flipped shadow")
+
+class AvatarStateStore(QObject):
+    """Guarda la instantánea actual y agrupa los cambios de un mismo frame en un render."""
+    render_requested = pyqtSignal() # Hay cambios pendientes y ya toca un frame nuevo
+
+    def __init__(self, state, refresh_rate=60.0):
+        super().__init__()
+        self.state = state
+        self.dirty = False
+        self.mutations = 0 # Cambios de estado recibidos
+        self.renders = 0 # Renders hechos (take)
+        self.coalesced = 0 # Cambios que se sumaron a un render ya pedido en el mismo frame
+        self.deferred = 0 # Cambios con el render suspendido (ventana oculta): no los ahorra el agrupado
+        self.suspended = False
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.render_requested.emit)
+        self.last_render = QElapsedTimer()
+        self.set_refresh_rate(refresh_rate)
+
+    def set_refresh_rate(self, hz):
+        self.frame_ms = 1000 / (hz if hz and hz > 0 else 60.0)
+
+    def update(self, **changes):
+        """Nueva instantánea con los campos dados; False si no cambió nada."""
+        state = self.state._replace(**changes)
+        if state == self.state: return False
+        self.state = state
+        self.mutations += 1
+        if self.suspended:
+            self.deferred += 1
+        elif self.dirty:
+            self.coalesced += 1
+        self.mark_dirty()
+        return True
+
+    def mark_dirty(self):
+        """Pide un render sin cambiar el estado (tamaño, skin o DPR nuevos)."""
+        was_dirty, self.dirty = self.dirty, True
+        if was_dirty or self.suspended: return # Suspendido: se pinta una vez al reanudar
+        # Primer cambio del frame: se pinta al terminar el lote de eventos actual,
+        # o cuando toque el siguiente frame si ya se pintó uno en este
+        since = self.last_render.elapsed() if self.last_render.isValid() else self.frame_ms
+        self.timer.start(max(0, round(self.frame_ms - since)))
+
+    def set_suspended(self, suspended):
+        """Ventana oculta: los cambios solo dejan el estado sucio, sin pedir renders."""
+        self.suspended = suspended
+        if suspended:
+            self.timer.stop()
+
+    def take(self):
+        """Instantánea a pintar; el estado queda limpio hasta el próximo cambio."""
+        self.timer.stop()
+        self.dirty = False
+        self.renders += 1
+        self.last_render.start()
+        return self.state
+
+    def stats(self):
+        return {"mutations": self.mutations, "renders": self.renders, "coalesced": self.coalesced,
+                "deferred": self.deferred, "pending": self.dirty}
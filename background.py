@@ -25,6 +25,8 @@ class BackgroundManager:
         self.profile_manager = profile_manager
         self.config_manager = config_manager
         self.central_widget = main_window.central_widget
+        self.pending_profile = None
+        main_window.skin_loader.skin_ready.connect(self.on_skin_ready)
 
     def show_context_menu(self, position):
         menu = QMenu(self.main_window)
@@ -116,10 +118,34 @@ class BackgroundManager:
         self.config_manager.set("background_color", color)
 
     def change_profile(self, profile_name):
+        """Cambia de skin cuando sus imágenes ya están decodificadas (en segundo plano si hace falta)."""
+        self.pending_profile = profile_name
+        if self.main_window.skin_loader.request(profile_name):
+            self.apply_profile(profile_name)
+        # Si no, on_skin_ready la aplica al terminar; la skin actual sigue en pantalla mientras tanto
+
+    def on_skin_ready(self, profile_name):
+        # Solo cuenta la última skin pedida (cambios rápidos seguidos no se pisan)
+        if profile_name == self.pending_profile:
+            self.apply_profile(profile_name)
+
+    def apply_profile(self, profile_name):
+        self.pending_profile = None
+        previous = self.profile_manager.current_profile
         self.profile_manager.set_profile(profile_name)
+        self.main_window.skin_loader.set_active(self.profile_manager.current_profile)
+        self.main_window.invalidate_avatar_frames(previous)
         self.main_window.update_avatar()
         self.config_manager.set("current_profile", profile_name)
-    
+        self.main_window.on_profile_changed()
+
+    def next_profile(self):
+        profiles = self.profile_manager.profiles
+        if not profiles: return
+        current = self.pending_profile or self.profile_manager.current_profile
+        index = profiles.index(current) if current in profiles else -1
+        self.change_profile(profiles[(index + 1) % len(profiles)])
+
     def open_creator(self):
         from profile_creator import ProfileCreatorDialog
         dialog = ProfileCreatorDialog(self.main_window)
@@ -131,9 +157,11 @@ class BackgroundManager:
         dialog = ProfileCreatorDialog(self.main_window, edit_profile_name=profile_name)
         if dialog.exec():
             self.profile_manager.scan_profiles()
-            # Si estamos editando el perfil actual, forzar actualización visual
+            self.main_window.skin_loader.invalidate(profile_name)
+            self.main_window.invalidate_avatar_frames(profile_name)
+            # Si estamos editando el perfil actual, redecodificarlo y forzar actualización visual
             if self.profile_manager.current_profile == profile_name:
-                self.main_window.update_avatar()
+                self.change_profile(profile_name)
 
     def import_skin_dialog(self):
         path, _ = QFileDialog.getOpenFileName(self.main_window, "Importar Skin (.ptuber)", "", "PNGTuber Profile (*.ptuber)")
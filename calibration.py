@@ -0,0 +1,273 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+import os
+import copy
+import json
+import time
+import numpy as np
+
+RATE = 16000
+
+# Calibración personal: el encoder queda congelado y solo se reentrena la
+# cabeza (o un ajuste de sesgos) con clips grabados por el usuario. Todo vive
+# dentro de la skin, así que viaja con ella al exportar:
+#   avatars/<perfil>/calibration/clips/<emoción>/*.wav
+#   avatars/<perfil>/calibration/<modelo>/embeddings-<etiqueta>.npz
+#   avatars/<perfil>/calibration/<modelo>/head.pt  (+ head.npz para numpy_engine)
+# torch y scipy se importan dentro de cada función: las rutas y los clips se
+# consultan desde la app aunque la inferencia viva en el daemon.
+
+MODES = ["head", "bias"]
+
+def calibration_dir(profile_dir):
+    return os.path.join(profile_dir, "calibration")
+
+def clips_dir(profile_dir):
+    return os.path.join(calibration_dir(profile_dir), "clips")
+
+def model_dir(profile_dir, model_key):
+    return os.path.join(calibration_dir(profile_dir), model_key)
+
+def head_path(profile_dir, model_key):
+    return os.path.join(model_dir(profile_dir, model_key), "head.pt")
+
+def numpy_head_path(path):
+    """Copia en NumPy de la cabeza calibrada, junto al head.pt."""
+    return os.path.splitext(path)[0] + ".npz"
+
+def save_clip(profile_dir, state, audio):
+    from scipy.io import wavfile
+    folder = os.path.join(clips_dir(profile_dir), state)
+    os.makedirs(folder, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path, n = os.path.join(folder, stamp + ".wav"), 1
+    while os.path.exists(path):
+        path, n = os.path.join(folder, f"{stamp}-{n}.wav"), n + 1
+    wavfile.write(path, RATE, np.asarray(audio, dtype=np.float32))
+    return path
+
+def list_clips(profile_dir):
+    """{estado: [rutas]} de los clips grabados en la skin."""
+    root = clips_dir(profile_dir)
+    clips = {}
+    if not os.path.isdir(root): return clips
+    for state in sorted(os.listdir(root)):
+        folder = os.path.join(root, state)
+        if not os.path.isdir(folder): continue
+        files = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(".wav"))
+        if files: clips[state] = files
+    return clips
+
+def cache_tag(revision, precision, encoder_layers):
+    """Los embeddings dependen de la revisión, la variante y la profundidad del encoder."""
+    return f"{revision or 'unknown'}-{precision}-{encoder_layers or 'all'}"
+
+def float_copy(module):
+    """Copia entrenable en float32 (desarma capas cuantizadas int8 y fp16)."""
+    from torch import nn
+    module = copy.deepcopy(module)
+    for name, child in list(module.named_children()):
+        if hasattr(child, "weight") and callable(child.weight) and hasattr(child, "bias") and callable(child.bias):
+            # torch.ao.nn.quantized.dynamic.Linear
+            weight = child.weight().dequantize()
+            linear = nn.Linear(weight.shape[1], weight.shape[0])
+            linear.weight.data.copy_(weight)
+            linear.bias.data.copy_(child.bias())
+            setattr(module, name, linear)
+        else:
+            setattr(module, name, float_copy(child))
+    return module.float()
+
+def float_head(model, name):
+    """float_copy que también cubre el caso de que la cabeza sea directamente una capa cuantizada."""
+    from torch import nn
+    wrapper = nn.Module()
+    wrapper.add_module(name, getattr(model, name))
+    return getattr(float_copy(wrapper), name)
+
+class EmbeddingCache:
+    """Embeddings promediados del encoder congelado, por clip, en un .npz."""
+    def __init__(self, profile_dir, model_key, tag):
+        self.path = os.path.join(model_dir(profile_dir, model_key), f"embeddings-{tag}.npz")
+        self.entries = {}
+        if os.path.exists(self.path):
+            data = np.load(self.path)
+            self.entries = {k: (s, e) for k, s, e in zip(data["keys"].tolist(), data["states"].tolist(), data["embeddings"])}
+
+    @staticmethod
+    def key(path):
+        return f"{os.path.basename(os.path.dirname(path))}/{os.path.basename(path)}:{int(os.path.getmtime(path))}"
+
+    def update(self, clips, embed_fn):
+        """Calcula solo los clips nuevos; descarta los borrados. Devuelve cuántos calculó."""
+        from scipy.io import wavfile
+        wanted = {self.key(p): (state, p) for state, paths in clips.items() for p in paths}
+        self.entries = {k: v for k, v in self.entries.items() if k in wanted}
+        computed = 0
+        for k, (state, path) in wanted.items():
+            if k in self.entries: continue
+            _, audio = wavfile.read(path)
+            self.entries[k] = (state, embed_fn(audio.astype(np.float32)))
+            computed += 1
+        if computed or not os.path.exists(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            keys = list(self.entries.keys())
+            np.savez(self.path, keys=np.array(keys), states=np.array([self.entries[k][0] for k in keys]),
+                     embeddings=np.stack([self.entries[k][1] for k in keys]))
+        return computed
+
+    def arrays(self):
+        states = [s for s, _ in self.entries.values()]
+        return np.stack([e for _, e in self.entries.values()]), states
+
+def make_embedder(model, feat, device):
+    """Función audio -> embedding promediado (una pasada del encoder, solo para clips nuevos)."""
+    import torch
+    from wav2vec2_runtime import pooled_embedding
+    def embed(audio):
+        inp = feat(audio, sampling_rate=RATE, return_tensors="pt").input_values.to(device)
+        with torch.no_grad():
+            hidden = model.wav2vec2(inp)[0]
+            return pooled_embedding(hidden)[0].float().cpu().numpy()
+    return embed
+
+def state_targets(model, mapping, states):
+    """Matriz (estados x etiquetas del modelo): qué etiquetas cuentan como cada estado."""
+    import torch
+    id2label = model.config.id2label
+    labels = [str(id2label[i]).lower() for i in range(len(id2label))]
+    unique = sorted(set(states))
+    mask = np.zeros((len(unique), len(labels)), dtype=np.float32)
+    for i, state in enumerate(unique):
+        for j, label in enumerate(labels):
+            if mapping.get(label) == state: mask[i, j] = 1.0
+    return unique, torch.from_numpy(mask)
+
+def head_accuracy(head_fn, embeddings, targets, mask):
+    import torch
+    with torch.no_grad():
+        probs = torch.softmax(head_fn(embeddings), dim=-1)
+        return float(((probs @ mask.T).argmax(dim=1) == targets).float().mean())
+
+def train_head(model, mapping, embeddings, states, mode="head", steps=300, lr=1e-3, anchor=1e-2):
+    """
+    Reentrena la cabeza sobre embeddings cacheados (nunca toca el encoder).
+    La pérdida es -log P(estado) sumando las etiquetas que mapean a ese estado,
+    con un ancla L2 hacia los pesos originales para no sobreajustar pocos clips.
+    mode="bias" solo ajusta el sesgo de la capa de salida.
+    """
+    import torch
+    from torch import nn
+    from wav2vec2_runtime import classify_pooled, head_module_names
+    unique, mask = state_targets(model, mapping, states)
+    keep = [i for i, s in enumerate(states) if mask[unique.index(s)].sum() > 0]
+    if not keep:
+        raise ValueError("Ninguna emoción grabada existe en este modelo.")
+    x = torch.from_numpy(np.asarray(embeddings, dtype=np.float32)[keep])
+    y = torch.tensor([unique.index(states[i]) for i in keep])
+
+    names = head_module_names(model)
+    heads = {name: float_head(model, name).train() for name in names}
+    original = {name: {k: v.detach().clone() for k, v in h.state_dict().items()} for name, h in heads.items()}
+    shell = nn.Module()
+    for name, head in heads.items(): shell.add_module(name, head)
+    head_fn = lambda e: classify_pooled(shell, e)
+
+    for head in heads.values(): head.eval()
+    before = head_accuracy(head_fn, x, y, mask)
+
+    if mode == "bias":
+        last = [m for m in heads[names[-1]].modules() if isinstance(m, nn.Linear)][-1]
+        params = [last.bias]
+    else:
+        params = [p for h in heads.values() for p in h.parameters()]
+    for p in (p for h in heads.values() for p in h.parameters()): p.requires_grad_(False)
+    for p in params: p.requires_grad_(True)
+
+    optimizer = torch.optim.Adam(params, lr=lr if mode == "head" else lr * 20)
+    for head in heads.values(): head.train()
+    for _ in range(steps):
+        probs = torch.softmax(head_fn(x), dim=-1)
+        loss = -torch.log((probs @ mask.T).gather(1, y[:, None]) + 1e-8).mean()
+        for name, head in heads.items():
+            for k, p in head.named_parameters():
+                if p.requires_grad: loss = loss + anchor * ((p - original[name][k]) ** 2).sum()
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+
+    for head in heads.values(): head.eval()
+    after = head_accuracy(head_fn, x, y, mask)
+    return {name: h.state_dict() for name, h in heads.items()}, {"before": before, "after": after, "clips": len(keep)}
+
+def save_head(path, state_dicts, meta):
+    import torch
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    torch.save({"modules": state_dicts, "meta": meta}, path)
+    # Mismos pesos con los nombres del state_dict completo, legibles sin torch
+    arrays = {f"{name}.{k}": v.detach().float().cpu().numpy()
+              for name, state in state_dicts.items() for k, v in state.items()}
+    np.savez(numpy_head_path(path), meta=np.array(json.dumps(meta)), **arrays)
+
+def remove_head(path):
+    for f in (path, numpy_head_path(path)):
+        if os.path.isfile(f): os.remove(f)
+
+def original_heads(model):
+    """Módulos de la cabeza tal como vienen con el modelo (apply_calibration los reemplaza, no los modifica)."""
+    from wav2vec2_runtime import head_module_names
+    return {name: getattr(model, name) for name in head_module_names(model)}
+
+def restore_heads(model, heads):
+    """Vuelve a la cabeza original (al cambiar a una skin sin calibrar, o antes de aplicar otra)."""
+    for name, head in heads.items():
+        setattr(model, name, head)
+
+def share_encoder(model):
+    """Copia superficial que comparte encoder y pesos pero puede cambiar de cabeza por su cuenta."""
+    clone = copy.copy(model)
+    clone._modules = model._modules.copy()
+    return clone
+
+def apply_calibration(model, path, revision, encoder_layers):
+    """Sustituye la cabeza del modelo por la calibrada si es de esta revisión y profundidad."""
+    if not os.path.isfile(path): return False
+    import torch
+    data = torch.load(path, map_location="cpu", weights_only=True)
+    meta = data.get("meta", {})
+    if meta.get("revision") != revision or meta.get("encoder_layers", 0) != encoder_layers:
+        print("ℹ️ La calibración guardada es de otra versión/profundidad del modelo, se ignora.")
+        return False
+    reference = next(model.wav2vec2.parameters())
+    for name, state in data["modules"].items():
+        head = float_head(model, name)
+        head.load_state_dict(state)
+        setattr(model, name, head.to(device=reference.device, dtype=reference.dtype).eval())
+    print(f"🎯 Calibración personal aplicada ({meta.get('mode')}, {meta.get('clips')} clips).")
+    return True
+
+def load_numpy_head(path, revision, encoder_layers):
+    """{nombre del state_dict: array} de la cabeza calibrada, o None si no aplica."""
+    path = numpy_head_path(path)
+    if not os.path.isfile(path): return None
+    with np.load(path) as data:
+        meta = json.loads(str(data["meta"]))
+        if meta.get("revision") != revision or meta.get("encoder_layers", 0) != encoder_layers:
+            print("ℹ️ La calibración guardada es de otra versión/profundidad del modelo, se ignora.")
+            return None
+        print(f"🎯 Calibración personal aplicada ({meta.get('mode')}, {meta.get('clips')} clips).")
+        return {k: data[k] for k in data.files if k != "meta"}
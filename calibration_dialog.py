@@ -0,0 +1,172 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+import os
+import numpy as np
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QComboBox, QMessageBox)
+from PyQt6.QtCore import Qt
+from core_systems import SUPPORTED_MODELS, RATE, CalibrationThread
+import calibration
+
+RECORD_SECONDS = 3.0
+
+class CalibrationDialog(QDialog):
+    """Graba clips por emoción en la skin activa y reentrena la cabeza del modelo."""
+    def __init__(self, main_window):
+        super().__init__(main_window)
+        self.main_window = main_window
+        self.setWindowTitle("Calibración de Voz")
+        self.setMinimumWidth(420)
+
+        pm = main_window.profile_manager
+        self.profile_dir = os.path.join(pm.root_folder, pm.current_profile)
+        self.emotion_thread = main_window.emotion_thread
+        self.model_key = self.emotion_thread.current_model_key if self.emotion_thread else None
+        model_config = SUPPORTED_MODELS.get(self.model_key, {})
+
+        self.recording = []
+        self.recorded_points = 0
+        self.worker = None
+
+        layout = QVBoxLayout(self)
+        info = QLabel(f"Skin: <b>{pm.current_profile}</b> · Modelo: <b>{model_config.get('name', '-')}</b><br>"
+                      "Graba varias frases por emoción actuando como en directo. "
+                      "Solo se reentrena la cabeza del modelo: tarda unos segundos.")
+        info.setWordWrap(True)
+        layout.addWidget(info)
+
+        row = QHBoxLayout()
+        self.emotion_combo = QComboBox()
+        for state in model_config.get("avatar_states", []):
+            self.emotion_combo.addItem(state.capitalize(), state)
+        row.addWidget(self.emotion_combo)
+        self.btn_record = QPushButton(f"🎙️ Grabar {RECORD_SECONDS:.0f} s")
+        self.btn_record.clicked.connect(self.start_recording)
+        row.addWidget(self.btn_record)
+        layout.addLayout(row)
+
+        self.lbl_clips = QLabel()
+        self.lbl_clips.setStyleSheet("color: #aaa; font-size: 11px;")
+        self.lbl_clips.setWordWrap(True)
+        layout.addWidget(self.lbl_clips)
+
+        row = QHBoxLayout()
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItem("Cabeza completa", "head")
+        self.mode_combo.addItem("Solo sesgos (pocos clips)", "bias")
+        row.addWidget(self.mode_combo)
+        self.btn_train = QPushButton("🎯 Entrenar")
+        self.btn_train.clicked.connect(self.start_training)
+        row.addWidget(self.btn_train)
+        self.btn_clear = QPushButton("🗑️ Quitar")
+        self.btn_clear.setToolTip("Elimina la cabeza calibrada (los clips se conservan)")
+        self.btn_clear.clicked.connect(self.clear_calibration)
+        row.addWidget(self.btn_clear)
+        layout.addLayout(row)
+
+        self.lbl_status = QLabel()
+        self.lbl_status.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.lbl_status.setWordWrap(True)
+        layout.addWidget(self.lbl_status)
+
+        # Con el daemon o el motor NumPy no hay modelo torch aquí: CalibrationThread carga una copia para entrenar
+        served = self.emotion_thread is not None and self.emotion_thread.runs_outside_torch()
+        if self.model_key is None or not (served or hasattr(self.emotion_thread.model, "wav2vec2")):
+            self.lbl_status.setText("⚠️ Activa un modelo wav2vec2 para calibrar.")
+            self.btn_record.setEnabled(False)
+            self.btn_train.setEnabled(False)
+        self.refresh_clips()
+
+    def refresh_clips(self):
+        clips = calibration.list_clips(self.profile_dir)
+        if clips:
+            self.lbl_clips.setText("Clips: " + ", ".join(f"{s} ({len(p)})" for s, p in clips.items()))
+        else:
+            self.lbl_clips.setText("Aún no hay clips grabados en esta skin.")
+        has_head = self.model_key and os.path.isfile(calibration.head_path(self.profile_dir, self.model_key))
+        self.btn_clear.setEnabled(bool(has_head))
+
+    # --- GRABACIÓN ---
+    def start_recording(self):
+        self.recording = []
+        self.recorded_points = 0
+        self.btn_record.setEnabled(False)
+        self.lbl_status.setText("🔴 Grabando...")
+        self.main_window.audio_thread.audio_data_signal.connect(self.on_chunk)
+
+    def on_chunk(self, chunk):
+        if self.recording is None: return # Bloque ya encolado cuando se cerró el diálogo
+        self.recording.append(chunk.copy())
+        self.recorded_points += len(chunk)
+        if self.recorded_points >= RATE * RECORD_SECONDS:
+            self.main_window.audio_thread.audio_data_signal.disconnect(self.on_chunk)
+            self.finish_recording()
+
+    def finish_recording(self):
+        audio = np.concatenate(self.recording)[:int(RATE * RECORD_SECONDS)]
+        self.btn_record.setEnabled(True)
+        if np.sqrt(np.mean(audio ** 2)) < 0.01:
+            self.lbl_status.setText("⚠️ No se detectó voz, inténtalo de nuevo.")
+            return
+        state = self.emotion_combo.currentData()
+        calibration.save_clip(self.profile_dir, state, audio)
+        self.lbl_status.setText(f"✅ Clip de '{state}' guardado.")
+        self.refresh_clips()
+
+    # --- ENTRENAMIENTO ---
+    def start_training(self):
+        if self.worker is not None and self.worker.isRunning(): return
+        self.btn_train.setEnabled(False)
+        self.worker = CalibrationThread(self.emotion_thread, self.profile_dir, self.mode_combo.currentData())
+        self.worker.progress_update.connect(self.lbl_status.setText)
+        self.worker.finished_signal.connect(self.on_training_finished)
+        self.worker.start()
+
+    def on_training_finished(self, success, msg, report):
+        self.btn_train.setEnabled(True)
+        if not success:
+            self.lbl_status.setText(f"❌ {msg}")
+            return
+        self.lbl_status.setText(
+            f"✅ Precisión en tus clips: {report['before']*100:.0f}% → {report['after']*100:.0f}% "
+            f"({report['clips']} clips, {report['seconds']:.1f} s)")
+        self.refresh_clips()
+        # Recargar para aplicar la nueva cabeza
+        self.main_window.start_emotion_system(self.model_key)
+        self.emotion_thread = self.main_window.emotion_thread
+
+    def clear_calibration(self):
+        path = calibration.head_path(self.profile_dir, self.model_key)
+        if QMessageBox.question(self, "Quitar calibración", "¿Volver a la cabeza original del modelo?") \
+                != QMessageBox.StandardButton.Yes:
+            return
+        calibration.remove_head(path)
+        self.refresh_clips()
+        self.main_window.start_emotion_system(self.model_key)
+        self.emotion_thread = self.main_window.emotion_thread
+
+    def done(self, result):
+        # Todas las salidas (Esc, reject, cerrar ventana) pasan por aquí: la grabación
+        # no debe seguir ni guardar un clip desde un diálogo oculto
+        try:
+            self.main_window.audio_thread.audio_data_signal.disconnect(self.on_chunk)
+        except TypeError:
+            pass
+        self.recording = None
+        if self.worker is not None:
+            self.worker.wait()
+        super().done(result)
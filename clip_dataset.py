@@ -0,0 +1,79 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+import os
+import numpy as np
+from math import gcd
+from scipy.io import wavfile
+from scipy.signal import resample_poly
+from model_registry import LABEL_ALIASES
+
+RATE = 16000
+
+def load_wav(path, rate=RATE):
+    """Lee un WAV como float32 mono a la frecuencia indicada."""
+    sr, data = wavfile.read(path)
+    if data.dtype.kind == "i":
+        data = data.astype(np.float32) / np.iinfo(data.dtype).max
+    elif data.dtype.kind == "u":
+        data = (data.astype(np.float32) - 128.0) / 128.0
+    data = data.astype(np.float32)
+    if data.ndim > 1:
+        data = data.mean(axis=1)
+    if sr != rate:
+        g = gcd(sr, rate)
+        data = resample_poly(data, rate // g, sr // g).astype(np.float32)
+    return data
+
+def fit_window(audio, length):
+    """Recorta al centro o rellena con ceros hasta 'length' muestras."""
+    if len(audio) >= length:
+        start = (len(audio) - length) // 2
+        return audio[start:start + length]
+    out = np.zeros(length, dtype=np.float32)
+    out[:len(audio)] = audio
+    return out
+
+def load_labelled_clips(folder, rate=RATE):
+    """
+    Carga una carpeta con una subcarpeta por emoción (happy/, sad/, anger/...).
+    Devuelve una lista de (ruta, estado_avatar, audio).
+    """
+    clips = []
+    for name in sorted(os.listdir(folder)):
+        label_dir = os.path.join(folder, name)
+        state = LABEL_ALIASES.get(name.lower())
+        if not os.path.isdir(label_dir): continue
+        if state is None:
+            print(f"⚠️ Carpeta ignorada (emoción desconocida): {name}")
+            continue
+        for f in sorted(os.listdir(label_dir)):
+            if f.lower().endswith(".wav"):
+                path = os.path.join(label_dir, f)
+                clips.append((path, state, load_wav(path, rate)))
+    return clips
+
+def project_state(state, model_config):
+    """
+    Lleva el estado real al espacio del modelo: si el modelo no tiene ese estado
+    se usa su propio mapeo (p.ej. 'fear' -> 'sad' en SomosNLP). None si no aplica.
+    """
+    if state in model_config["avatar_states"]:
+        return state
+    for label, mapped in model_config["mapping"].items():
+        if LABEL_ALIASES.get(label) == state:
+            return mapped
+    return None
@@ -41,11 +41,35 @@ class ConfigManager(QObject):
                 "happiness": "4",
                 "sadness": "5",
                 "anger": "6",
-                "surprise": "7"
+                "surprise": "7",
+                "next_skin": "" # Sin tecla: se asigna desde Ajustes
             },
             "mic_sensitivity": 1.0,
             "audio_threshold": 0.02,
-            "check_updates": True
+            "check_updates": True,
+            "cpu_budget_enabled": False,
+            "cpu_inference_cores": "",
+            "cpu_audio_core": None,
+            "cpu_torch_threads": 0,
+            "cpu_interop_threads": 1,
+            "encoder_layers": 0,
+            "early_exit_confidence": 0.0,
+            "early_exit_min_layers": 4,
+            "emotion_hop_seconds": 2.0,
+            "model_precision": "fp32", # int8/fp16/auto cambian las predicciones: solo si el usuario lo elige
+            "inference_runtime": "torch",
+            "optimized_variants": ["int8", "fp16"],
+            "cascade_confidence": 0.0,
+            "mmap_weights": True,
+            "inference_daemon": False,
+            "idle_unload_minutes": 5,
+            "render_cache_mb": 64,
+            "skin_cache_mb": 128,
+            "crossfade_enabled": False,
+            "crossfade_ms": 90,
+            "crossfade_cache_mb": 96,
+            "shm_output_enabled": False,
+            "shm_output_name": "alterego_avatar"
         }
         
         self.config_cache = self.load_config()
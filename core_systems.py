@@ -18,11 +18,7 @@ import time
 import threading
 import numpy as np
 import pyaudio
-import torch
-from torch import nn
 from PyQt6.QtCore import QThread, pyqtSignal, QObject
-from transformers import AutoModelForAudioClassification, Wav2Vec2FeatureExtractor, Wav2Vec2PreTrainedModel, Wav2Vec2Model
-from huggingface_hub import snapshot_download
 import sys
 import re
 
@@ -35,35 +31,23 @@ VOLUME_THRESHOLD = 0.02
 EMOTION_WINDOW_SECONDS = 2.0
 MODEL_NAME = "somosnlp-hackathon-2022/wav2vec2-base-finetuned-sentiment-classification-MESD"
 
-# --- Mapeo de emociones ---
-
 # --- MODELOS SOPORTADOS ---
-SUPPORTED_MODELS = {
-    "spanish": {
-        "name": "Español (SomosNLP)",
-        "id": "somosnlp-hackathon-2022/wav2vec2-base-finetuned-sentiment-classification-MESD",
-        "avatar_states": ["neutral", "happy", "sad", "angry"],
-        "mapping": {
-            "anger": "angry", "disgust": "angry", "fear": "sad",
-            "happiness": "happy", "sadness": "sad", "neutral": "neutral"
-        }
-    },
-    "english": {
-        "name": "Global (Ehcalabres)",
-        "id": "ehcalabres/wav2vec2-lg-xlsr-en-speech-emotion-recognition",
-        "avatar_states": ["neutral", "happy", "sad", "angry", "surprise", "disgust", "fear"],
-        "mapping": {
-            "angry": "angry",
-            "calm": "neutral",
-            "disgust": "disgust",
-            "fearful": "fear",
-            "happy": "happy",
-            "neutral": "neutral",
-            "sad": "sad",
-            "surprised": "surprise"
-        }
-    }
-}
+# Definidos en model_registry; aquí se re-exportan para el resto de la app
+from model_registry import SUPPORTED_MODELS, get_registry
+get_registry() # Publica también los modelos registrados en el manifiesto
+from emotion_backends import is_engine_backend, load_engine
+
+# torch, transformers y los modelos viven en emotion_models y solo se importan
+# al cargar un modelo en este proceso: con el daemon de inferencia la app
+# arranca sin tocarlos. Se siguen exportando desde aquí por compatibilidad.
+LAZY_EXPORTS = ("EhcalabresHead", "EhcalabresModel", "FastFeatureExtractor",
+                "load_mapped_model", "load_emotion_model")
+
+def __getattr__(name):
+    if name in LAZY_EXPORTS:
+        import emotion_models
+        return getattr(emotion_models, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --- Hilo de Descarga ---
 class DownloadStream(QObject):
@@ -92,46 +76,6 @@ class DownloadStream(QObject):
     def flush(self):
         pass
 
-class EhcalabresHead(nn.Module):
-    """La 'cabeza' específica que estructura las capas internas"""
-    def __init__(self, config):
-        super().__init__()
-        # Replicamos exactamente 'classifier.dense'
-        self.dense = nn.Linear(config.hidden_size, config.hidden_size)
-        self.dropout = nn.Dropout(getattr(config, "final_dropout", 0.1))
-        # Replicamos exactamente 'classifier.output'
-        self.output = nn.Linear(config.hidden_size, config.num_labels)
-
-    def forward(self, features, **kwargs):
-        x = features
-        x = self.dropout(x)
-        x = self.dense(x)
-        x = torch.tanh(x)
-        x = self.dropout(x)
-        x = self.output(x)
-        return x
-
-class EhcalabresModel(Wav2Vec2PreTrainedModel):
-    """El modelo principal que contiene la cabeza"""
-    def __init__(self, config):
-        super().__init__(config)
-        self.wav2vec2 = Wav2Vec2Model(config)
-        self.dropout = nn.Dropout(getattr(config, "final_dropout", 0.1))
-        
-        # AQUÍ ESTÁ LA MAGIA:
-        # Al llamar a esto 'self.classifier' y usar la clase de arriba...
-        # ...se crean automáticamente 'classifier.dense' y 'classifier.output'
-        self.classifier = EhcalabresHead(config)
-        
-        self.init_weights()
-
-    def forward(self, input_values):
-        outputs = self.wav2vec2(input_values)
-        hidden_states = outputs[0]
-        # Promedio (Mean Pooling)
-        hidden_states = torch.mean(hidden_states, dim=1)
-        logits = self.classifier(hidden_states)
-        return type('ModelOutput', (object,), {'logits': logits})
 class ModelDownloaderThread(QThread):
     finished_signal = pyqtSignal(bool, str)
     progress_update = pyqtSignal(int)
@@ -156,7 +100,9 @@ class ModelDownloaderThread(QThread):
             print(f"⬇️ Iniciando descarga de: {self.model_id}")
             self.log_update.emit(f"Iniciando descarga de: {self.model_id}\n")
             
-            snapshot_download(repo_id=self.model_id)
+            from huggingface_hub import snapshot_download
+            path = snapshot_download(repo_id=self.model_id)
+            get_registry().record_download(self.model_id, path)
             
             self.finished_signal.emit(True, "Descarga completada")
         except Exception as e:
@@ -168,26 +114,115 @@ class ModelDownloaderThread(QThread):
         finally:
             sys.stderr = original_stderr # Restaurar siempre
 
+class ModelOptimizerThread(QThread):
+    """
+    Construye en segundo plano las variantes optimizadas que falten para la
+    revisión actual del modelo, para que los siguientes arranques las carguen
+    directamente.
+    """
+    finished_signal = pyqtSignal(str, list) # model_key, variantes construidas
+
+    def __init__(self, model_key, precisions, numpy_weights=False):
+        super().__init__()
+        self.model_key = model_key
+        self.precisions = precisions
+        self.numpy_weights = numpy_weights # Convertir a safetensors para el motor NumPy
+
+    def run(self):
+        config = SUPPORTED_MODELS.get(self.model_key)
+        if not config or not config.get("revision") or is_engine_backend(config):
+            self.finished_signal.emit(self.model_key, [])
+            return
+        from emotion_models import build_missing_variants
+        # Cancelación cooperativa (requestInterruption): se corta entre pasos, nunca a mitad de torch
+        built = build_missing_variants(config, self.precisions, self.isInterruptionRequested)
+        if self.numpy_weights and not self.isInterruptionRequested():
+            from artifact_cache import ARTIFACTS_DIR
+            from mmap_weights import existing_safetensors, ensure_safetensors
+            try:
+                if not existing_safetensors(config, ARTIFACTS_DIR) and ensure_safetensors(config, ARTIFACTS_DIR):
+                    built.append("numpy")
+            except Exception as e:
+                print(f"⚠️ No se pudieron convertir los pesos para el motor NumPy: {e}")
+        self.finished_signal.emit(self.model_key, built)
+
+class CalibrationThread(QThread):
+    """
+    Reentrena la cabeza del modelo con los clips de la skin. El encoder solo
+    corre para los clips que aún no tienen embedding en caché.
+    """
+    progress_update = pyqtSignal(str)
+    finished_signal = pyqtSignal(bool, str, dict)
+
+    def __init__(self, emotion_thread, profile_dir, mode="head"):
+        super().__init__()
+        self.emotion_thread = emotion_thread
+        self.profile_dir = profile_dir
+        self.mode = mode
+
+    def run(self):
+        et = self.emotion_thread
+        key = et.current_model_key
+        config = SUPPORTED_MODELS.get(key, {})
+        import calibration
+        model, feat, device, precision = et.model, et.feat, et.device, et.precision
+        try:
+            if model is None and et.runs_outside_torch():
+                # La inferencia vive en el daemon o en NumPy: copia torch en CPU solo para entrenar
+                self.progress_update.emit("Cargando una copia local del modelo...")
+                from emotion_models import load_emotion_model
+                from wav2vec2_runtime import supports_depth_control, truncate_encoder
+                precision = "int8" if precision == "int8" else "fp32"
+                feat, model = load_emotion_model(config, precision=precision, mmap=et.mmap_weights)
+                if et.encoder_layers and supports_depth_control(model):
+                    truncate_encoder(model, et.encoder_layers)
+                device = next(model.parameters()).device
+        except Exception as e:
+            self.finished_signal.emit(False, str(e), {})
+            return
+        if model is None or not hasattr(model, "wav2vec2"):
+            self.finished_signal.emit(False, "La calibración necesita un modelo wav2vec2 cargado.", {})
+            return
+        if model is et.model and et.base_heads is not None:
+            # Se entrena (y se mide el "antes") desde la cabeza original, no sobre la calibración aplicada
+            model = calibration.share_encoder(model)
+            calibration.restore_heads(model, et.base_heads)
+        try:
+            clips = calibration.list_clips(self.profile_dir)
+            if not clips:
+                self.finished_signal.emit(False, "No hay clips grabados.", {})
+                return
+            tag = calibration.cache_tag(config.get("revision"), precision, et.encoder_layers)
+            cache = calibration.EmbeddingCache(self.profile_dir, key, tag)
+            self.progress_update.emit("Calculando embeddings de los clips nuevos...")
+            computed = cache.update(clips, calibration.make_embedder(model, feat, device))
+            embeddings, states = cache.arrays()
+
+            self.progress_update.emit(f"Entrenando cabeza ({len(states)} clips, {computed} nuevos)...")
+            t0 = time.perf_counter()
+            heads, report = calibration.train_head(model, et.map, embeddings, states, self.mode)
+            report.update({"mode": self.mode, "revision": config.get("revision"),
+                           "encoder_layers": et.encoder_layers, "seconds": time.perf_counter() - t0,
+                           "computed": computed})
+            calibration.save_head(calibration.head_path(self.profile_dir, key), heads, report)
+            self.finished_signal.emit(True, "Calibración guardada.", report)
+        except Exception as e:
+            self.finished_signal.emit(False, str(e), {})
+
 def is_model_cached(model_id):
-    try:
-        snapshot_download(repo_id=model_id, local_files_only=True)
-        return True
-    except:
-        return False
+    return get_registry().is_available(model_id)
 
 def get_model_path(model_id):
-    try:
-        return snapshot_download(repo_id=model_id, local_files_only=True)
-    except:
-        return None
+    return get_registry().get_path(model_id)
 
 class AudioMonitorThread(QThread):
     volume_signal = pyqtSignal(bool)
     audio_data_signal = pyqtSignal(np.ndarray)
 
-    def __init__(self, device_index=None, threshold=VOLUME_THRESHOLD, sensitivity=1.0):
+    def __init__(self, device_index=None, threshold=VOLUME_THRESHOLD, sensitivity=1.0, cpu_budget=None):
         super().__init__()
         self.running = True
+        self.cpu_budget = cpu_budget
         self.device_index = device_index
         self.threshold = threshold
         self.sensitivity = sensitivity
@@ -245,6 +280,7 @@ class AudioMonitorThread(QThread):
         return devices
 
     def run(self):
+        if self.cpu_budget: self.cpu_budget.apply_audio()
         while self.running:
             # 1. VERIFICAR SI HAY UN CAMBIO PENDIENTE
             if self.trigger_device_change:
@@ -280,84 +316,490 @@ class AudioMonitorThread(QThread):
             except: pass
         self.p.terminate()
 
+class AudioRingBuffer:
+    """Buffer circular preasignado: escribir un chunk no crea arrays nuevos."""
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=np.float32)
+        self.write_pos = 0
+        self.count = 0    # Muestras válidas en el buffer
+        self.pending = 0  # Muestras nuevas desde la última predicción
+        self.total = 0    # Muestras escritas desde el inicio (índice absoluto)
+
+    def write(self, chunk):
+        n = len(chunk)
+        if n >= self.capacity:
+            self.data[:] = chunk[-self.capacity:]
+            self.write_pos = 0
+        else:
+            end = self.write_pos + n
+            if end <= self.capacity:
+                self.data[self.write_pos:end] = chunk
+            else:
+                first = self.capacity - self.write_pos
+                self.data[self.write_pos:] = chunk[:first]
+                self.data[:n - first] = chunk[first:]
+            self.write_pos = end % self.capacity
+        self.count = min(self.capacity, self.count + n)
+        self.pending = min(self.capacity, self.pending + n)
+        self.total += n
+
+    def latest(self, n, lag=0):
+        """Devuelve n muestras que terminan 'lag' muestras antes de la última, como 1 o 2 vistas (sin copiar)."""
+        start = (self.write_pos - lag - n) % self.capacity
+        if start + n <= self.capacity:
+            return (self.data[start:start + n],)
+        return (self.data[start:], self.data[:start + n - self.capacity])
+
+    def clear(self):
+        self.write_pos = 0
+        self.count = 0
+        self.pending = 0
+        self.total = 0
+
 class EmotionThread(QThread):
     emotion_signal = pyqtSignal(str) 
 
-    def __init__(self):
+    def __init__(self, cpu_budget=None):
         super().__init__()
         self.running = True
-        self.audio_buffer = np.array([], dtype=np.float32)
-        self.buffer_lock = threading.Lock()
+        self.cpu_budget = cpu_budget
         self.points = int(RATE * EMOTION_WINDOW_SECONDS)
+        self.hop_points = self.points # Sin solapamiento por defecto
+        self.ring = AudioRingBuffer(self.points * 2)
+        self.buffer_lock = threading.Lock()
         
-        # Detección automática de hardware para PyTorch
-        if torch.backends.mps.is_available(): self.device = torch.device("mps")
-        elif torch.cuda.is_available(): self.device = torch.device("cuda")
-        else: self.device = torch.device("cpu")
-
+        self.device = None # Se detecta al cargar un modelo en este proceso
         self.feat = None
+        self.fast_feat = None
+        self.conv_cache = None
+        self.conv_check = None # (caché, salto) por verificar: run() lo hace fuera de la UI
         self.model = None
+        self.engine = None # Backend sin transformers (prosodia, motor NumPy, ...)
+        self.cascade = None
+        self.profile_dir = None # Skin activa: de ahí sale la cabeza calibrada
+        self.calibrated = False
+        self.base_heads = None # Cabeza original del modelo torch, para cambiar de calibración
+        self.pending_calibration = None # Skin nueva: run() cambia la cabeza entre predicciones
         self.current_model_key = None
         self.map = {}
+        self.avatar_states = ["neutral"]
+        self.precision_requested = "fp32"
+        self.precision = "fp32"
+        self.mmap_weights = True
+        self.runtime = "torch" # "numpy": wav2vec2 sin torch si el modelo lo permite
+
+        # Daemon de inferencia (None = siempre en este proceso)
+        self.daemon_socket = None
+        self.daemon_autostart = False
+        self.daemon_variants = []
+        self.remote = None
+        self.pending_model_key = None # Carga diferida: la hace run() sin bloquear la UI
+
+        # Profundidad del encoder (0 = todas las capas / salida temprana desactivada)
+        self.encoder_layers = 0
+        self.exit_confidence = 0.0
+        self.exit_min_layers = 1
+        self.last_depth = 0
+
+        # Ventana lista para predecir (la prepara run() bajo el lock)
+        self.window_input = None
+        self.window_features = None
+        self.window_rms = 0.0
 
     def set_model(self, model_key):
+        """Carga el modelo ya; con daemon la carga se hace en el hilo (arrancarlo y cargar puede tardar minutos)."""
+        if self.daemon_socket:
+            self.load_in_background(model_key)
+        else:
+            self.load_model(model_key)
+
+    def load_model(self, model_key):
         config = SUPPORTED_MODELS.get(model_key)
         if not config: return
         
         self.current_model_key = model_key
         self.map = config["mapping"]
+        self.avatar_states = config["avatar_states"]
         model_id = config["id"]
 
         print(f"🧠 Cargando modelo: {config['name']} ({model_id})...")
+        if is_engine_backend(config):
+            self.engine = load_engine(config)
+            self.cascade = None # El motor ya es el nivel barato
+            print(f"✅ Motor {self.engine.backend} listo.")
+            return
+        if self.runtime == "numpy" and self.load_numpy(config):
+            return
+        if self.daemon_socket and self.connect_daemon():
+            return
+        self.load_local(config)
+
+    def load_in_background(self, model_key):
+        """Como set_model, pero la carga ocurre dentro del hilo al arrancar."""
+        self.pending_model_key = model_key
+        self.current_model_key = model_key
+
+    def release(self):
+        """Suelta el modelo y sus buffers. Llamar con el hilo detenido."""
+        if self.remote is not None:
+            self.remote.close()
+            self.remote = None
+        self.model = self.feat = self.fast_feat = self.conv_cache = self.conv_check = self.engine = self.base_heads = None
+        self.window_input = self.window_features = None
+        self.ring.clear()
+
+    def load_local(self, config):
+        """Inferencia en este proceso: aquí se paga el import de torch y la carga."""
         try:
-            self.feat = Wav2Vec2FeatureExtractor.from_pretrained(model_id)
-            if "ehcalabres" in model_id:
-                # Usamos nuestra clase personalizada
-                self.model = EhcalabresModel.from_pretrained(model_id).to(self.device)
-            else:
-                # Usamos la carga estándar para otros modelos
-                self.model = AutoModelForAudioClassification.from_pretrained(model_id).to(self.device)
+            from emotion_models import load_emotion_model, detect_device, resolve_precision
+            if self.device is None: self.device = detect_device()
+            self.precision = resolve_precision(self.precision_requested, self.device)
+            self.feat, self.model = load_emotion_model(config, self.device, self.precision, self.mmap_weights)
+            self.init_fast_features()
+            self.apply_encoder_depth()
+            self.apply_calibration(config)
+            self.init_conv_cache()
             print("✅ Modelo IA cargado correctamente.")
         except Exception as e:
             print(f"❌ Error cargando modelo: {e}")
             self.running = False
 
+    def set_runtime(self, runtime):
+        """torch o numpy (ver numpy_engine.py). Llamar antes de set_model."""
+        self.runtime = runtime
+
+    def load_numpy(self, config):
+        """wav2vec2 en NumPy, sin importar torch. False = se usa el camino de torch."""
+        from numpy_engine import NumpyEngine
+        try:
+            engine = NumpyEngine.load(config)
+            if engine is None: return False
+            engine.set_encoder_depth(self.encoder_layers, self.exit_confidence, self.exit_min_layers)
+            if self.profile_dir is not None:
+                import calibration
+                self.calibrated = engine.apply_calibration(
+                    calibration.head_path(self.profile_dir, self.current_model_key),
+                    config.get("revision"), self.encoder_layers)
+        except Exception as e:
+            print(f"⚠️ Motor NumPy no disponible ({e}), se usa torch.")
+            return False
+        self.engine = engine
+        self.precision = "fp32"
+        self.last_depth = engine.last_depth
+        print("✅ Modelo IA cargado en el motor NumPy (sin torch).")
+        return True
+
+    def runs_outside_torch(self):
+        """El wav2vec2 no es un modelo torch de este proceso (daemon o motor NumPy)."""
+        return self.remote is not None or (self.engine is not None and self.engine.backend == "numpy")
+
+    def set_daemon(self, socket_path, autostart=False, variants=None):
+        """Usar el daemon de inferencia si responde (None = desactivado). Llamar antes de set_model."""
+        self.daemon_socket = socket_path
+        self.daemon_autostart = autostart
+        self.daemon_variants = variants or []
+
+    def connect_daemon(self):
+        """Carga el modelo en el daemon. False = no hay daemon y se usa la inferencia en proceso."""
+        from inference_daemon import DaemonClient, DaemonError
+        client = DaemonClient.connect(self.daemon_socket, autostart=self.daemon_autostart)
+        if client is None:
+            print("ℹ️ Daemon de inferencia no disponible, se carga el modelo en este proceso.")
+            return False
+        try:
+            info = client.load(self.current_model_key, self.daemon_options())
+        except DaemonError as e:
+            print(f"⚠️ El daemon no pudo cargar el modelo ({e}), se carga en este proceso.")
+            client.close()
+            return False
+        self.remote = client
+        self.precision = info["precision"]
+        self.calibrated = info["calibrated"]
+        self.last_depth = info["depth"]
+        print(f"🔌 Inferencia en el daemon (pid {info['pid']}, {'modelo ya en memoria' if info['warm'] else 'carga nueva'}).")
+        return True
+
+    def daemon_options(self):
+        return {"precision": self.precision_requested, "mmap": self.mmap_weights,
+                "encoder_layers": self.encoder_layers, "exit_confidence": self.exit_confidence,
+                "min_layers": self.exit_min_layers, "profile_dir": self.profile_dir,
+                "variants": self.daemon_variants}
+
+    def set_precision(self, precision):
+        """fp32, int8, fp16 o auto (la variante rápida del dispositivo). Llamar antes de set_model."""
+        self.precision_requested = precision
+
+    def set_calibration(self, profile_dir):
+        """Carpeta de la skin activa, para usar su cabeza calibrada. Llamar antes de set_model."""
+        self.profile_dir = profile_dir
+
+    def change_calibration(self, profile_dir):
+        """Cambio de skin con el modelo ya cargado: solo se cambia la cabeza calibrada, sin recargar."""
+        self.pending_calibration = profile_dir
+
+    def swap_calibration(self):
+        """Aplica la calibración de la skin pedida (en el hilo, entre predicciones)."""
+        self.profile_dir, self.pending_calibration = self.pending_calibration, None
+        config = SUPPORTED_MODELS.get(self.current_model_key)
+        if config is None: return
+        if self.remote is not None:
+            from inference_daemon import DaemonError
+            try:
+                self.calibrated = self.remote.calibrate(self.current_model_key, self.daemon_options())["calibrated"]
+            except DaemonError as e:
+                print(f"⚠️ Se perdió el daemon de inferencia ({e}), se carga el modelo en este proceso.")
+                self.remote.close()
+                self.remote = None
+                self.load_local(config)
+        elif self.engine is not None:
+            if not hasattr(self.engine, "apply_calibration"): return # Prosodia y otros motores sin cabeza
+            import calibration
+            try:
+                self.calibrated = self.engine.apply_calibration(
+                    calibration.head_path(self.profile_dir, self.current_model_key),
+                    config.get("revision"), self.encoder_layers)
+            except Exception as e:
+                print(f"⚠️ No se pudo aplicar la calibración: {e}")
+        elif self.model is not None:
+            self.apply_calibration(config)
+
+    def apply_calibration(self, config):
+        self.calibrated = False
+        import calibration
+        try:
+            # La cabeza original se guarda una vez: cada skin parte de ella
+            if self.base_heads is None: self.base_heads = calibration.original_heads(self.model)
+            calibration.restore_heads(self.model, self.base_heads)
+            if self.profile_dir is None: return
+            self.calibrated = calibration.apply_calibration(
+                self.model, calibration.head_path(self.profile_dir, self.current_model_key),
+                config.get("revision"), self.encoder_layers)
+        except Exception as e:
+            print(f"⚠️ No se pudo aplicar la calibración: {e}")
+
+    def set_cascade(self, confidence):
+        """
+        Cascada prosodia -> wav2vec2 (0 = desactivada). La prosodia da una emoción
+        provisional al instante y el modelo solo corre si ella duda o cambia.
+        """
+        if confidence > 0:
+            from emotion_cascade import EmotionCascade
+            self.cascade = EmotionCascade(confidence)
+        else:
+            self.cascade = None
+
+    def set_mmap_weights(self, enabled):
+        """Mapear los pesos en memoria en lugar de copiarlos (ver mmap_weights.py)."""
+        self.mmap_weights = enabled
+
+    def set_hop(self, seconds):
+        """Salto entre predicciones. Menor que la ventana = ventanas solapadas."""
+        self.hop_points = max(CHUNK_SIZE, min(self.points, int(RATE * seconds)))
+
+    def init_conv_cache(self):
+        """Con ventanas solapadas reutiliza los frames convolucionales ya calculados."""
+        self.conv_cache = None
+        self.conv_check = None
+        if self.hop_points >= self.points: return
+        from wav2vec2_runtime import ConvFeatureCache
+        if not ConvFeatureCache.supports(self.model, self.points):
+            print("ℹ️ Caché convolucional no disponible para este modelo (GroupNorm), pasada completa.")
+            return
+        cache = ConvFeatureCache(self.model, self.points, self.device)
+        # El salto debe caer en la grilla de frames para poder reutilizarlos
+        stride = cache.stride
+        hop = max(stride, self.hop_points - self.hop_points % stride)
+        # La verificación corre el modelo varias veces: la hace run(), no el hilo que llamó a set_model
+        self.conv_check = (cache, hop)
+
+    def check_conv_cache(self):
+        """Activa la caché solo si, con su cota de deriva, predice como la pasada completa."""
+        cache, hop = self.conv_check
+        self.conv_check = None
+        try:
+            report = cache.check_equivalence(hop)
+        except Exception as e:
+            print(f"⚠️ No se pudo verificar la caché convolucional ({e}), pasada completa.")
+            return
+        if not report["passed"]:
+            print(f"ℹ️ Caché convolucional desactivada: difiere de la pasada completa "
+                  f"(coincidencia {report['top1_agreement']:.0%}, Δp máx {report['max_prob_diff']:.3f}).")
+            return
+        with self.buffer_lock:
+            self.conv_cache, self.hop_points = cache, hop
+        print(f"♻️ Caché convolucional activa (salto de {self.hop_points / RATE:.2f}s, "
+              f"Δp máx {report['max_prob_diff']:.3f} frente a la pasada completa)")
+
+    def set_encoder_depth(self, num_layers=0, exit_confidence=0.0, min_layers=1):
+        """Configura truncado del encoder y salida temprana. Llamar antes de set_model."""
+        self.encoder_layers = num_layers
+        self.exit_confidence = exit_confidence
+        self.exit_min_layers = max(1, min_layers)
+
+    def apply_encoder_depth(self):
+        from wav2vec2_runtime import supports_depth_control, truncate_encoder
+        if not supports_depth_control(self.model):
+            if self.encoder_layers or self.exit_confidence:
+                print("ℹ️ Este modelo no permite ajustar la profundidad del encoder.")
+            self.exit_confidence = 0.0
+            return
+        if self.encoder_layers > 0:
+            layers = truncate_encoder(self.model, self.encoder_layers)
+            print(f"✂️ Encoder truncado a {layers} capas.")
+        self.last_depth = len(self.model.wav2vec2.encoder.layers)
+
+    def init_fast_features(self):
+        """Activa el preprocesado rápido solo si coincide con el extractor original."""
+        from emotion_models import FastFeatureExtractor
+        self.fast_feat = FastFeatureExtractor.from_extractor(self.feat, self.points, self.device)
+        if self.fast_feat is None:
+            print("ℹ️ Preprocesado rápido no compatible con este extractor, usando transformers.")
+        elif not self.fast_feat.check_parity(self.feat):
+            print("⚠️ El preprocesado rápido no coincide con el extractor, usando transformers.")
+            self.fast_feat = None
+
     def add_audio(self, chunk):
         with self.buffer_lock:
-            self.audio_buffer = np.concatenate((self.audio_buffer, chunk))
-            if len(self.audio_buffer) > self.points * 2:
-                self.audio_buffer = self.audio_buffer[-self.points * 2:]
+            self.ring.write(chunk)
+
+    def prepare_window(self):
+        """Copia y normaliza la última ventana del ring. Llamar con buffer_lock tomado."""
+        self.window_features = None
+        if self.engine is not None or self.remote is not None:
+            self.window_input = np.concatenate(self.ring.latest(self.points))
+            self.window_rms = np.sqrt(np.dot(self.window_input, self.window_input) / self.points)
+            return
+        lag = 0
+        if self.conv_cache is not None:
+            # La ventana termina en el último múltiplo del stride (<20 ms de retraso)
+            lag = self.ring.total % self.conv_cache.stride
+
+        segments = self.ring.latest(self.points, lag)
+        total = sum(float(s.sum()) for s in segments)
+        energy = sum(float(np.dot(s, s)) for s in segments)
+        self.window_rms = np.sqrt(energy / self.points)
+        if self.window_rms < VOLUME_THRESHOLD:
+            return
+
+        if self.conv_cache is not None:
+            from emotion_models import FastFeatureExtractor
+            window_end = self.ring.total - lag
+            mean = total / self.points
+            var = max(energy / self.points - mean * mean, 0.0)
+            inv_std = 1.0 / np.sqrt(var + FastFeatureExtractor.EPSILON)
+            # Si el volumen cambió más de la cota, pide la ventana entera y recalcula todos los frames
+            needed = self.conv_cache.samples_needed(window_end, mean, inv_std)
+            self.conv_cache.ingest(window_end, self.ring.latest(needed, lag), mean, inv_std)
+        elif self.fast_feat is not None:
+            self.window_input = self.fast_feat(segments)
+        else:
+            audio = np.concatenate(segments)
+            self.window_input = self.feat(audio, sampling_rate=RATE, return_tensors="pt", padding=True).input_values.to(self.device)
+
+    def cheap_window(self):
+        """Ventana corta para el nivel rápido de la cascada, o None si no habla. Con buffer_lock tomado."""
+        cascade = self.cascade
+        if not cascade.due(self.ring.total) or self.ring.count < cascade.points:
+            return None
+        cascade.last_total = self.ring.total
+        recent = self.ring.latest(cascade.step_points)
+        energy = sum(float(np.dot(s, s)) for s in recent)
+        if np.sqrt(energy / cascade.step_points) < VOLUME_THRESHOLD:
+            return None
+        return np.concatenate(self.ring.latest(cascade.points))
 
     def run(self):
+        if self.pending_model_key is not None:
+            self.load_model(self.pending_model_key)
+            self.pending_model_key = None
+        if self.cpu_budget: self.cpu_budget.apply_inference(configure_torch=self.model is not None)
         while self.running:
-            proc = None
+            if self.pending_calibration is not None:
+                self.swap_calibration()
+            if self.conv_check is not None:
+                self.check_conv_cache()
+            ready = False
+            cheap_audio = None
             with self.buffer_lock:
-                if len(self.audio_buffer) >= self.points:
-                    proc = self.audio_buffer[-self.points:]
-                    self.audio_buffer = np.array([], dtype=np.float32)
-            
-            if proc is not None and self.model is not None: 
-                self.predict(proc)
-            time.sleep(0.1)
-
-    def predict(self, audio):
+                if self.cascade is not None:
+                    cheap_audio = self.cheap_window()
+                if self.ring.pending >= self.hop_points and self.ring.count >= self.points:
+                    ready = self.model is not None or self.engine is not None or self.remote is not None
+                    if ready:
+                        self.prepare_window()
+                    self.ring.pending = 0
+
+            if cheap_audio is not None:
+                label = self.cascade.on_cheap_window(cheap_audio, self.ring.total)
+                if label is not None:
+                    self.emotion_signal.emit(label if label in self.avatar_states else "neutral")
+
+            if ready:
+                if (self.cascade is None or self.window_rms < VOLUME_THRESHOLD
+                        or self.cascade.needs_model()):
+                    self.predict()
+            # En cascada se revisa más seguido para reaccionar en ~100 ms
+            time.sleep(0.05 if self.cascade is not None else 0.1)
+
+    def predict(self):
         try:
-            if np.sqrt(np.mean(audio**2)) < VOLUME_THRESHOLD:
+            if self.window_rms < VOLUME_THRESHOLD:
+                if self.cascade is not None: self.cascade.on_silence()
                 self.emotion_signal.emit("neutral")
                 return
-            
-            inp = self.feat(audio, sampling_rate=RATE, return_tensors="pt", padding=True).input_values.to(self.device)
-            with torch.no_grad(): 
-                logits = self.model(inp).logits
-            
-            pid = torch.argmax(logits, dim=-1).item()
-            lbl = str(self.model.config.id2label[pid]).lower()
+
+            if self.engine is not None:
+                lbl, _ = self.engine.predict(self.window_input)
+            elif self.remote is not None:
+                lbl = self.predict_remote()
+            else:
+                lbl = self.predict_local()
+            if lbl is None: return
             
             mapped_emotion = self.map.get(lbl, "neutral")
+            if self.cascade is not None: self.cascade.on_model_result(mapped_emotion)
             self.emotion_signal.emit(mapped_emotion)
         except Exception as e: 
             pass
 
+    def predict_local(self):
+        import torch
+        from wav2vec2_runtime import run_with_early_exit, classify_features
+        with torch.no_grad(): 
+            if self.conv_cache is not None:
+                # Los frames convolucionales salen de la caché, fuera del lock
+                self.window_features = self.conv_cache.window_frames()
+
+            if self.exit_confidence > 0:
+                logits, self.last_depth = run_with_early_exit(
+                    self.model, self.window_input, self.exit_confidence, self.exit_min_layers,
+                    extract_features=self.window_features)
+            elif self.window_features is not None:
+                logits = classify_features(self.model, self.window_features)
+            else:
+                logits = self.model(self.window_input).logits
+        
+        pid = torch.argmax(logits, dim=-1).item()
+        return str(self.model.config.id2label[pid]).lower()
+
+    def predict_remote(self):
+        """Etiqueta calculada por el daemon; si se cae, se pasa a inferencia en proceso."""
+        from inference_daemon import DaemonError
+        try:
+            lbl, _, self.last_depth = self.remote.predict(self.window_input)
+            return lbl
+        except DaemonError as e:
+            print(f"⚠️ Se perdió el daemon de inferencia ({e}), se carga el modelo en este proceso.")
+            self.remote.close()
+            self.remote = None
+            self.load_local(SUPPORTED_MODELS[self.current_model_key])
+            return None
+
     def stop(self):
         self.running = False
-        self.wait()
\ No newline at end of file
+        self.wait()
+        if self.remote is not None:
+            self.remote.close()
+        if self.cascade is not None and self.cascade.cheap_runs:
+            print(self.cascade.summary())
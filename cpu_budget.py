@@ -0,0 +1,133 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+import os
+
+def available_cores():
+    """Núcleos que el proceso puede usar (respeta taskset/cgroups en Linux)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def parse_core_list(text):
+    """Convierte '0,2,4-7' en [0, 2, 4, 5, 6, 7]. Ignora entradas inválidas."""
+    cores = set()
+    if isinstance(text, (list, tuple)):
+        return sorted(int(c) for c in text if str(c).strip().isdigit())
+    for part in str(text or "").split(","):
+        part = part.strip()
+        if not part: continue
+        try:
+            if "-" in part:
+                start, end = part.split("-", 1)
+                cores.update(range(int(start), int(end) + 1))
+            else:
+                cores.add(int(part))
+        except ValueError:
+            print(f"⚠️ Núcleo inválido en el presupuesto de CPU: '{part}'")
+    return sorted(cores)
+
+def pin_current_thread(cores):
+    """
+    Fija el hilo que llama a estos núcleos. En Linux sched_setaffinity(0, ...)
+    afecta solo al hilo actual, y los hilos que cree después (p.ej. el pool
+    OpenMP de torch) heredan la máscara. En otros sistemas no hace nada.
+    """
+    if not cores or not hasattr(os, "sched_setaffinity"):
+        return False
+    try:
+        os.sched_setaffinity(0, set(cores))
+        return True
+    except OSError as e:
+        print(f"⚠️ No se pudo fijar afinidad de CPU {cores}: {e}")
+        return False
+
+def configure_torch_threads(num_threads, interop_threads):
+    """Ajusta los pools de torch. interop solo se puede fijar una vez por proceso."""
+    import torch
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+    if interop_threads > 0:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # Ya hubo trabajo paralelo en este proceso; se aplica al reiniciar la app
+            pass
+
+class CpuBudget:
+    """Reparto de núcleos entre la inferencia y la captura de audio."""
+    def __init__(self, enabled=False, inference_cores=None, audio_core=None,
+                 torch_threads=0, interop_threads=1):
+        self.enabled = enabled
+        self.inference_cores_requested = parse_core_list(inference_cores)
+        self.audio_core_requested = audio_core
+        self.torch_threads_requested = torch_threads
+        self.interop_threads = interop_threads
+
+    @classmethod
+    def from_config(cls, config_manager):
+        return cls(
+            enabled=config_manager.get("cpu_budget_enabled", False),
+            inference_cores=config_manager.get("cpu_inference_cores", ""),
+            audio_core=config_manager.get("cpu_audio_core"),
+            torch_threads=config_manager.get("cpu_torch_threads", 0),
+            interop_threads=config_manager.get("cpu_interop_threads", 1),
+        )
+
+    @property
+    def audio_core(self):
+        """Núcleo dedicado al audio: el configurado o el último disponible."""
+        cores = available_cores()
+        if self.audio_core_requested in cores:
+            return self.audio_core_requested
+        return cores[-1] if len(cores) > 1 else None
+
+    @property
+    def inference_cores(self):
+        """Núcleos de inferencia, nunca incluye el núcleo de audio."""
+        allowed = set(available_cores())
+        audio = self.audio_core
+        cores = [c for c in self.inference_cores_requested if c in allowed]
+        if not cores:
+            cores = sorted(allowed)
+        cores = [c for c in cores if c != audio]
+        return cores or sorted(allowed)
+
+    @property
+    def torch_threads(self):
+        if self.torch_threads_requested > 0:
+            return self.torch_threads_requested
+        return len(self.inference_cores)
+
+    def apply_inference(self, configure_torch=True):
+        """
+        Llamar al inicio de EmotionThread.run(), antes de la primera inferencia.
+        Con configure_torch=False (inferencia en el daemon) solo fija la afinidad.
+        """
+        if not self.enabled: return
+        cores = self.inference_cores
+        pinned = pin_current_thread(cores)
+        if configure_torch:
+            configure_torch_threads(self.torch_threads, self.interop_threads)
+        print(f"🧮 Presupuesto CPU IA: núcleos={cores if pinned else 'sin afinidad'}, "
+              f"threads={self.torch_threads}, interop={self.interop_threads}")
+
+    def apply_audio(self):
+        """Llamar al inicio de AudioMonitorThread.run()."""
+        if not self.enabled: return
+        core = self.audio_core
+        if core is not None and pin_current_thread([core]):
+            print(f"🎧 Captura de audio fijada al núcleo {core}")
@@ -0,0 +1,46 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+import os
+
+# Backends de emoción que no pasan por transformers. Cada motor expone
+# predict(audio) -> (estado_avatar, confianza) y reset(). Los modelos "torch"
+# (wav2vec2) los sigue cargando EmotionThread directamente.
+
+def create_prosody(config):
+    from prosody_engine import ProsodyEngine
+    path = config.get("path")
+    if path and os.path.isfile(path):
+        return ProsodyEngine.from_file(path)
+    return ProsodyEngine()
+
+def create_student(config):
+    from student_model import StudentEngine
+    return StudentEngine.load(config["path"])
+
+ENGINE_BACKENDS = {
+    "prosody": create_prosody,
+    "student": create_student,
+}
+
+def backend_of(config):
+    return config.get("backend", "torch")
+
+def is_engine_backend(config):
+    return backend_of(config) in ENGINE_BACKENDS
+
+def load_engine(config):
+    return ENGINE_BACKENDS[backend_of(config)](config)
@@ -0,0 +1,100 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+from prosody_engine import ProsodyEngine, RATE
+
+class EmotionCascade:
+    """
+    Cascada de dos niveles para EmotionThread.
+
+    Nivel 1 (prosodia, ~1 ms): cada step_seconds analiza los últimos
+    window_seconds y, si su etiqueta cambia, la muestra de inmediato como
+    emoción provisional (~100 ms tras empezar a hablar).
+
+    Nivel 2 (wav2vec2): al completar su ventana solo se ejecuta si la
+    prosodia duda (confianza < umbral) o si su etiqueta cambió desde la
+    última vez que corrió el modelo. Su resultado confirma o corrige el
+    provisional y se mantiene mientras la prosodia siga igual.
+    """
+    def __init__(self, confidence=0.7, window_seconds=0.5, step_seconds=0.1, rate=RATE):
+        # Línea base lenta: se llama 10 veces por segundo
+        self.engine = ProsodyEngine(rate=rate, baseline_alpha=0.01)
+        self.confidence = confidence
+        self.points = int(rate * window_seconds)
+        self.step_points = int(rate * step_seconds)
+        self.last_total = 0
+
+        self.cheap_label = None
+        self.cheap_confidence = 0.0
+        self.confirmed_label = None # Etiqueta de prosodia cuando corrió el modelo
+        self.shown = None
+
+        # Contadores
+        self.cheap_runs = 0
+        self.provisional = 0
+        self.model_runs = 0
+        self.model_skipped = 0
+        self.overrides = 0
+
+    def due(self, total):
+        """¿Hay step_points muestras nuevas desde el último análisis rápido?"""
+        return total - self.last_total >= self.step_points
+
+    def on_cheap_window(self, audio, total):
+        """Nivel 1. Devuelve la etiqueta a mostrar ya, o None si no hay cambio."""
+        self.last_total = total
+        features = self.engine.extract(audio)
+        self.cheap_runs += 1
+        if features is None:
+            return None
+        probs = self.engine.probabilities(features)
+        idx = int(probs.argmax())
+        self.cheap_label, self.cheap_confidence = self.engine.states[idx], float(probs[idx])
+        if self.cheap_label != self.confirmed_label and self.cheap_label != self.shown:
+            self.shown = self.cheap_label
+            self.provisional += 1
+            return self.cheap_label
+        return None
+
+    def needs_model(self):
+        """Nivel 2: ¿vale la pena la pasada de wav2vec2 para esta ventana?"""
+        need = (self.cheap_label is None or self.cheap_confidence < self.confidence
+                or self.cheap_label != self.confirmed_label)
+        if not need:
+            self.model_skipped += 1
+        return need
+
+    def on_model_result(self, label):
+        self.model_runs += 1
+        if self.shown is not None and label != self.shown:
+            self.overrides += 1
+        self.shown = label
+        self.confirmed_label = self.cheap_label
+
+    def on_silence(self):
+        self.shown = "neutral"
+        self.cheap_label = None
+        self.confirmed_label = None
+
+    def stats(self):
+        return {"cheap_runs": self.cheap_runs, "provisional": self.provisional, "model_runs": self.model_runs,
+                "model_skipped": self.model_skipped, "overrides": self.overrides}
+
+    def summary(self):
+        total = self.model_runs + self.model_skipped
+        saved = self.model_skipped / total * 100 if total else 0.0
+        return (f"⚡ Cascada: {self.provisional} provisionales, {self.model_runs} pasadas del modelo, "
+                f"{self.model_skipped} evitadas ({saved:.0f}%), {self.overrides} correcciones")
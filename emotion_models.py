@@ -0,0 +1,198 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+import numpy as np
+import torch
+from torch import nn
+from transformers import AutoConfig, AutoModelForAudioClassification, Wav2Vec2FeatureExtractor, Wav2Vec2PreTrainedModel, Wav2Vec2Model
+from artifact_cache import get_artifact_cache, default_precision, ARTIFACTS_DIR
+from mmap_weights import ensure_safetensors, load_mmap_model
+
+RATE = 16000
+
+# Todo lo que necesita torch/transformers para la inferencia en proceso.
+# core_systems lo importa solo al cargar un modelo, de modo que la app
+# arranca sin pagar "import torch" cuando la inferencia vive en el daemon
+# (ver inference_daemon.py).
+
+def detect_device():
+    """Detección automática de hardware para PyTorch."""
+    if torch.backends.mps.is_available(): return torch.device("mps")
+    if torch.cuda.is_available(): return torch.device("cuda")
+    return torch.device("cpu")
+
+def resolve_precision(precision, device):
+    """fp32, int8, fp16 o auto (la variante rápida del dispositivo)."""
+    precision = default_precision(device) if precision == "auto" else precision
+    if precision == "int8" and device.type != "cpu":
+        print("ℹ️ La variante int8 solo corre en CPU, se usa fp32.")
+        precision = "fp32"
+    return precision
+
+class EhcalabresHead(nn.Module):
+    """La 'cabeza' específica que estructura las capas internas"""
+    def __init__(self, config):
+        super().__init__()
+        # Replicamos exactamente 'classifier.dense'
+        self.dense = nn.Linear(config.hidden_size, config.hidden_size)
+        self.dropout = nn.Dropout(getattr(config, "final_dropout", 0.1))
+        # Replicamos exactamente 'classifier.output'
+        self.output = nn.Linear(config.hidden_size, config.num_labels)
+
+    def forward(self, features, **kwargs):
+        x = features
+        x = self.dropout(x)
+        x = self.dense(x)
+        x = torch.tanh(x)
+        x = self.dropout(x)
+        x = self.output(x)
+        return x
+
+class EhcalabresModel(Wav2Vec2PreTrainedModel):
+    """El modelo principal que contiene la cabeza"""
+    def __init__(self, config):
+        super().__init__(config)
+        self.wav2vec2 = Wav2Vec2Model(config)
+        self.dropout = nn.Dropout(getattr(config, "final_dropout", 0.1))
+        
+        # AQUÍ ESTÁ LA MAGIA:
+        # Al llamar a esto 'self.classifier' y usar la clase de arriba...
+        # ...se crean automáticamente 'classifier.dense' y 'classifier.output'
+        self.classifier = EhcalabresHead(config)
+        
+        self.init_weights()
+
+    def forward(self, input_values):
+        outputs = self.wav2vec2(input_values)
+        hidden_states = outputs[0]
+        # Promedio (Mean Pooling)
+        hidden_states = torch.mean(hidden_states, dim=1)
+        logits = self.classifier(hidden_states)
+        return type('ModelOutput', (object,), {'logits': logits})
+
+def load_mapped_model(config):
+    """Pesos safetensors mapeados en memoria (compartidos entre procesos). None si no se puede."""
+    try:
+        files = ensure_safetensors(config, ARTIFACTS_DIR)
+        if not files: return None
+        if config.get("architecture") == "ehcalabres":
+            model_config = EhcalabresModel.config_class.from_pretrained(config["path"])
+            build = lambda: EhcalabresModel(model_config)
+        else:
+            model_config = AutoConfig.from_pretrained(config["path"])
+            build = lambda: AutoModelForAudioClassification.from_config(model_config)
+        return load_mmap_model(build, files)
+    except Exception as e:
+        print(f"⚠️ Carga mapeada no disponible ({e}), se usa la carga normal.")
+        return None
+
+def load_emotion_model(config, device=None, precision="fp32", mmap=True):
+    """
+    Carga extractor y modelo desde la ruta registrada (evita recorrer el caché del Hub).
+    Con precision != "fp32" usa la variante optimizada si ya está construida; si
+    no, con mmap=True intenta mapear los pesos en memoria en vez de copiarlos.
+    """
+    source = config.get("path") or config["id"]
+    feat = Wav2Vec2FeatureExtractor.from_pretrained(source)
+    model = get_artifact_cache().load(config, "torch", precision) if precision != "fp32" else None
+    if model is not None:
+        print(f"⚡ Usando variante optimizada {precision}.")
+    elif mmap and (model := load_mapped_model(config)) is not None:
+        print("🗺️ Pesos mapeados en memoria (safetensors).")
+    elif config.get("architecture") == "ehcalabres":
+        # Usamos nuestra clase personalizada
+        model = EhcalabresModel.from_pretrained(source)
+    else:
+        # Usamos la carga estándar para otros modelos
+        model = AutoModelForAudioClassification.from_pretrained(source)
+    return feat, model.to(device) if device is not None else model
+
+def build_missing_variants(config, precisions, should_stop=None):
+    """
+    Construye las variantes optimizadas que falten para la revisión actual. Devuelve las construidas.
+    should_stop() se consulta entre pasos: si devuelve True se corta sin dejar nada a medias.
+    """
+    stop = should_stop or (lambda: False)
+    built = []
+    cache = get_artifact_cache()
+    cache.invalidate_stale(config)
+    for precision in cache.missing_variants(config, precisions):
+        if stop(): break
+        try:
+            # Copia fp32 propia en CPU: no toca el modelo que está infiriendo
+            _, model = load_emotion_model(config)
+            if stop(): break
+            if cache.build(config, model, "torch", precision, should_stop=stop) is None: break
+            built.append(precision)
+        except Exception as e:
+            print(f"⚠️ No se pudo construir la variante {precision}: {e}")
+    return built
+
+class FastFeatureExtractor:
+    """
+    Reemplazo del Wav2Vec2FeatureExtractor para ventanas mono de largo fijo.
+    Solo hace la normalización zero-mean/unit-variance, escribiendo en un buffer
+    preasignado que comparte memoria con el tensor de entrada (torch.from_numpy).
+    """
+    EPSILON = 1e-7 # Mismo valor que zero_mean_unit_var_norm de transformers
+
+    def __init__(self, length, device, do_normalize=True):
+        self.length = length
+        self.do_normalize = do_normalize
+        self.buffer = np.zeros(length, dtype=np.float32)
+        self.tensor = torch.from_numpy(self.buffer).unsqueeze(0)
+        if device.type == "cpu":
+            self.device_tensor = self.tensor
+        else:
+            self.device_tensor = torch.empty((1, length), dtype=torch.float32, device=device)
+
+    @staticmethod
+    def supports(feat):
+        """Solo cubrimos el caso simple: mono, 16 kHz, sin padding real."""
+        return (getattr(feat, "feature_size", 1) == 1
+                and getattr(feat, "sampling_rate", RATE) == RATE
+                and not getattr(feat, "return_attention_mask", False))
+
+    @classmethod
+    def from_extractor(cls, feat, length, device):
+        if not cls.supports(feat): return None
+        return cls(length, device, do_normalize=getattr(feat, "do_normalize", True))
+
+    def __call__(self, segments):
+        """Normaliza las vistas del ring buffer dentro del buffer preasignado."""
+        buf = self.buffer
+        pos = 0
+        for seg in segments:
+            buf[pos:pos + len(seg)] = seg
+            pos += len(seg)
+
+        if self.do_normalize:
+            mean = buf.mean()
+            np.subtract(buf, mean, out=buf)
+            var = np.dot(buf, buf) / self.length
+            np.multiply(buf, 1.0 / np.sqrt(var + self.EPSILON), out=buf)
+
+        if self.device_tensor is not self.tensor:
+            self.device_tensor.copy_(self.tensor, non_blocking=True)
+        return self.device_tensor
+
+    def check_parity(self, feat, atol=1e-4):
+        """Compara contra el extractor original sobre una señal de prueba."""
+        rng = np.random.default_rng(0)
+        audio = (rng.standard_normal(self.length) * 0.1).astype(np.float32)
+        ref = feat(audio, sampling_rate=RATE, return_tensors="np", padding=True).input_values[0]
+        fast = self((audio,)).detach().cpu().numpy()[0]
+        return ref.shape == fast.shape and np.allclose(ref, fast, atol=atol, rtol=1e-4)
@@ -112,12 +112,13 @@ class HotkeyConfigDialog(QDialog):
             "fear": "😨 Emoción: Miedo (Fear)",
             "happiness": "😄 Emoción: Felicidad",
             "sadness": "😢 Emoción: Tristeza",
-            "anger": "😡 Emoción: Enojo"
+            "anger": "😡 Emoción: Enojo",
+            "next_skin": "👕 Siguiente Skin"
         }
 
         self.table.setRowCount(0)
         
-        order = ["mute_toggle", "ai_mode", "neutral", "happiness", "sadness", "anger", "fear", "disgust"]
+        order = ["mute_toggle", "ai_mode", "neutral", "happiness", "sadness", "anger", "fear", "disgust", "next_skin"]
         
         row = 0
         for action in order:
@@ -16,9 +16,12 @@ __status__ = "Production"
 
 import sys
 from PyQt6.QtCore import QObject, pyqtSignal, QEvent, Qt
-from PyQt6.QtWidgets import QApplication
+from PyQt6.QtWidgets import QApplication, QLineEdit, QTextEdit, QPlainTextEdit, QAbstractSpinBox
 from PyQt6.QtGui import QKeySequence
 
+# Widgets donde se escribe: ahí las teclas son texto, no atajos
+TEXT_INPUTS = (QLineEdit, QTextEdit, QPlainTextEdit, QAbstractSpinBox)
+
 class HotkeyManager(QObject):
     hotkey_triggered = pyqtSignal(str)
 
@@ -43,7 +46,8 @@ class HotkeyManager(QObject):
             "anger": "4",
             "surprise": "5",
             "fear": "6",
-            "disgust": "7"
+            "disgust": "7",
+            "next_skin": ""
         }
 
         final_hotkeys = default_hotkeys.copy()
@@ -91,6 +95,9 @@ class HotkeyManager(QObject):
     def eventFilter(self, obj, event):
         try:
             if event.type() == QEvent.Type.KeyPress:
+                # El filtro es de toda la app: sin esto, escribir "3" en un campo cambiaría la emoción
+                if isinstance(QApplication.focusWidget(), TEXT_INPUTS):
+                    return super().eventFilter(obj, event)
                 key_val = self._safe_get_value(event.key())
                 mod_val = self._safe_get_value(event.modifiers())
                 
@@ -0,0 +1,498 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+import os
+import sys
+import copy
+import json
+import stat
+import time
+import struct
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import socketserver
+from collections import OrderedDict
+import numpy as np
+
+# Daemon de inferencia local. Mantiene los modelos cargados entre sesiones de
+# la app: el primer arranque paga import torch + carga + calentamiento y los
+# siguientes solo abren un socket Unix. La app (EmotionThread) le envía
+# ventanas de audio y recibe la etiqueta; si no hay daemon, infiere en proceso.
+#
+# Protocolo: cada mensaje es [largo de la cabecera (4 bytes, big-endian)]
+# [cabecera JSON][payload binario de header["payload"] bytes]. El audio viaja
+# como float32 crudo, sin pasar por JSON.
+#
+#   ping                                -> {pid, sessions}
+#   load    {model_key, options}        -> {session, precision, calibrated, depth, warm, pid}
+#   predict {session} + audio float32   -> {label, confidence, depth}
+#   calibrate {session, model_key, options} -> {session, calibrated}  (cambio de skin)
+#   shutdown
+
+# Este módulo no importa torch: la app lo usa como cliente sin pagar ese coste.
+
+DEFAULT_IDLE_TIMEOUT = 3600  # Segundos sin clientes antes de salir y liberar la memoria
+MAX_SESSIONS = 2             # Modelos/configuraciones que se mantienen cargados a la vez
+CONNECT_TIMEOUT = 0.5
+STARTUP_TIMEOUT = 15.0       # Espera a que un daemon recién lanzado abra su socket
+LOAD_TIMEOUT = 600.0         # La primera carga incluye import torch y leer los pesos
+PREDICT_TIMEOUT = 5.0
+WARMUP_POINTS = 32000        # 2 s a 16 kHz: la ventana por defecto de la app
+HEADER = struct.Struct(">I")
+
+class DaemonError(Exception):
+    """El daemon no responde o rechazó la petición."""
+
+def daemon_supported():
+    return hasattr(socket, "AF_UNIX")
+
+def private_dir():
+    """
+    Carpeta 0700 del usuario dentro del temporal compartido (sin XDG_RUNTIME_DIR).
+    En /tmp otro usuario podría crear antes el socket y recibir el audio del
+    micrófono: None si la carpeta existe y no es nuestra o la pueden abrir otros.
+    """
+    uid = os.getuid()
+    folder = os.path.join(tempfile.gettempdir(), f"alterego-{uid}")
+    try:
+        os.mkdir(folder, 0o700)
+    except FileExistsError:
+        pass
+    except OSError:
+        return None
+    st = os.lstat(folder) # lstat: un symlink plantado por otro no cuenta como nuestra carpeta
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != uid or st.st_mode & 0o077:
+        print(f"⚠️ {folder} no es una carpeta privada de este usuario, el daemon queda desactivado.")
+        return None
+    return folder
+
+def default_socket_path():
+    """Un socket por usuario: XDG_RUNTIME_DIR si existe, si no una carpeta privada en el temporal."""
+    env = os.environ.get("ALTEREGO_DAEMON_SOCKET")
+    if env: return env
+    if not daemon_supported(): return None
+    folder = os.environ.get("XDG_RUNTIME_DIR") or private_dir()
+    if folder is None: return None
+    return os.path.join(folder, f"alterego-inference-{os.getuid()}.sock")
+
+def peer_uid(sock):
+    """uid del proceso al otro lado del socket Unix, o None si el sistema no lo informa."""
+    if hasattr(socket, "SO_PEERCRED"): # Linux: struct ucred {pid, uid, gid}
+        creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        return struct.unpack("3i", creds)[1]
+    if hasattr(socket, "LOCAL_PEERCRED"): # macOS/BSD: struct xucred {version, uid, ...}
+        creds = sock.getsockopt(0, socket.LOCAL_PEERCRED, struct.calcsize("IIh16I"))
+        return struct.unpack_from("II", creds)[1]
+    return None
+
+# --- PROTOCOLO ---
+def recv_exact(sock, n):
+    data = bytearray(n)
+    view = memoryview(data)
+    pos = 0
+    while pos < n:
+        got = sock.recv_into(view[pos:])
+        if not got:
+            raise ConnectionError("conexión cerrada")
+        pos += got
+    return data
+
+def send_message(sock, header, payload=b""):
+    header = dict(header, payload=len(payload))
+    raw = json.dumps(header).encode("utf-8")
+    sock.sendall(HEADER.pack(len(raw)) + raw)
+    if payload:
+        sock.sendall(payload)
+
+def recv_message(sock):
+    size = HEADER.unpack(recv_exact(sock, HEADER.size))[0]
+    header = json.loads(recv_exact(sock, size).decode("utf-8"))
+    payload = recv_exact(sock, header.get("payload", 0)) if header.get("payload") else b""
+    return header, payload
+
+# --- CLIENTE (lado de la app) ---
+def try_connect(path, timeout=CONNECT_TIMEOUT):
+    if not daemon_supported() or not os.path.exists(path): return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+        # El audio solo se envía a un daemon del mismo usuario
+        uid = peer_uid(sock)
+        if uid is None: uid = os.stat(path).st_uid
+    except OSError:
+        sock.close()
+        return None
+    if uid != os.getuid():
+        print(f"⚠️ El socket {path} pertenece a otro usuario (uid {uid}), no se usa.")
+        sock.close()
+        return None
+    return sock
+
+def daemon_command(socket_path, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    if getattr(sys, "frozen", False):
+        cmd = [sys.executable, "--inference-daemon"]
+    else:
+        cmd = [sys.executable, os.path.abspath(__file__)]
+    return cmd + ["--socket", socket_path, "--idle-timeout", str(idle_timeout)]
+
+def spawn_daemon(socket_path, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    """Lanza el daemon desacoplado de la app (sobrevive a que se cierre)."""
+    log_path = os.path.splitext(socket_path)[0] + ".log"
+    try:
+        with open(log_path, "a") as log:
+            subprocess.Popen(daemon_command(socket_path, idle_timeout), cwd=os.getcwd(),
+                             stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                             start_new_session=True, close_fds=True)
+        print(f"🚀 Daemon de inferencia lanzado (log: {log_path})")
+        return True
+    except OSError as e:
+        print(f"⚠️ No se pudo lanzar el daemon de inferencia: {e}")
+        return False
+
+class DaemonClient:
+    """Conexión de la app con el daemon. Todos los fallos se reportan como DaemonError."""
+    def __init__(self, sock):
+        self.sock = sock
+        self.session = None
+
+    @classmethod
+    def connect(cls, socket_path=None, autostart=False, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        """Cliente conectado, o None si no hay daemon (y no se pudo lanzar)."""
+        if not daemon_supported(): return None
+        path = socket_path or default_socket_path()
+        if path is None: return None
+        sock = try_connect(path)
+        if sock is None and autostart and spawn_daemon(path, idle_timeout):
+            deadline = time.monotonic() + STARTUP_TIMEOUT
+            while sock is None and time.monotonic() < deadline:
+                time.sleep(0.1)
+                sock = try_connect(path)
+        return cls(sock) if sock is not None else None
+
+    def request(self, header, payload=b"", timeout=PREDICT_TIMEOUT):
+        try:
+            self.sock.settimeout(timeout)
+            send_message(self.sock, header, payload)
+            reply, data = recv_message(self.sock)
+        except (OSError, ValueError) as e:
+            raise DaemonError(str(e) or type(e).__name__)
+        if not reply.get("ok"):
+            raise DaemonError(reply.get("error", "error desconocido"))
+        return reply, data
+
+    def ping(self):
+        return self.request({"op": "ping"})[0]
+
+    def load(self, model_key, options):
+        reply, _ = self.request({"op": "load", "model_key": model_key, "options": options}, timeout=LOAD_TIMEOUT)
+        self.session = reply["session"]
+        return reply
+
+    def predict(self, audio):
+        """(etiqueta del modelo, confianza, capas usadas) para una ventana float32."""
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        reply, _ = self.request({"op": "predict", "session": self.session}, audio.tobytes())
+        return reply["label"], reply["confidence"], reply["depth"]
+
+    def calibrate(self, model_key, options):
+        """Cambia a la cabeza calibrada de options["profile_dir"] sin recargar el modelo."""
+        reply, _ = self.request({"op": "calibrate", "session": self.session, "model_key": model_key,
+                                 "options": options})
+        self.session = reply["session"]
+        return reply
+
+    def shutdown(self):
+        self.request({"op": "shutdown"})
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+# --- SERVIDOR ---
+class DaemonSession:
+    """Un modelo cargado con sus opciones (precisión, profundidad, calibración de la skin)."""
+    def __init__(self, config, options):
+        from emotion_models import load_emotion_model, detect_device, resolve_precision
+        from wav2vec2_runtime import supports_depth_control, truncate_encoder
+        import calibration
+
+        self.device = detect_device()
+        self.precision = resolve_precision(options.get("precision", "fp32"), self.device)
+        self.feat, self.model = load_emotion_model(config, self.device, self.precision, options.get("mmap", True))
+        self.exit_confidence = options.get("exit_confidence", 0.0)
+        self.min_layers = max(1, options.get("min_layers", 1))
+        encoder_layers = options.get("encoder_layers", 0)
+        self.depth = 0
+        if supports_depth_control(self.model):
+            if encoder_layers > 0:
+                truncate_encoder(self.model, encoder_layers)
+            self.depth = len(self.model.wav2vec2.encoder.layers)
+        else:
+            self.exit_confidence = 0.0
+
+        self.base_heads = calibration.original_heads(self.model)
+        self.apply_calibration(config, options)
+        self.fast_feat = {} # largo de ventana -> FastFeatureExtractor (o None si no es compatible)
+
+    def apply_calibration(self, config, options):
+        import calibration
+        self.calibrated = False
+        calibration.restore_heads(self.model, self.base_heads)
+        if options.get("profile_dir"): # Solo afecta si la skin trae head.pt (ver session_key)
+            try:
+                self.calibrated = calibration.apply_calibration(
+                    self.model, calibration.head_path(options["profile_dir"], config["key"]),
+                    config.get("revision"), options.get("encoder_layers", 0))
+            except Exception as e:
+                print(f"⚠️ No se pudo aplicar la calibración: {e}")
+
+    def with_calibration(self, config, options):
+        """La misma sesión con la cabeza de otra skin: comparte el encoder, no recarga nada."""
+        import calibration
+        session = copy.copy(self)
+        session.model = calibration.share_encoder(self.model)
+        session.apply_calibration(config, options)
+        return session
+
+    def features(self, audio):
+        from emotion_models import FastFeatureExtractor, RATE
+        n = len(audio)
+        if n not in self.fast_feat:
+            fast = FastFeatureExtractor.from_extractor(self.feat, n, self.device)
+            self.fast_feat[n] = fast if fast is not None and fast.check_parity(self.feat) else None
+        if self.fast_feat[n] is not None:
+            return self.fast_feat[n]((audio,))
+        return self.feat(audio, sampling_rate=RATE, return_tensors="pt", padding=True).input_values.to(self.device)
+
+    def predict(self, audio):
+        import torch
+        from wav2vec2_runtime import run_with_early_exit
+        inputs = self.features(audio)
+        with torch.no_grad():
+            if self.exit_confidence > 0:
+                logits, self.depth = run_with_early_exit(self.model, inputs, self.exit_confidence, self.min_layers)
+            else:
+                logits = self.model(inputs).logits
+        probs = torch.softmax(logits.float(), dim=-1)[0]
+        pid = int(probs.argmax())
+        return str(self.model.config.id2label[pid]).lower(), float(probs[pid]), self.depth
+
+    def warm_up(self, points):
+        self.predict(np.zeros(points, dtype=np.float32))
+
+def session_key(config, options):
+    """Misma configuración = misma sesión. Incluye la cabeza calibrada para notar reentrenamientos."""
+    head = None
+    if options.get("profile_dir"):
+        import calibration
+        path = calibration.head_path(options["profile_dir"], config["key"])
+        if os.path.isfile(path): head = [path, os.path.getmtime(path)]
+    relevant = {k: options.get(k) for k in ("precision", "mmap", "encoder_layers", "exit_confidence", "min_layers")}
+    return json.dumps([config["key"], config.get("revision"), relevant, head], sort_keys=True)
+
+class InferenceDaemon:
+    def __init__(self, socket_path, idle_timeout=DEFAULT_IDLE_TIMEOUT, max_sessions=MAX_SESSIONS):
+        self.socket_path = socket_path
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict() # LRU: clave -> DaemonSession
+        self.lock = threading.Lock()  # Una carga o inferencia a la vez
+        self.clients_lock = threading.Lock()
+        self.clients = 0
+        self.last_activity = time.monotonic()
+        self.optimized = set()
+        self.server = None
+
+    def dispatch(self, header, payload):
+        op = header.get("op")
+        try:
+            if op == "ping":
+                return {"ok": True, "pid": os.getpid(), "sessions": len(self.sessions)}
+            if op == "load":
+                return self.load(header["model_key"], header.get("options", {}))
+            if op == "predict":
+                return self.predict(header.get("session"), payload)
+            if op == "calibrate":
+                return self.calibrate(header.get("session"), header["model_key"], header.get("options", {}))
+            if op == "shutdown":
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return {"ok": True}
+            return {"ok": False, "error": f"operación desconocida: {op}"}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+
+    def load(self, model_key, options):
+        from model_registry import SUPPORTED_MODELS, get_registry
+        from emotion_backends import is_engine_backend
+        get_registry().load() # La app pudo descargar o registrar modelos desde el último pedido
+        config = SUPPORTED_MODELS.get(model_key)
+        if config is None or is_engine_backend(config):
+            return {"ok": False, "error": f"modelo no servible por el daemon: {model_key}"}
+        key = session_key(config, options)
+        with self.lock:
+            warm = key in self.sessions
+            if warm:
+                self.sessions.move_to_end(key)
+            else:
+                print(f"🧠 Cargando {config['name']}...")
+                t0 = time.perf_counter()
+                session = DaemonSession(config, options)
+                session.warm_up(WARMUP_POINTS)
+                self.sessions[key] = session
+                while len(self.sessions) > self.max_sessions:
+                    self.sessions.popitem(last=False)
+                print(f"✅ {config['name']} listo en {time.perf_counter() - t0:.1f}s ({session.precision}).")
+            session = self.sessions[key]
+        self.optimize_later(config, options.get("variants") or [])
+        return {"ok": True, "session": key, "precision": session.precision, "calibrated": session.calibrated,
+                "depth": session.depth, "warm": warm, "pid": os.getpid()}
+
+    def optimize_later(self, config, variants):
+        """Las variantes optimizadas se construyen aquí, no en la app (que ya no tiene torch)."""
+        if not variants or not config.get("revision") or config["key"] in self.optimized: return
+        self.optimized.add(config["key"])
+        def build():
+            from emotion_models import build_missing_variants
+            built = build_missing_variants(config, variants)
+            if built: print(f"✅ Variantes optimizadas de {config['key']}: {', '.join(built)}")
+        threading.Thread(target=build, daemon=True).start()
+
+    def calibrate(self, key, model_key, options):
+        """Otra skin con el mismo modelo: nueva sesión que comparte el encoder de la actual."""
+        from model_registry import SUPPORTED_MODELS
+        config = SUPPORTED_MODELS.get(model_key)
+        if config is None:
+            return {"ok": False, "error": f"modelo desconocido: {model_key}"}
+        new_key = session_key(config, options)
+        with self.lock:
+            if new_key not in self.sessions:
+                session = self.sessions.get(key)
+                if session is None:
+                    return {"ok": False, "error": "sesión desconocida (el daemon la descartó)"}
+                # Otros clientes pueden seguir usando la sesión actual: no se toca su cabeza
+                self.sessions[new_key] = session.with_calibration(config, options)
+                while len(self.sessions) > self.max_sessions:
+                    self.sessions.popitem(last=False)
+            self.sessions.move_to_end(new_key)
+            session = self.sessions[new_key]
+        return {"ok": True, "session": new_key, "calibrated": session.calibrated}
+
+    def predict(self, key, payload):
+        audio = np.frombuffer(payload, dtype=np.float32)
+        with self.lock:
+            session = self.sessions.get(key)
+            if session is None:
+                return {"ok": False, "error": "sesión desconocida (el daemon la descartó)"}
+            label, confidence, depth = session.predict(audio)
+        return {"ok": True, "label": label, "confidence": confidence, "depth": depth}
+
+    def client_count(self, delta):
+        with self.clients_lock:
+            self.clients += delta
+            self.last_activity = time.monotonic()
+
+    def watch_idle(self):
+        while True:
+            time.sleep(min(30.0, self.idle_timeout))
+            if self.clients == 0 and time.monotonic() - self.last_activity > self.idle_timeout:
+                print("💤 Sin clientes, el daemon se cierra para liberar memoria.")
+                self.server.shutdown()
+                return
+
+    def claim_socket(self):
+        """False si ya hay otro daemon atendiendo; borra sockets huérfanos."""
+        sock = try_connect(self.socket_path)
+        if sock is not None:
+            sock.close()
+            return False
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        return True
+
+    def serve(self):
+        if not daemon_supported():
+            print("❌ Este sistema no tiene sockets Unix.")
+            return 1
+        if not self.claim_socket():
+            print(f"ℹ️ Ya hay un daemon atendiendo en {self.socket_path}")
+            return 0
+        daemon = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                try:
+                    if peer_uid(self.request) not in (None, os.getuid()): return # Solo el mismo usuario
+                except OSError:
+                    return
+                daemon.client_count(+1)
+                try:
+                    while True:
+                        try:
+                            header, payload = recv_message(self.request)
+                        except (ConnectionError, OSError, ValueError):
+                            break
+                        send_message(self.request, daemon.dispatch(header, payload))
+                finally:
+                    daemon.client_count(-1)
+
+        old_umask = os.umask(0o077) # Solo el usuario puede conectarse
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        finally:
+            os.umask(old_umask)
+        self.server.daemon_threads = True
+        if self.idle_timeout > 0:
+            threading.Thread(target=self.watch_idle, daemon=True).start()
+        print(f"🔌 Daemon de inferencia escuchando en {self.socket_path} (pid {os.getpid()})")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+        return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Daemon de inferencia de (AI)terEgo")
+    parser.add_argument("--socket", default=None, help="Ruta del socket Unix")
+    parser.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT,
+                        help="Segundos sin clientes antes de salir (0 = nunca)")
+    parser.add_argument("--stop", action="store_true", help="Detener el daemon que esté corriendo")
+    args = parser.parse_args(argv)
+    path = args.socket or default_socket_path()
+    if path is None:
+        print("❌ No hay una carpeta privada para el socket (usa --socket).")
+        return 1
+
+    if args.stop:
+        client = DaemonClient.connect(path)
+        if client is None:
+            print("ℹ️ No hay daemon corriendo.")
+            return 0
+        client.shutdown()
+        client.close()
+        print("🛑 Daemon detenido.")
+        return 0
+    return InferenceDaemon(path, args.idle_timeout).serve()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,15 +15,16 @@ __maintainer__ = "JJaroll"
 __status__ = "Production"
 
 import sys
+import math
 import multiprocessing
 import numpy as np
 import os
 import ctypes
-from PyQt6.QtWidgets import (QApplication, QLabel, QMainWindow, QVBoxLayout, 
-                             QWidget, QHBoxLayout, QSizeGrip, QGraphicsDropShadowEffect, 
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, 
+                             QWidget, QHBoxLayout, QSizeGrip, 
                              QPushButton, QSizePolicy, QMessageBox, QSystemTrayIcon, QMenu, QSplashScreen)
-from PyQt6.QtCore import Qt, QTimer, QUrl, QPoint, QPropertyAnimation, QEasingCurve, QSize
-from PyQt6.QtGui import (QPixmap, QPainter, QColor, QTransform, QShortcut, 
+from PyQt6.QtCore import Qt, QTimer, QUrl, QPoint, QPropertyAnimation, QEasingCurve, QSize, QEvent
+from PyQt6.QtGui import (QPixmap, QImage, QPainter, QColor, QShortcut, 
                          QKeySequence, QDesktopServices, QPen, QFont, QBrush, QIcon, QAction)
 
 # --- IMPORTS LOCALES ---
@@ -32,10 +33,21 @@ from background import BackgroundManager
 from mac_gui import MacWindowControls
 from config_manager import ConfigManager
 from hotkey_manager import HotkeyManager
-from core_systems import AudioMonitorThread, EmotionThread, SUPPORTED_MODELS, ModelDownloaderThread, is_model_cached
+from cpu_budget import CpuBudget
+from render_cache import RenderCache, FrameKey, render_frame, bake_shadow, shadow_margin
+from skin_loader import SkinLoader
+from transitions import TransitionCache, TransitionContext, avatar_states, crossfade, TRANSITION_FRAMES
+from avatar_state import AvatarState, AvatarStateStore
+from shm_output import ShmFrameWriter, DEFAULT_NAME as SHM_DEFAULT_NAME
+import calibration
+from inference_daemon import default_socket_path, daemon_supported
+from resource_monitor import memory_usage, release_memory, format_bytes
+from core_systems import AudioMonitorThread, EmotionThread, SUPPORTED_MODELS, ModelDownloaderThread, ModelOptimizerThread, is_model_cached
 from update_manager import UpdateChecker, CURRENT_VERSION
 from settings_window import SettingsDialog
-from ui_components import PillProgressBar, DownloadDialog, TutorialOverlay
+from ui_components import PillProgressBar, DownloadDialog, TutorialOverlay, FrameClock, AvatarWidget, GlowButton
+
+AI_PULSE_INTERVAL_MS = 50 # Ritmo del pulso del modo IA (20 pasos por segundo, como el original)
 
 def resource_path(relative_path):
     try:
@@ -54,10 +66,13 @@ class PNGTuberApp(QMainWindow):
         self.config = self.config_manager.load_config()
         self.current_version = CURRENT_VERSION
 
-        # Estado
-        self.current_emotion = "neutral"
-        self.is_speaking = False
-        self.is_muted = self.config.get("is_muted", False)
+        # Estado del avatar: una instantánea inmutable; los cambios de un mismo frame se pintan juntos
+        screen = QApplication.primaryScreen()
+        self.avatar_state = AvatarStateStore(AvatarState(
+            emotion="neutral", speaking=False, muted=self.config.get("is_muted", False),
+            flipped=False, shadow=self.config.get("shadow_enabled", True)),
+            screen.refreshRate() if screen else 60.0)
+        self.avatar_state.render_requested.connect(self.render_pending)
         self.mic_sensitivity = self.config.get("mic_sensitivity", 1.0)
         self.audio_threshold = self.config.get("audio_threshold", 0.02)
         
@@ -66,25 +81,49 @@ class PNGTuberApp(QMainWindow):
         self.bounce_amplitude = self.config.get("bounce_amplitude", 10)
         self.bounce_speed = self.config.get("bounce_speed", 0.3)
         self.bounce_phase = 0
-        self.shadow_enabled = self.config.get("shadow_enabled", True)
         self.current_background = self.config.get("background_color", "transparent")
-        self.is_flipped = False
+        self.render_cache = RenderCache(self.config.get("render_cache_mb", 64))
+        self.current_frame_key = None
+        # Rebote y pulso IA comparten un reloj al ritmo de la pantalla que se para en reposo
+        self.frame_clock = FrameClock(screen.refreshRate() if screen else 60.0)
+        # Con la ventana oculta, minimizada o tapada solo se sigue el estado lógico
+        self.render_suspended = False
+        self.exposure_watched = False
+        # Fundidos entre estados (opcionales), generados en segundo plano
+        self.crossfade_enabled = self.config.get("crossfade_enabled", False)
+        self.crossfade_ms = self.config.get("crossfade_ms", 90)
+        self.crossfade = None
+        self.transitions = TransitionCache(self.config.get("crossfade_cache_mb", 96))
+        self.transitions.ready.connect(self.on_transitions_ready)
+        self.transition_timer = QTimer()
+        self.transition_timer.setSingleShot(True)
+        self.transition_timer.timeout.connect(self.build_transitions)
 
         # Gestores
         self.profile_manager = AvatarProfileManager()
         profile_name = self.config.get("current_profile", "Default")
         self.profile_manager.set_profile(profile_name)
+        self.skin_loader = SkinLoader(self.profile_manager.root_folder, self.config.get("skin_cache_mb", 128))
+        self.skin_loader.load_now(self.profile_manager.current_profile)
+        self.skin_loader.set_active(self.profile_manager.current_profile)
 
         self.init_ui()
 
+        # Salida de frames por memoria compartida para OBS / compositores (opcional)
+        self.shm_output = None
+        if self.config.get("shm_output_enabled", False):
+            self.start_shm_output()
+
         # Audio e IA
+        self.cpu_budget = CpuBudget.from_config(self.config_manager)
         saved_mic = self.config.get("microphone_index")
-        self.audio_thread = AudioMonitorThread(device_index=saved_mic, threshold=self.audio_threshold, sensitivity=self.mic_sensitivity)
+        self.audio_thread = AudioMonitorThread(device_index=saved_mic, threshold=self.audio_threshold, sensitivity=self.mic_sensitivity, cpu_budget=self.cpu_budget)
         self.audio_thread.volume_signal.connect(self.update_mouth)
         self.audio_thread.audio_data_signal.connect(self.handle_audio)
         self.audio_thread.start()
 
         self.emotion_thread = None
+        self.model_optimizer = None
         QTimer.singleShot(100, self.check_initial_model)
 
         # Update Checker
@@ -94,22 +133,21 @@ class PNGTuberApp(QMainWindow):
             self.update_checker.update_available.connect(self.on_update_found) 
             self.update_checker.start()
 
-        # Animación
-        self.bounce_timer = QTimer()
-        self.bounce_timer.timeout.connect(self.animate_bounce)
-        QTimer.singleShot(1000, lambda: self.bounce_timer.start(50)) 
- 
         # Hotkeys
         self.ai_mode = True
         self.hotkey_manager = HotkeyManager(self.config_manager)
         self.hotkey_manager.hotkey_triggered.connect(self.handle_hotkey)
         QTimer.singleShot(1000, self.hotkey_manager.start_listening)
+
+        # En modo manual prolongado el modelo se descarga para liberar memoria
+        self.idle_unload_timer = QTimer()
+        self.idle_unload_timer.setSingleShot(True)
+        self.idle_unload_timer.timeout.connect(self.unload_emotion_system)
+        self.unloaded_model_key = None
         
         self.update_avatar()
 
-        # Timer para animación de "Thinking" (AI Mode)
-        self.ai_pulse_timer = QTimer()
-        self.ai_pulse_timer.timeout.connect(self.animate_ai_pulse)
+        # Animación de "Thinking" (AI Mode), movida por frame_clock
         self.ai_pulse_alpha = 0
         self.ai_pulse_direction = 1
 
@@ -124,6 +162,22 @@ class PNGTuberApp(QMainWindow):
         self.will_quit = False
         self.tray_message_shown = False
 
+    # Lecturas del estado del avatar; se modifica solo a través de avatar_state.update()
+    @property
+    def current_emotion(self): return self.avatar_state.state.emotion
+
+    @property
+    def is_speaking(self): return self.avatar_state.state.speaking
+
+    @property
+    def is_muted(self): return self.avatar_state.state.muted
+
+    @property
+    def is_flipped(self): return self.avatar_state.state.flipped
+
+    @property
+    def shadow_enabled(self): return self.avatar_state.state.shadow
+
     def init_ui(self):
 
         if os.name == 'nt':  # Si es Windows
@@ -186,10 +240,9 @@ class PNGTuberApp(QMainWindow):
         self.layout.addLayout(top_bar)
 
         # --- AVATAR ---
-        self.avatar_label = QLabel(self)
-        self.avatar_label.setAlignment(Qt.AlignmentFlag.AlignBottom | Qt.AlignmentFlag.AlignHCenter)
-        self.avatar_label.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Ignored)
-        self.layout.addWidget(self.avatar_label, 1)
+        self.avatar_widget = AvatarWidget(self)
+        self.avatar_widget.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Ignored)
+        self.layout.addWidget(self.avatar_widget, 1)
 
         # --- DOCK INFERIOR ---
         self.bottom_container = QWidget()
@@ -287,12 +340,6 @@ class PNGTuberApp(QMainWindow):
 
         self.last_color_hex = "#00E64D"
 
-        self.shadow_effect = QGraphicsDropShadowEffect()
-        self.shadow_effect.setBlurRadius(20)
-        self.shadow_effect.setColor(QColor(0, 0, 0, 150))
-        self.shadow_effect.setOffset(0, 5)
-        self.set_shadow_enabled(self.shadow_enabled)
-
         self.sizegrip = QSizeGrip(self)
         self.sizegrip.setStyleSheet("QSizeGrip { background-color: transparent; width: 20px; height: 20px; }")
 
@@ -344,7 +391,7 @@ class PNGTuberApp(QMainWindow):
             } 
         """
 
-        self.btn_ai = QPushButton("🤖")
+        self.btn_ai = GlowButton("🤖")
         self.btn_ai.setFixedSize(36, 36)
         self.btn_ai.setToolTip("Modo Automático")
         self.btn_ai.setStyleSheet(base_style)
@@ -375,12 +422,12 @@ class PNGTuberApp(QMainWindow):
             self.expand_btn.setToolTip("Ver emociones no disponibles")
 
     def toggle_flip(self):
-        self.is_flipped = not self.is_flipped
-        self.update_avatar()
+        self.avatar_state.update(flipped=not self.is_flipped)
 
     def open_settings_window(self):
         dialog = SettingsDialog(self)
         dialog.exec()
+        dialog.deleteLater() # Tiene a la ventana como padre: sin esto sigue viva oculta
 
     def toggle_emotions_menu(self):
         if not self.extra_emotion_btns: return
@@ -410,21 +457,36 @@ class PNGTuberApp(QMainWindow):
             self.animation.setEasingCurve(QEasingCurve.Type.OutCubic)
             self.animation.start()
 
-    def animate_bounce(self):
+    def update_bounce(self):
+        """El rebote solo ocupa el reloj mientras se habla con el rebote activado."""
         if self.bounce_enabled and self.is_speaking:
-            self.bounce_phase += self.bounce_speed
-            offset = int(abs(np.sin(self.bounce_phase)) * self.bounce_amplitude)
-            self.avatar_label.setContentsMargins(0, 0, 0, offset)
-        elif self.bounce_phase != 0:
+            self.frame_clock.start("bounce", self.animate_bounce)
+        else:
+            self.frame_clock.stop("bounce")
             self.bounce_phase = 0
-            self.avatar_label.setContentsMargins(0, 0, 0, 0)
+            self.avatar_widget.set_offset(0)
+
+    def animate_bounce(self, dt):
+        # bounce_speed está expresado por paso de 50 ms
+        self.bounce_phase += self.bounce_speed * dt / 0.05
+        self.avatar_widget.set_offset(abs(math.sin(self.bounce_phase)) * self.bounce_amplitude)
+
+    def start_ai_pulse(self):
+        # El brillo avanza en pasos de 5 cada 50 ms: no hace falta llamarlo en cada refresco
+        self.frame_clock.start("ai_pulse", self.animate_ai_pulse, AI_PULSE_INTERVAL_MS)
 
-    def animate_ai_pulse(self):
+    def stop_ai_pulse(self):
+        self.frame_clock.stop("ai_pulse")
+        if hasattr(self, 'btn_ai'):
+            self.btn_ai.set_glow(None)
+
+    def animate_ai_pulse(self, dt):
         if not self.ai_mode or not hasattr(self, 'btn_ai'):
-            self.ai_pulse_timer.stop()
+            self.stop_ai_pulse()
             return
 
-        self.ai_pulse_alpha += 5 * self.ai_pulse_direction
+        # 100 unidades de alfa por segundo (5 cada 50 ms)
+        self.ai_pulse_alpha += 100 * dt * self.ai_pulse_direction
         
         if self.ai_pulse_alpha >= 100:
             self.ai_pulse_alpha = 100
@@ -432,61 +494,209 @@ class PNGTuberApp(QMainWindow):
         elif self.ai_pulse_alpha <= 0:
             self.ai_pulse_alpha = 0
             self.ai_pulse_direction = 1
-            
-        glow_color = f"rgba(0, 200, 255, {self.ai_pulse_alpha})"
-        border_color = f"rgba(255, 255, 255, {50 + self.ai_pulse_alpha})"
-        
-        style = f"""
-            QPushButton {{ 
-                background-color: rgba(255,255,255,200); 
-                border-radius: 18px; 
-                border: 2px solid {glow_color};
-                background-color: {border_color};
-                font-size: 16px;
-            }} 
-            QPushButton:hover {{ background-color: rgba(255,255,255,255); }}
-        """
-        self.btn_ai.setStyleSheet(style)
+
+        # Solo repinta el botón, y en pasos de 5 como el pulso original (no en cada frame)
+        self.btn_ai.set_glow(int(self.ai_pulse_alpha) // 5 * 5)
 
     def update_avatar(self):
+        """Pide un frame nuevo (skin, tamaño o DPR cambiaron); se pinta junto con el resto de cambios del frame."""
+        self.avatar_state.mark_dirty()
+
+    def render_pending(self):
+        # Suspendido no se decodifica ni escala nada: el estado queda sucio y se pinta al volver
+        if self.render_suspended: return
+        self.render_avatar(self.avatar_state.take())
+
+    def render_avatar(self, avatar, fade=True):
+        """Pinta la instantánea del avatar (una vez por frame como mucho, desde render_pending)."""
         try:
-            state = "open" if self.is_speaking else "closed"
-            path = None
-            if hasattr(self, 'profile_manager'):
-                path = self.profile_manager.get_image_path(self.current_emotion, state)
-            
-            pix = None
-            if path and isinstance(path, str):
-                pix = QPixmap(path)
-            
-            if not pix or pix.isNull():
-                pix = QPixmap(200, 200)
-                pix.fill(QColor("transparent"))
-                painter = QPainter(pix)
-                painter.setBrush(QBrush(QColor(255, 50, 50, 150)))
-                painter.setPen(Qt.PenStyle.NoPen)
-                painter.drawEllipse(10, 10, 180, 180)
-                painter.setPen(QPen(QColor("white")))
-                font = QFont("Arial", 40, QFont.Weight.Bold)
-                painter.setFont(font)
-                painter.drawText(pix.rect(), Qt.AlignmentFlag.AlignCenter, "?")
-                painter.end()
-
-            if self.is_flipped:
-                pix = pix.transformed(QTransform().scale(-1, 1))
-
-            w = self.avatar_label.width()
-            h = self.avatar_label.height()
-            if w > 0 and h > 0:
-                self.avatar_label.setPixmap(pix.scaled(w, h, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation))
+            state = "open" if avatar.speaking else "closed"
+            w = self.avatar_widget.width()
+            h = self.avatar_widget.height()
+            if w <= 0 or h <= 0: return
+            key = FrameKey(self.profile_manager.current_profile, avatar.emotion, state,
+                           w, h, avatar.flipped, self.devicePixelRatioF(), avatar.shadow)
+            if key == self.current_frame_key: return
+
+            pix = self.render_cache.get(key)
+            if pix is None:
+                frame = render_frame(self.load_avatar_source(key.emotion, key.state), w, h, key.flipped, key.dpr)
+                if key.shadow:
+                    frame = bake_shadow(frame, key.dpr)
+                pix = QPixmap.fromImage(frame)
+                self.render_cache.put(key, pix)
+            previous, self.current_frame_key = self.current_frame_key, key
+            margin = shadow_margin(key.dpr) / key.dpr if key.shadow else 0.0
+
+            sequence = self.transition_between(previous, key) if fade else None
+            if sequence and self.crossfade is not None:
+                # A mitad de un fundido lo que se ve es una mezcla, no el frame de previous
+                sequence = self.resume_crossfade(self.crossfade, key, pix)
+            if sequence:
+                # Solo se reproducen frames ya mezclados; el último es el frame normal
+                ms = self.crossfade_ms * (len(sequence) + 1) / (TRANSITION_FRAMES + 1)
+                self.crossfade = {"frames": sequence, "final": pix, "margin": margin, "elapsed": 0.0, "index": 0,
+                                  "origin": previous, "ms": ms}
+                self.avatar_widget.set_frame(sequence[0], margin)
+                self.frame_clock.start("crossfade", self.animate_crossfade)
+            else:
+                self.stop_crossfade()
+                self.avatar_widget.set_frame(pix, margin)
+            self.schedule_transitions()
                 
         except Exception as e:
-            print(f"⚠️ Error controlado en update_avatar: {e}")
+            print(f"⚠️ Error controlado en render_avatar: {e}")
+
+    def transition_context(self, key):
+        model = SUPPORTED_MODELS.get(self.config_manager.get("ai_model", "spanish"), {})
+        return TransitionContext(key.profile, key.width, key.height, key.flipped, key.dpr, key.shadow,
+                                 tuple(model.get("avatar_states", ["neutral"])))
+
+    def transition_between(self, previous, key):
+        if not self.crossfade_enabled or previous is None: return None
+        if previous._replace(emotion=key.emotion, state=key.state) != key: return None # Otro tamaño, skin...
+        return self.transitions.sequence(self.transition_context(key),
+                                         (previous.emotion, previous.state), (key.emotion, key.state))
+
+    def resume_crossfade(self, fade, key, pix):
+        """Frames desde la mezcla que está en pantalla hasta key, para que la imagen no salte."""
+        index = fade["index"]
+        if fade["origin"] == key:
+            # Vuelta atrás (lo típico con la boca): el mismo fundido al revés desde donde iba
+            return fade["frames"][:index][::-1]
+        # Otro estado: se compone en el momento (unos ms, solo en este caso poco frecuente)
+        return crossfade(fade["frames"][index], pix.toImage(), TRANSITION_FRAMES, key.dpr)
+
+    def schedule_transitions(self):
+        """Regenera los fundidos si cambió la skin, el tamaño, el volteo o la sombra (con espera, por los resize)."""
+        if not self.crossfade_enabled or self.current_frame_key is None: return
+        context = self.transition_context(self.current_frame_key)
+        if context != self.transitions.context and context != self.transitions.building:
+            self.transition_timer.start(300)
+
+    def build_transitions(self):
+        key = self.current_frame_key
+        # Sin la skin decodificada, las fuentes se leerían del disco en el hilo GUI: se espera a skin_ready
+        if key is None or not self.skin_loader.is_ready(key.profile): return
+        context = self.transition_context(key)
+        sources = {state: self.load_avatar_source(*state) for state in avatar_states(context.states)}
+        self.transitions.build(context, sources)
+
+    def on_transitions_ready(self, frames):
+        # De paso, los frames finales de cada estado quedan en la caché de render
+        c = self.transitions.context
+        for (emotion, state), image in frames.items():
+            key = FrameKey(c.profile, emotion, state, c.width, c.height, c.flipped, c.dpr, c.shadow)
+            if key not in self.render_cache:
+                self.render_cache.put(key, QPixmap.fromImage(image))
+
+    def animate_crossfade(self, dt):
+        fade = self.crossfade
+        fade["elapsed"] += dt
+        frames = fade["frames"]
+        index = int(fade["elapsed"] * 1000 / fade["ms"] * (len(frames) + 1))
+        if index >= len(frames):
+            self.avatar_widget.set_frame(fade["final"], fade["margin"])
+            self.stop_crossfade()
+        elif index != fade["index"]:
+            fade["index"] = index
+            self.avatar_widget.set_frame(frames[index], fade["margin"])
+
+    def stop_crossfade(self):
+        self.frame_clock.stop("crossfade")
+        self.crossfade = None
+
+    def set_crossfade_enabled(self, enabled):
+        self.crossfade_enabled = enabled
+        self.config_manager.set("crossfade_enabled", enabled)
+        if enabled:
+            self.schedule_transitions()
+        else:
+            self.stop_crossfade()
+            self.transitions.clear()
+
+    def set_crossfade_ms(self, ms):
+        self.crossfade_ms = ms
+        self.config_manager.set("crossfade_ms", ms)
+
+    def start_shm_output(self):
+        self.shm_output = ShmFrameWriter(self.config_manager.get("shm_output_name", SHM_DEFAULT_NAME))
+        self.avatar_widget.frame_listener = self.publish_frame
+        self.publish_frame()
+
+    def stop_shm_output(self):
+        self.avatar_widget.frame_listener = None
+        if self.shm_output is not None:
+            self.shm_output.close()
+            self.shm_output = None
+
+    def publish_frame(self):
+        """Pinta el frame visible directamente en la memoria compartida (sin captura de ventana)."""
+        widget = self.avatar_widget
+        dpr = widget.devicePixelRatioF()
+        width, height = max(1, round(widget.width() * dpr)), max(1, round(widget.height() * dpr))
+        try:
+            image = self.shm_output.begin_frame(width, height, dpr)
+        except OSError as e:
+            print(f"❌ Error en la salida por memoria compartida: {e}")
+            self.stop_shm_output()
+            return
+        image.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(image)
+        widget.paint_frame(painter)
+        painter.end()
+        self.shm_output.commit()
+
+    def set_shm_output_enabled(self, enabled):
+        self.config_manager.set("shm_output_enabled", enabled)
+        if enabled and self.shm_output is None:
+            self.start_shm_output()
+        elif not enabled:
+            self.stop_shm_output()
+        self.update_render_suspension()
+
+    def load_avatar_source(self, emotion, state):
+        """Imagen original de la skin (sin escalar, ya decodificada por skin_loader), o un marcador si no hay ninguna."""
+        path = self.profile_manager.get_image_path(emotion, state)
+        pix = None
+        if path and isinstance(path, str):
+            pix = self.skin_loader.image(self.profile_manager.current_profile, path)
+            if pix is None:
+                pix = QImage(path) # Skin aún sin decodificar (no debería pasar tras change_profile)
+        
+        if not pix or pix.isNull():
+            pix = QImage(200, 200, QImage.Format.Format_ARGB32_Premultiplied)
+            pix.fill(QColor("transparent"))
+            painter = QPainter(pix)
+            painter.setBrush(QBrush(QColor(255, 50, 50, 150)))
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.drawEllipse(10, 10, 180, 180)
+            painter.setPen(QPen(QColor("white")))
+            font = QFont("Arial", 40, QFont.Weight.Bold)
+            painter.setFont(font)
+            painter.drawText(pix.rect(), Qt.AlignmentFlag.AlignCenter, "?")
+            painter.end()
+        return pix
+
+    def invalidate_avatar_frames(self, profile=None):
+        """Los PNG de la skin cambiaron (o se cambió de skin): volver a generar los frames."""
+        self.render_cache.invalidate(profile)
+        self.current_frame_key = None
+        self.transitions.clear()
+
+    def set_skin_cache_budget(self, budget_mb):
+        self.config_manager.set("skin_cache_mb", budget_mb)
+        self.skin_loader.set_budget(budget_mb)
+
+    def set_render_cache_budget(self, budget_mb):
+        self.config_manager.set("render_cache_mb", budget_mb)
+        self.render_cache.set_budget(budget_mb)
    
     def handle_audio(self, chunk):
         if not self.is_muted:
             if self.ai_mode and self.emotion_thread is not None:
                  self.emotion_thread.add_audio(chunk)
+            if self.render_suspended: return # El medidor no se ve
 
             try:
                 rms = np.sqrt(np.mean(chunk**2))
@@ -510,14 +720,12 @@ class PNGTuberApp(QMainWindow):
 
     def update_mouth(self, speaking):
         if self.is_muted: speaking = False
-        if self.is_speaking != speaking:
-            self.is_speaking = speaking
-            self.update_avatar()
+        if self.avatar_state.update(speaking=speaking):
+            self.update_bounce()
 
     def update_emotion(self, emo):
-        if self.ai_mode and self.current_emotion != emo:
-            self.current_emotion = emo
-            self.update_avatar()
+        if self.ai_mode:
+            self.avatar_state.update(emotion=emo)
 
     def handle_hotkey(self, action):
         print(f"Hotkey: {action}")
@@ -526,10 +734,14 @@ class PNGTuberApp(QMainWindow):
             self.set_muted(not self.is_muted)
         elif action == "ai_mode":
             self.ai_mode = True
-            self.current_emotion = "neutral"
-            self.update_avatar()
-            self.ai_pulse_timer.start(50)
+            self.avatar_state.update(emotion="neutral")
+            self.start_ai_pulse()
+            self.idle_unload_timer.stop()
+            if self.emotion_thread is None and self.unloaded_model_key:
+                self.start_emotion_system(self.unloaded_model_key, background=True)
             print("🤖 Modo IA Activado")
+        elif action == "next_skin":
+            self.bg_manager.next_profile()
         else:
             alias_map = {
                 "happiness": "happy",
@@ -556,19 +768,9 @@ class PNGTuberApp(QMainWindow):
 
             if final_state:
                 self.ai_mode = False 
-                self.ai_pulse_timer.stop()
-                if hasattr(self, 'btn_ai'):
-                    self.btn_ai.setStyleSheet("""
-                        QPushButton { 
-                            background-color: rgba(255,255,255,200); 
-                            border-radius: 18px; 
-                            border: none;
-                            font-size: 16px;
-                        } 
-                        QPushButton:hover { background-color: rgba(255,255,255,255); }
-                    """)
-                self.current_emotion = final_state
-                self.update_avatar()
+                self.stop_ai_pulse()
+                self.schedule_idle_unload()
+                self.avatar_state.update(emotion=final_state)
             else:
                 print(f"❌ Acción desconocida: {action}")
 
@@ -592,19 +794,136 @@ class PNGTuberApp(QMainWindow):
         else:
             self.start_emotion_system(current_model_key)
 
-    def start_emotion_system(self, model_key):
+    def start_emotion_system(self, model_key, background=False):
         if self.emotion_thread is not None:
             self.emotion_thread.stop()
+        self.unloaded_model_key = None
             
-        self.emotion_thread = EmotionThread()
-        self.emotion_thread.set_model(model_key)
+        self.emotion_thread = EmotionThread(cpu_budget=self.cpu_budget)
+        self.emotion_thread.set_encoder_depth(
+            self.config_manager.get("encoder_layers", 0),
+            self.config_manager.get("early_exit_confidence", 0.0),
+            self.config_manager.get("early_exit_min_layers", 4))
+        self.emotion_thread.set_hop(self.config_manager.get("emotion_hop_seconds", 2.0))
+        self.emotion_thread.set_precision(self.config_manager.get("model_precision", "fp32"))
+        self.emotion_thread.set_mmap_weights(self.config_manager.get("mmap_weights", True))
+        self.emotion_thread.set_runtime(self.config_manager.get("inference_runtime", "torch"))
+        self.emotion_thread.set_cascade(self.config_manager.get("cascade_confidence", 0.0))
+        self.emotion_thread.set_calibration(
+            os.path.join(self.profile_manager.root_folder, self.profile_manager.current_profile))
+        if self.config_manager.get("inference_daemon", False) and daemon_supported():
+            self.emotion_thread.set_daemon(
+                default_socket_path(), autostart=True,
+                variants=self.wanted_variants())
+        if background:
+            self.emotion_thread.load_in_background(model_key)
+        else:
+            self.emotion_thread.set_model(model_key)
         self.emotion_thread.emotion_signal.connect(self.update_emotion)
         self.emotion_thread.start()
         print(f"✅ Sistema de emociones iniciado con: {model_key}")
         self.config_manager.set("ai_model", model_key)
         self.update_dock_buttons()
         if self.ai_mode:
-            self.ai_pulse_timer.start(50)
+            self.start_ai_pulse()
+        if not background:
+            self.start_model_optimizer(model_key)
+        if not self.ai_mode:
+            self.schedule_idle_unload()
+
+    def schedule_idle_unload(self):
+        """Arranca la cuenta atrás de descarga al pasar a modo manual (no la reinicia)."""
+        minutes = self.config_manager.get("idle_unload_minutes", 5)
+        if minutes > 0 and self.emotion_thread is not None and not self.idle_unload_timer.isActive():
+            self.idle_unload_timer.start(int(minutes * 60000))
+
+    def set_idle_unload_minutes(self, minutes):
+        self.config_manager.set("idle_unload_minutes", minutes)
+        self.idle_unload_timer.stop()
+        if not self.ai_mode:
+            self.schedule_idle_unload()
+
+    def unload_emotion_system(self):
+        """Detiene el hilo de IA y suelta el modelo; vuelve a cargarse al reactivar el modo IA."""
+        if self.ai_mode or self.emotion_thread is None: return
+        before = memory_usage()["rss"]
+        self.unloaded_model_key = self.emotion_thread.current_model_key
+        self.emotion_thread.stop()
+        self.emotion_thread.release()
+        self.emotion_thread = None
+        release_memory()
+        after = memory_usage()["rss"]
+        if before is None or after is None:
+            print("💤 Modelo descargado por inactividad")
+        else:
+            print(f"💤 Modelo descargado por inactividad: RAM {format_bytes(before)} → {format_bytes(after)}")
+
+    def emotion_model_status(self):
+        """Texto corto para el indicador de memoria de Ajustes."""
+        thread = self.emotion_thread
+        if thread is None:
+            return "descargado por inactividad" if self.unloaded_model_key else "sin modelo"
+        if thread.pending_model_key is not None:
+            return "cargando..."
+        if thread.remote is not None:
+            return "en el daemon"
+        if thread.runs_outside_torch():
+            return "cargado (NumPy)"
+        if thread.model is not None or thread.engine is not None:
+            return "cargado"
+        return "sin modelo"
+
+    def wanted_variants(self):
+        """Variantes que vale la pena construir: ninguna mientras se use fp32 (el valor por defecto)."""
+        precision = self.config_manager.get("model_precision", "fp32")
+        if precision == "fp32": return []
+        if precision == "auto": return self.config_manager.get("optimized_variants", ["int8", "fp16"])
+        return [precision]
+
+    def start_model_optimizer(self, model_key):
+        """Construye en segundo plano las variantes optimizadas que falten (una sola vez por revisión)."""
+        if self.model_optimizer is not None and self.model_optimizer.isRunning(): return
+        if self.emotion_thread is not None and self.emotion_thread.runs_outside_torch():
+            return # Las construye el daemon, o no hacen falta: el motor NumPy no importa torch
+        precisions = self.wanted_variants()
+        numpy_weights = self.config_manager.get("inference_runtime", "torch") == "numpy"
+        if not precisions and not numpy_weights: return
+        self.model_optimizer = ModelOptimizerThread(model_key, precisions, numpy_weights)
+        self.model_optimizer.finished_signal.connect(self.on_optimizer_finished)
+        self.model_optimizer.start()
+
+    def on_optimizer_finished(self, model_key, built):
+        if built:
+            print(f"✅ Variantes optimizadas de {model_key}: {', '.join(built)} (se usarán en el próximo arranque)")
+
+    def on_profile_changed(self):
+        """Cada skin puede traer su propia calibración de voz: se cambia la cabeza del modelo cargado."""
+        thread = self.emotion_thread
+        if thread is None or not thread.current_model_key: return
+        profile_dir = os.path.join(self.profile_manager.root_folder, self.profile_manager.current_profile)
+        has_head = os.path.isfile(calibration.head_path(profile_dir, thread.current_model_key))
+        if has_head or thread.calibrated:
+            thread.change_calibration(profile_dir)
+
+    def set_cascade_confidence(self, confidence):
+        self.config_manager.set("cascade_confidence", confidence)
+        if self.emotion_thread is not None and self.emotion_thread.current_model_key:
+            self.start_emotion_system(self.emotion_thread.current_model_key)
+
+    def set_inference_daemon(self, enabled):
+        self.config_manager.set("inference_daemon", enabled)
+        if self.emotion_thread is not None and self.emotion_thread.current_model_key:
+            self.start_emotion_system(self.emotion_thread.current_model_key)
+
+    def set_inference_runtime(self, runtime):
+        self.config_manager.set("inference_runtime", runtime)
+        if self.emotion_thread is not None and self.emotion_thread.current_model_key:
+            self.start_emotion_system(self.emotion_thread.current_model_key)
+
+    def set_model_precision(self, precision):
+        self.config_manager.set("model_precision", precision)
+        if self.emotion_thread is not None and self.emotion_thread.current_model_key:
+            self.start_emotion_system(self.emotion_thread.current_model_key)
 
     def change_ai_model(self, model_key):
         model_config = SUPPORTED_MODELS.get(model_key)
@@ -615,6 +934,18 @@ class PNGTuberApp(QMainWindow):
         else:
             self.start_model_download(model_key, model_config["name"], model_config["id"])
 
+    def set_encoder_depth(self, num_layers, exit_confidence):
+        self.config_manager.set("encoder_layers", num_layers)
+        self.config_manager.set("early_exit_confidence", exit_confidence)
+        # Recargar el modelo para aplicar el truncado
+        if self.emotion_thread is not None and self.emotion_thread.current_model_key:
+            self.start_emotion_system(self.emotion_thread.current_model_key)
+
+    def set_emotion_hop(self, seconds):
+        self.config_manager.set("emotion_hop_seconds", seconds)
+        if self.emotion_thread is not None and self.emotion_thread.current_model_key:
+            self.start_emotion_system(self.emotion_thread.current_model_key)
+
     def start_model_download(self, model_key, model_name, model_id):
         self.download_dialog = DownloadDialog(model_name, self)
         self.downloader = ModelDownloaderThread(model_id)
@@ -645,19 +976,19 @@ class PNGTuberApp(QMainWindow):
         self.config_manager.set("audio_threshold", value)
 
     def set_muted(self, muted):
-        self.is_muted = muted
+        if muted:
+            self.avatar_state.update(muted=True, speaking=False)
+        else:
+            self.avatar_state.update(muted=False)
         self.mute_btn.setChecked(muted)
         self.config_manager.set("is_muted", muted)
         if muted:
-            self.is_speaking = False
-            self.update_avatar()
+            self.update_bounce()
 
     def set_bounce_enabled(self, enabled):
         self.bounce_enabled = enabled
         self.config_manager.set("bounce_enabled", enabled)
-        if not enabled:
-            self.bounce_phase = 0
-            self.avatar_label.setContentsMargins(0, 0, 0, 0)
+        self.update_bounce()
 
     def set_bounce_amplitude(self, value):
         self.bounce_amplitude = value
@@ -668,16 +999,9 @@ class PNGTuberApp(QMainWindow):
         self.config_manager.set("bounce_speed", value)
 
     def set_shadow_enabled(self, enabled):
-        self.shadow_enabled = enabled
         self.config_manager.set("shadow_enabled", enabled)
-        if enabled:
-            shadow = QGraphicsDropShadowEffect()
-            shadow.setBlurRadius(20)
-            shadow.setColor(QColor(0, 0, 0, 150))
-            shadow.setOffset(0, 5)
-            self.avatar_label.setGraphicsEffect(shadow)
-        else:
-            self.avatar_label.setGraphicsEffect(None)
+        # La sombra va horneada en los frames: solo cambia qué frame se pinta
+        self.avatar_state.update(shadow=enabled)
 
     def resizeEvent(self, event):
         rect = self.rect()
@@ -692,9 +1016,56 @@ class PNGTuberApp(QMainWindow):
 
     def showEvent(self, event):
         super().showEvent(event)
+        self.frame_clock.set_refresh_rate(self.screen().refreshRate())
+        self.avatar_state.set_refresh_rate(self.screen().refreshRate())
+        if not self.exposure_watched and self.windowHandle() is not None:
+            # Los avisos de ventana tapada/destapada llegan a la QWindow, no al widget
+            self.windowHandle().installEventFilter(self)
+            self.exposure_watched = True
+        self.update_render_suspension()
         QTimer.singleShot(100, lambda: self.resize(self.width() + 1, self.height()))
         QTimer.singleShot(200, lambda: self.resize(self.width() - 1, self.height()))
 
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.update_render_suspension()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.Type.WindowStateChange:
+            self.update_render_suspension()
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Expose and obj is self.windowHandle():
+            self.update_render_suspension()
+        return super().eventFilter(obj, event)
+
+    def update_render_suspension(self):
+        """Sin ventana a la vista (bandeja, minimizada o tapada) se paran las animaciones y el render.
+
+        Si la salida por memoria compartida está activa se sigue renderizando: OBS sigue mirando.
+        """
+        handle = self.windowHandle()
+        hidden = not self.isVisible() or self.isMinimized() or (handle is not None and not handle.isExposed())
+        suspended = hidden and self.shm_output is None
+        if suspended == self.render_suspended: return
+        if suspended:
+            if self.crossfade is not None:
+                self.avatar_widget.set_frame(self.crossfade["final"], self.crossfade["margin"])
+                self.stop_crossfade()
+            self.frame_clock.pause()
+            self.transition_timer.stop()
+            self.avatar_state.set_suspended(True)
+            self.render_suspended = True
+        else:
+            self.render_suspended = False
+            self.avatar_state.set_suspended(False)
+            self.frame_clock.resume()
+            # Un solo frame de puesta al día con el estado actual, sin fundido desde el frame viejo
+            if self.avatar_state.dirty:
+                self.render_avatar(self.avatar_state.take(), fade=False)
+            self.schedule_transitions()
+
     def closeEvent(self, event):
         if self.will_quit:
              self.stop_threads()
@@ -712,10 +1083,22 @@ class PNGTuberApp(QMainWindow):
             event.accept()
 
     def stop_threads(self):
+        stats = self.avatar_state.stats()
+        print(f"🎨 Avatar: {stats['renders']} renders para {stats['mutations']} cambios "
+              f"({stats['coalesced']} renders ahorrados al agrupar por frame, "
+              f"{stats['deferred']} cambios con la ventana oculta)")
         self.hotkey_manager.stop_listening()
+        self.skin_loader.shutdown()
+        self.transitions.shutdown()
+        self.stop_shm_output()
         self.audio_thread.stop()
         if self.emotion_thread:
             self.emotion_thread.stop()
+        if self.model_optimizer is not None and self.model_optimizer.isRunning():
+            # Se pide parar y se espera a que termine el paso en curso (terminate podría
+            # matar el hilo con el GIL o un lock de torch tomados)
+            self.model_optimizer.requestInterruption()
+            self.model_optimizer.wait()
         if self.update_checker: 
              self.update_checker.terminate()
     
@@ -881,6 +1264,11 @@ def setup_app_environment():
 if __name__ == "__main__":
     multiprocessing.freeze_support()
     setup_app_environment()
+
+    # El mismo ejecutable sirve de daemon de inferencia (ver inference_daemon.py)
+    if "--inference-daemon" in sys.argv:
+        from inference_daemon import main as run_inference_daemon
+        sys.exit(run_inference_daemon([a for a in sys.argv[1:] if a != "--inference-daemon"]))
     print_signature() 
     
     if os.name == 'nt':
@@ -0,0 +1,152 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+import os
+import json
+import struct
+import numpy as np
+
+# Carga de pesos mapeados en memoria. Un .safetensors es una cabecera JSON
+# seguida de los tensores en crudo, así que cada tensor puede ser una vista
+# de un np.memmap del archivo: no se copia nada al cargar, el sistema trae
+# las páginas cuando se usan y varios procesos comparten la misma copia
+# física (caché de páginas). Los checkpoints .bin (pickle) se convierten una
+# sola vez a safetensors dentro de model_artifacts/. torch se importa solo
+# donde hace falta: numpy_engine lee los mismos archivos sin él.
+
+SAFETENSORS_DTYPES = {
+    "F64": np.float64, "F32": np.float32, "F16": np.float16,
+    "I64": np.int64, "I32": np.int32, "I16": np.int16, "I8": np.int8, "U8": np.uint8, "BOOL": np.bool_,
+}
+
+# Claves que from_pretrained también deja sin cargar (solo se usan al entrenar)
+OPTIONAL_KEYS = ("masked_spec_embed",)
+
+def read_header(path):
+    with open(path, "rb") as f:
+        size = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(size))
+    header.pop("__metadata__", None)
+    return header, 8 + size
+
+def mmap_arrays(path):
+    """{nombre: np.ndarray} respaldados por el archivo (copy-on-write: escribir no toca el disco)."""
+    header, data_start = read_header(path)
+    raw = np.memmap(path, dtype=np.uint8, mode="c")
+    arrays = {}
+    for name, info in header.items():
+        dtype = SAFETENSORS_DTYPES.get(info["dtype"])
+        if dtype is None:
+            raise ValueError(f"dtype no soportado en {name}: {info['dtype']}")
+        start, end = info["data_offsets"]
+        array = raw[data_start + start:data_start + end]
+        if (data_start + start) % np.dtype(dtype).itemsize:
+            array = np.array(array) # Desalineado: se copia (no pasa con archivos de transformers)
+        arrays[name] = array.view(dtype).reshape(info["shape"])
+    return arrays
+
+def mmap_safetensors(path):
+    """Como mmap_arrays, pero como tensores de torch (comparten la memoria del mapeo)."""
+    import torch
+    return {name: torch.from_numpy(array) for name, array in mmap_arrays(path).items()}
+
+def weight_files(path):
+    """Archivos .safetensors del snapshot (con o sin índice de fragmentos)."""
+    index = os.path.join(path, "model.safetensors.index.json")
+    if os.path.isfile(index):
+        with open(index, "r") as f:
+            files = sorted(set(json.load(f)["weight_map"].values()))
+        return [os.path.join(path, f) for f in files]
+    single = os.path.join(path, "model.safetensors")
+    return [single] if os.path.isfile(single) else []
+
+def pickle_files(path):
+    index = os.path.join(path, "pytorch_model.bin.index.json")
+    if os.path.isfile(index):
+        with open(index, "r") as f:
+            files = sorted(set(json.load(f)["weight_map"].values()))
+        return [os.path.join(path, f) for f in files]
+    single = os.path.join(path, "pytorch_model.bin")
+    return [single] if os.path.isfile(single) else []
+
+def convert_to_safetensors(bin_files, target):
+    """Conversión única .bin -> .safetensors (los tensores compartidos se duplican)."""
+    import torch
+    from safetensors.torch import save_file
+    state = {}
+    for f in bin_files:
+        state.update(torch.load(f, map_location="cpu", weights_only=True))
+    state = {k: v.contiguous().clone() for k, v in state.items()}
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = target + ".tmp"
+    save_file(state, tmp, metadata={"format": "pt"})
+    os.replace(tmp, target)
+    print(f"🔁 Pesos convertidos a safetensors: {target}")
+
+def converted_path(config, artifacts_root):
+    return os.path.join(artifacts_root, config["key"], config["revision"], "model.safetensors")
+
+def existing_safetensors(config, artifacts_root):
+    """Como ensure_safetensors pero sin convertir (no necesita torch). [] si aún no hay."""
+    path = config.get("path")
+    if not path or not os.path.isdir(path): return []
+    files = weight_files(path)
+    if files: return files
+    if not config.get("revision"): return []
+    target = converted_path(config, artifacts_root)
+    return [target] if os.path.isfile(target) else []
+
+def ensure_safetensors(config, artifacts_root):
+    """Lista de .safetensors del modelo; convierte el .bin la primera vez si hace falta."""
+    files = existing_safetensors(config, artifacts_root)
+    if files: return files
+    path = config.get("path")
+    if not path or not os.path.isdir(path): return []
+    bins = pickle_files(path)
+    if not bins or not config.get("revision"): return []
+    target = converted_path(config, artifacts_root)
+    convert_to_safetensors(bins, target)
+    return [target]
+
+def load_mmap_model(build_fn, files):
+    """
+    Construye el modelo en el dispositivo 'meta' (sin reservar memoria) y le
+    asigna los tensores mapeados. Devuelve None si el checkpoint no cubre
+    todos los pesos, para que el llamador use from_pretrained.
+    """
+    import torch
+    state = {}
+    for f in files:
+        state.update(mmap_safetensors(f))
+    with torch.device("meta"):
+        model = build_fn()
+    result = model.load_state_dict(state, strict=False, assign=True)
+    missing = [k for k in result.missing_keys if not k.endswith(OPTIONAL_KEYS)]
+    if missing:
+        print(f"ℹ️ Carga mapeada incompleta ({len(missing)} pesos faltantes), se usa la carga normal.")
+        return None
+    # Los opcionales se materializan vacíos en CPU (from_pretrained los inicializaría al azar)
+    for name, param in list(model.named_parameters()):
+        if param.is_meta:
+            module_name, _, attr = name.rpartition(".")
+            module = model.get_submodule(module_name) if module_name else model
+            setattr(module, attr, torch.nn.Parameter(torch.zeros(param.shape, dtype=param.dtype),
+                                                     requires_grad=param.requires_grad))
+    for name, buf in list(model.named_buffers()):
+        if buf.is_meta:
+            print(f"ℹ️ Buffer sin valor tras la carga mapeada ({name}), se usa la carga normal.")
+            return None
+    return model.eval()
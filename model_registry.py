@@ -0,0 +1,315 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+import os
+import re
+import copy
+import json
+import hashlib
+import threading
+
+MANIFEST_FILE = "models_manifest.json"
+
+# --- MODELOS INCLUIDOS ---
+# Semilla del registro. Los modelos registrados en el manifiesto se publican
+# también en este diccionario, así que el resto de la app los ve sin cambios.
+SUPPORTED_MODELS = {
+    "spanish": {
+        "name": "Español (SomosNLP)",
+        "id": "somosnlp-hackathon-2022/wav2vec2-base-finetuned-sentiment-classification-MESD",
+        "architecture": "auto",
+        "avatar_states": ["neutral", "happy", "sad", "angry"],
+        "mapping": {
+            "anger": "angry", "disgust": "angry", "fear": "sad",
+            "happiness": "happy", "sadness": "sad", "neutral": "neutral"
+        }
+    },
+    "english": {
+        "name": "Global (Ehcalabres)",
+        "id": "ehcalabres/wav2vec2-lg-xlsr-en-speech-emotion-recognition",
+        "architecture": "ehcalabres",
+        "avatar_states": ["neutral", "happy", "sad", "angry", "surprise", "disgust", "fear"],
+        "mapping": {
+            "angry": "angry",
+            "calm": "neutral",
+            "disgust": "disgust",
+            "fearful": "fear",
+            "happy": "happy",
+            "neutral": "neutral",
+            "sad": "sad",
+            "surprised": "surprise"
+        }
+    },
+    "prosody": {
+        "name": "Ligero (Prosodia, sin IA)",
+        "id": "builtin/prosody",
+        "architecture": None,
+        "backend": "prosody",
+        "avatar_states": ["neutral", "happy", "sad", "angry"],
+        "mapping": {"neutral": "neutral", "happy": "happy", "sad": "sad", "angry": "angry"}
+    }
+}
+
+# Copia intacta de los incluidos: SUPPORTED_MODELS se actualiza con las entradas
+# del registro, y una recarga debe partir otra vez de lo que trae la app
+BUILTIN_MODELS = copy.deepcopy(SUPPORTED_MODELS)
+
+# Lo único que el manifiesto aporta a un modelo incluido: lo que se descubre al
+# descargarlo. Nombre, mapeo, estados y arquitectura siempre salen del código,
+# así un manifiesto viejo no pisa un mapeo corregido en una versión nueva
+RUNTIME_FIELDS = ("path", "revision", "size_bytes", "labels", "backends")
+
+# Nombres de etiqueta habituales -> estado del avatar
+LABEL_ALIASES = {
+    "neutral": "neutral", "calm": "neutral",
+    "happy": "happy", "happiness": "happy", "joy": "happy",
+    "sad": "sad", "sadness": "sad",
+    "angry": "angry", "anger": "angry",
+    "surprise": "surprise", "surprised": "surprise",
+    "disgust": "disgust",
+    "fear": "fear", "fearful": "fear",
+}
+
+def compute_revision(path):
+    """Commit del snapshot de Hugging Face, o huella de los archivos si es una carpeta local."""
+    name = os.path.basename(os.path.normpath(path))
+    if os.path.basename(os.path.dirname(os.path.normpath(path))) == "snapshots" and re.fullmatch(r"[0-9a-f]{40}", name):
+        return name
+    digest = hashlib.sha1()
+    for f in sorted(os.listdir(path)):
+        fp = os.path.join(path, f)
+        if os.path.isfile(fp):
+            st = os.stat(fp)
+            digest.update(f"{f}:{st.st_size}:{int(st.st_mtime)}".encode())
+    return "local-" + digest.hexdigest()[:16]
+
+def folder_size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for f in filenames:
+            try: total += os.path.getsize(os.path.join(dirpath, f)) # Sigue los symlinks del caché HF
+            except OSError: pass
+    return total
+
+def read_labels(path):
+    """Lista de etiquetas (id2label) del config.json del modelo."""
+    try:
+        with open(os.path.join(path, "config.json"), "r") as f:
+            id2label = json.load(f).get("id2label", {})
+        return [str(id2label[k]).lower() for k in sorted(id2label, key=lambda k: int(k))]
+    except Exception:
+        return []
+
+def read_num_layers(path):
+    """Capas del encoder (num_hidden_layers) según el config.json del modelo, o None."""
+    try:
+        with open(os.path.join(path, "config.json"), "r") as f:
+            return int(json.load(f)["num_hidden_layers"])
+    except Exception:
+        return None
+
+class ModelRegistry:
+    """
+    Registro local de modelos respaldado por un manifiesto JSON pequeño.
+    Las consultas son búsquedas en diccionario: no se recorre el caché de
+    Hugging Face salvo una vez, al migrar desde una versión sin manifiesto.
+    """
+    def __init__(self, filepath=MANIFEST_FILE):
+        self.filepath = filepath
+        self.lock = threading.RLock()
+        self.models = {}
+        self.by_id = {}
+        self.load()
+
+    def load(self):
+        data = {}
+        first_run = not os.path.exists(self.filepath)
+        if not first_run:
+            try:
+                with open(self.filepath, "r") as f:
+                    data = json.load(f).get("models", {})
+            except Exception as e:
+                print(f"⚠️ Manifiesto de modelos ilegible, se regenera: {e}")
+
+        self.models = {}
+        for key, builtin in BUILTIN_MODELS.items():
+            entry = copy.deepcopy(builtin)
+            saved = data.get(key, {})
+            entry.update({field: saved[field] for field in RUNTIME_FIELDS if field in saved})
+            entry["key"] = key
+            self.models[key] = entry
+        for key, entry in data.items():
+            if key not in self.models:
+                entry["key"] = key
+                self.models[key] = entry
+
+        # Una sola comprobación barata por entrada al iniciar
+        for entry in self.models.values():
+            if entry.get("path") and not os.path.exists(entry["path"]):
+                print(f"⚠️ Ruta de modelo desaparecida: {entry['path']}")
+                entry["path"] = None
+
+        self.reindex()
+        if first_run:
+            self.migrate_from_hub_cache()
+
+    def reindex(self):
+        self.by_id = {entry["id"]: entry for entry in self.models.values()}
+        SUPPORTED_MODELS.update({key: entry for key, entry in self.models.items()})
+
+    def save(self):
+        with self.lock:
+            data = {"version": 1, "models": self.models}
+            try:
+                tmp = self.filepath + ".tmp"
+                with open(tmp, "w") as f:
+                    json.dump(data, f, indent=4)
+                os.replace(tmp, self.filepath)
+            except Exception as e:
+                print(f"Error guardando manifiesto de modelos: {e}")
+
+    def migrate_from_hub_cache(self):
+        """Primera ejecución con registro: adopta modelos ya descargados por versiones anteriores."""
+        try:
+            from huggingface_hub import snapshot_download
+        except ImportError:
+            return
+        for entry in list(self.models.values()):
+            if entry.get("path") or entry.get("source") == "local": continue
+            if entry.get("backend", "torch") != "torch": continue
+            try:
+                path = snapshot_download(repo_id=entry["id"], local_files_only=True)
+            except Exception:
+                continue
+            self.record_path(entry, path, save=False)
+        self.save()
+
+    # --- CONSULTAS (O(1)) ---
+    def get(self, key):
+        return self.models.get(key)
+
+    def get_by_id(self, model_id):
+        return self.by_id.get(model_id)
+
+    def is_available(self, model_id):
+        entry = self.by_id.get(model_id)
+        if entry and entry.get("backend") == "prosody":
+            return True # Incluido en la app, no se descarga
+        return bool(entry and entry.get("path"))
+
+    def get_path(self, model_id):
+        entry = self.by_id.get(model_id)
+        return entry.get("path") if entry else None
+
+    # --- ALTAS ---
+    def record_path(self, entry, path, save=True):
+        entry["path"] = path
+        entry["revision"] = compute_revision(path)
+        entry["size_bytes"] = folder_size(path)
+        entry["labels"] = read_labels(path)
+        entry.setdefault("backends", ["torch"])
+        if save: self.save()
+
+    def record_download(self, model_id, path):
+        """Llamar cuando snapshot_download termina: guarda ruta, revisión, tamaño y etiquetas."""
+        with self.lock:
+            entry = self.by_id.get(model_id)
+            if entry is None:
+                key = re.sub(r"[^a-z0-9]+", "_", model_id.lower()).strip("_")
+                entry = {"key": key, "name": model_id, "id": model_id, "architecture": "auto", "source": "hub"}
+                self.models[key] = entry
+            self.record_path(entry, path, save=False)
+            self.reindex()
+        self.save()
+        return entry
+
+    def register_local(self, path, key=None, name=None, mapping=None, architecture=None):
+        """
+        Registra una carpeta con un modelo de clasificación de audio ya descargado.
+        Si no se da un mapeo, se deduce de las etiquetas con LABEL_ALIASES.
+        """
+        path = os.path.abspath(path)
+        if not os.path.isfile(os.path.join(path, "config.json")):
+            return False, "La carpeta no contiene config.json."
+
+        labels = read_labels(path)
+        if mapping is None:
+            mapping = {lbl: LABEL_ALIASES[lbl] for lbl in labels if lbl in LABEL_ALIASES}
+        if not mapping:
+            return False, "No se reconocen las etiquetas del modelo."
+
+        base_name = os.path.basename(path)
+        key = key or "local_" + re.sub(r"[^a-z0-9]+", "_", base_name.lower()).strip("_")
+        states = ["neutral"] + sorted(set(mapping.values()) - {"neutral"})
+        entry = {
+            "key": key,
+            "name": name or f"Local ({base_name})",
+            "id": f"local/{key}",
+            "architecture": architecture or "auto",
+            "avatar_states": states,
+            "mapping": mapping,
+            "source": "local",
+        }
+        with self.lock:
+            self.models[key] = entry
+            self.record_path(entry, path, save=False)
+            self.reindex()
+        self.save()
+        return True, key
+
+    def register_engine(self, key, name, backend, path, avatar_states, **extra):
+        """Registra un backend sin transformers que vive en un solo archivo (p.ej. un alumno destilado)."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        entry = {
+            "key": key,
+            "name": name,
+            "id": f"local/{key}",
+            "architecture": None,
+            "backend": backend,
+            "avatar_states": list(avatar_states),
+            "mapping": {s: s for s in avatar_states},
+            "source": "local",
+            "path": path,
+            "revision": "local-" + hashlib.sha1(f"{st.st_size}:{int(st.st_mtime)}".encode()).hexdigest()[:16],
+            "size_bytes": st.st_size,
+            "labels": list(avatar_states),
+        }
+        entry.update(extra)
+        with self.lock:
+            self.models[key] = entry
+            self.reindex()
+        self.save()
+        return entry
+
+    def unregister(self, key):
+        """Solo se pueden quitar modelos locales; los incluidos siempre existen."""
+        with self.lock:
+            if self.models.get(key, {}).get("source") != "local":
+                return False
+            self.models.pop(key)
+            SUPPORTED_MODELS.pop(key, None)
+            self.reindex()
+        self.save()
+        return True
+
+_registry = None
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    return _registry
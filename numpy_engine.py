@@ -0,0 +1,359 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+import os
+import json
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from artifact_cache import ARTIFACTS_DIR
+from mmap_weights import existing_safetensors, mmap_arrays
+
+RATE = 16000
+
+# Inferencia wav2vec2 sin torch ni transformers. Replica en NumPy el encoder
+# convolucional (GroupNorm de wav2vec2-base o LayerNorm de XLS-R), la
+# proyección, el embedding posicional convolucional, el transformer (post-LN
+# o StableLayerNorm) y las dos cabezas de SUPPORTED_MODELS. Los pesos son los
+# mismos safetensors mapeados en memoria de la carga mapeada (mmap_weights.py):
+# un checkpoint .bin necesita torch una sola vez para convertirse y desde ahí
+# este motor arranca sin importarlo. Activaciones en float32, (tiempo, canales).
+
+PREFIX = "wav2vec2."
+
+# Abramowitz-Stegun 7.1.26 para erf (error < 1.5e-7): evita importar scipy.special
+ERF_P = np.float32(0.3275911)
+ERF_A = [np.float32(c) for c in (1.061405429, -1.453152027, 1.421413741, -0.284496736, 0.254829592)]
+GELU_BLOCK = 65536 # Trozos que caben en caché: las ~15 pasadas no salen a RAM
+
+def gelu_block(x, z, t, poly):
+    np.abs(x, out=z)
+    z *= np.float32(0.7071067811865476)
+    np.multiply(z, ERF_P, out=t)
+    t += np.float32(1.0)
+    np.reciprocal(t, out=t)
+    np.multiply(t, ERF_A[0], out=poly)
+    for c in ERF_A[1:]:
+        poly += c
+        poly *= t
+    np.square(z, out=z)
+    np.negative(z, out=z)
+    np.exp(z, out=z)
+    poly *= z # 1 - erf(|x|/√2)
+    np.subtract(np.float32(1.0), poly, out=poly)
+    np.copysign(poly, x, out=poly)
+    poly += np.float32(1.0)
+    poly *= np.float32(0.5)
+    x *= poly
+
+def gelu(x):
+    """GELU exacta (la de transformers, no la aproximación con tanh), en el sitio."""
+    flat = x.reshape(-1)
+    buffers = np.empty((3, min(GELU_BLOCK, flat.size)), dtype=np.float32)
+    for start in range(0, flat.size, GELU_BLOCK):
+        block = flat[start:start + GELU_BLOCK]
+        n = len(block)
+        gelu_block(block, buffers[0, :n], buffers[1, :n], buffers[2, :n])
+    return x
+
+def softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+def layer_norm(x, weight, bias, eps):
+    """LayerNorm sobre los canales de cada frame, con un solo temporal."""
+    out = x - x.mean(axis=-1, keepdims=True)
+    var = np.einsum("ij,ij->i", out, out) / out.shape[-1]
+    out *= (1.0 / np.sqrt(var + eps)).astype(np.float32)[:, None]
+    out *= weight
+    out += bias
+    return out
+
+def group_norm_per_channel(x, weight, bias, eps=1e-5):
+    """GroupNorm con un grupo por canal (primera conv de wav2vec2-base): cada canal en el tiempo, en el sitio."""
+    x -= x.mean(axis=0)
+    var = np.einsum("ij,ij->j", x, x) / len(x)
+    x *= (1.0 / np.sqrt(var + eps)).astype(np.float32) * weight
+    x += bias
+    return x
+
+def linear(x, weight, bias=None):
+    out = x @ weight.T
+    return out + bias if bias is not None else out
+
+def conv1d(x, weight, stride=1, bias=None):
+    """x (T, C_in), weight (C_out, C_in, K) -> (T_out, C_out) como una sola matmul."""
+    c_out, c_in, k = weight.shape
+    windows = sliding_window_view(x, k, axis=0)[::stride] # (T_out, C_in, K)
+    return linear(windows.reshape(len(windows), c_in * k), weight.reshape(c_out, c_in * k), bias)
+
+def weight_norm(g, v):
+    """weight_norm(dim=2) de pos_conv_embed: g * v / ||v|| por posición del kernel."""
+    norm = np.sqrt(np.sum(v.astype(np.float32) ** 2, axis=(0, 1), keepdims=True))
+    return (g * v / norm).astype(np.float32)
+
+def read_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+def unsupported_reason(model_config, weights):
+    """None si el checkpoint cae dentro de lo que implementa este motor."""
+    if model_config.get("model_type") != "wav2vec2":
+        return f"arquitectura {model_config.get('model_type')}"
+    if model_config.get("feat_extract_norm") not in ("group", "layer"):
+        return f"feat_extract_norm={model_config.get('feat_extract_norm')}"
+    for key in ("hidden_act", "feat_extract_activation"):
+        if model_config.get(key, "gelu") != "gelu":
+            return f"{key}={model_config.get(key)}"
+    if model_config.get("use_weighted_layer_sum") or model_config.get("add_adapter"):
+        return "suma ponderada de capas / adaptador"
+    if model_config.get("position_embeddings_type") not in (None, "absolute"):
+        return f"position_embeddings_type={model_config.get('position_embeddings_type')}"
+    if "projector.weight" not in weights and "classifier.dense.weight" not in weights:
+        return "cabeza de clasificación desconocida"
+    return None
+
+class NumpyWav2Vec2:
+    """Wav2Vec2ForSequenceClassification / EhcalabresModel en NumPy (solo inferencia)."""
+
+    def __init__(self, model_config, weights):
+        self.config = model_config
+        self.weights = weights
+        self.stable = bool(model_config.get("do_stable_layer_norm"))
+        self.group_norm = model_config.get("feat_extract_norm") == "group"
+        self.eps = float(model_config.get("layer_norm_eps", 1e-5))
+        self.num_heads = int(model_config["num_attention_heads"])
+        self.strides = model_config["conv_stride"]
+        self.id2label = {int(k): str(v).lower() for k, v in model_config["id2label"].items()}
+        self.num_layers = int(model_config["num_hidden_layers"])
+        self.projector_head = "projector.weight" in weights
+        self.pos_conv = self.resolve_pos_conv()
+
+    @classmethod
+    def load(cls, config, artifacts_root=ARTIFACTS_DIR):
+        """Modelo mapeado en memoria, o None (con el motivo impreso) si este motor no sirve."""
+        path = config.get("path")
+        if not path or not os.path.isfile(os.path.join(path, "config.json")):
+            print("ℹ️ Motor NumPy: el modelo no está en disco.")
+            return None
+        files = existing_safetensors(config, artifacts_root)
+        if not files:
+            print("ℹ️ Motor NumPy: faltan los pesos safetensors (se convierten en la próxima carga con torch).")
+            return None
+        weights = {}
+        for f in files:
+            for name, array in mmap_arrays(f).items():
+                weights[name] = array if array.dtype == np.float32 else array.astype(np.float32)
+        model_config = read_json(os.path.join(path, "config.json"))
+        reason = unsupported_reason(model_config, weights)
+        if reason is not None:
+            print(f"ℹ️ Motor NumPy no compatible con este modelo ({reason}).")
+            return None
+        return cls(model_config, weights)
+
+    def w(self, name):
+        return self.weights[name]
+
+    def resolve_pos_conv(self):
+        """Peso efectivo del conv posicional: weight_norm antiguo, parametrizado o ya fijado."""
+        base = PREFIX + "encoder.pos_conv_embed.conv."
+        for g_name, v_name in (("weight_g", "weight_v"),
+                               ("parametrizations.weight.original0", "parametrizations.weight.original1")):
+            if base + g_name in self.weights:
+                return weight_norm(self.w(base + g_name), self.w(base + v_name))
+        return self.w(base + "weight")
+
+    def truncate(self, num_layers):
+        """Usa solo las primeras num_layers capas del transformer. Devuelve las que quedan."""
+        total = int(self.config["num_hidden_layers"])
+        self.num_layers = max(1, min(num_layers, total)) if num_layers > 0 else total
+        return self.num_layers
+
+    def apply_head(self, arrays):
+        """Sustituye los pesos de la cabeza (calibración personal)."""
+        self.weights.update({k: np.asarray(v, dtype=np.float32) for k, v in arrays.items()})
+
+    # --- Encoder convolucional y proyección ---
+
+    def extract_features(self, input_values):
+        """Audio normalizado (N,) -> frames convolucionales (T, conv_dim[-1])."""
+        x = input_values.astype(np.float32, copy=False)[:, None]
+        for i, stride in enumerate(self.strides):
+            base = f"{PREFIX}feature_extractor.conv_layers.{i}."
+            x = conv1d(x, self.w(base + "conv.weight"), stride, self.weights.get(base + "conv.bias"))
+            if self.group_norm:
+                if i == 0:
+                    x = group_norm_per_channel(x, self.w(base + "layer_norm.weight"), self.w(base + "layer_norm.bias"))
+            else:
+                x = layer_norm(x, self.w(base + "layer_norm.weight"), self.w(base + "layer_norm.bias"), 1e-5)
+            x = gelu(x)
+        return x
+
+    def project_features(self, features):
+        base = PREFIX + "feature_projection."
+        x = layer_norm(features, self.w(base + "layer_norm.weight"), self.w(base + "layer_norm.bias"), self.eps)
+        return linear(x, self.w(base + "projection.weight"), self.w(base + "projection.bias"))
+
+    # --- Transformer ---
+
+    def position_embeddings(self, x):
+        """Conv agrupada con padding k//2 (SamePad quita el último frame) + GELU."""
+        weight = self.pos_conv
+        hidden, per_group, k = weight.shape
+        groups = hidden // per_group
+        frames = len(x)
+        padded = np.pad(x, ((k // 2, k // 2), (0, 0)))
+        out = np.empty_like(x)
+        for g in range(groups):
+            cols = slice(g * per_group, (g + 1) * per_group)
+            windows = sliding_window_view(padded[:, cols], k, axis=0)[:frames]
+            out[:, cols] = windows.reshape(frames, per_group * k) @ weight[cols].reshape(per_group, per_group * k).T
+        return gelu(out + self.w(PREFIX + "encoder.pos_conv_embed.conv.bias"))
+
+    def attention(self, x, base):
+        frames, hidden = x.shape
+        head_dim = hidden // self.num_heads
+        def heads(name):
+            return linear(x, self.w(base + name + ".weight"), self.w(base + name + ".bias")) \
+                .reshape(frames, self.num_heads, head_dim).transpose(1, 0, 2)
+        q = heads("q_proj") * np.float32(head_dim ** -0.5)
+        k, v = heads("k_proj"), heads("v_proj")
+        context = softmax(q @ k.transpose(0, 2, 1)) @ v
+        context = context.transpose(1, 0, 2).reshape(frames, hidden)
+        return linear(context, self.w(base + "out_proj.weight"), self.w(base + "out_proj.bias"))
+
+    def feed_forward(self, x, base):
+        x = gelu(linear(x, self.w(base + "intermediate_dense.weight"), self.w(base + "intermediate_dense.bias")))
+        return linear(x, self.w(base + "output_dense.weight"), self.w(base + "output_dense.bias"))
+
+    def norm(self, x, name):
+        return layer_norm(x, self.w(name + ".weight"), self.w(name + ".bias"), self.eps)
+
+    def encoder_layer(self, x, i):
+        base = f"{PREFIX}encoder.layers.{i}."
+        if self.stable:
+            x = x + self.attention(self.norm(x, base + "layer_norm"), base + "attention.")
+            return x + self.feed_forward(self.norm(x, base + "final_layer_norm"), base + "feed_forward.")
+        x = self.norm(x + self.attention(x, base + "attention."), base + "layer_norm")
+        return self.norm(x + self.feed_forward(x, base + "feed_forward."), base + "final_layer_norm")
+
+    def readouts(self, input_values):
+        """
+        (profundidad, estados) tras cada capa, como wav2vec2_runtime.encoder_readouts:
+        con StableLayerNorm cada lectura lleva la normalización final del encoder.
+        """
+        x = self.project_features(self.extract_features(input_values))
+        x = x + self.position_embeddings(x)
+        if not self.stable:
+            x = self.norm(x, PREFIX + "encoder.layer_norm")
+        for i in range(self.num_layers):
+            x = self.encoder_layer(x, i)
+            yield i + 1, self.norm(x, PREFIX + "encoder.layer_norm") if self.stable else x
+
+    # --- Cabezas ---
+
+    def classify(self, hidden_states):
+        if self.projector_head:
+            # Wav2Vec2ForSequenceClassification: proyección -> media -> lineal
+            pooled = linear(hidden_states, self.w("projector.weight"), self.w("projector.bias")).mean(axis=0)
+            return linear(pooled, self.w("classifier.weight"), self.w("classifier.bias"))
+        # EhcalabresModel: media -> dense/tanh/output
+        pooled = np.tanh(linear(hidden_states.mean(axis=0), self.w("classifier.dense.weight"), self.w("classifier.dense.bias")))
+        return linear(pooled, self.w("classifier.output.weight"), self.w("classifier.output.bias"))
+
+    def logits(self, input_values):
+        hidden = None
+        for _, hidden in self.readouts(input_values): pass
+        return self.classify(hidden)
+
+class NumpyEngine:
+    """
+    Motor con la interfaz de emotion_backends (predict(audio) -> (etiqueta, confianza)),
+    para que EmotionThread corra un wav2vec2 sin importar torch. Las etiquetas son
+    las del modelo: EmotionThread las pasa por el mapping como con torch.
+    """
+    backend = "numpy"
+    EPSILON = 1e-7 # Mismo valor que zero_mean_unit_var_norm de transformers
+
+    def __init__(self, model, do_normalize=True):
+        self.model = model
+        self.do_normalize = do_normalize
+        self.exit_confidence = 0.0
+        self.min_layers = 1
+        self.last_depth = model.num_layers
+        self.base_head = {} # Pesos originales de la cabeza, para cambiar de calibración
+
+    @classmethod
+    def load(cls, config):
+        """None si el modelo no se puede correr en NumPy (el llamador usa torch)."""
+        path = config.get("path")
+        prep_path = os.path.join(path, "preprocessor_config.json") if path else None
+        prep = read_json(prep_path) if prep_path and os.path.isfile(prep_path) else {}
+        # Una ventana mono sin padding: la attention mask sería toda unos y no cambia nada
+        if prep.get("feature_size", 1) != 1 or prep.get("sampling_rate", RATE) != RATE:
+            print("ℹ️ Motor NumPy: extractor de características no compatible.")
+            return None
+        model = NumpyWav2Vec2.load(config)
+        if model is None: return None
+        return cls(model, prep.get("do_normalize", True))
+
+    def set_encoder_depth(self, num_layers=0, exit_confidence=0.0, min_layers=1):
+        if num_layers > 0:
+            print(f"✂️ Encoder truncado a {self.model.truncate(num_layers)} capas.")
+        self.exit_confidence = exit_confidence
+        self.min_layers = max(1, min_layers)
+        self.last_depth = self.model.num_layers
+
+    def apply_calibration(self, head_path, revision, encoder_layers):
+        import calibration
+        self.model.apply_head(self.base_head) # Sin la calibración de la skin anterior
+        arrays = calibration.load_numpy_head(head_path, revision, encoder_layers)
+        if arrays is None:
+            if os.path.isfile(head_path):
+                print("ℹ️ La calibración no tiene copia NumPy (recalibra para usarla sin torch).")
+            return False
+        if not self.base_head:
+            self.base_head = {k: self.model.weights[k] for k in arrays if k in self.model.weights}
+        self.model.apply_head(arrays)
+        return True
+
+    def normalize(self, audio):
+        x = np.asarray(audio, dtype=np.float32)
+        if not self.do_normalize: return x
+        x = x - x.mean()
+        return x / np.sqrt(np.mean(x * x) + self.EPSILON)
+
+    def predict_logits(self, audio):
+        """Logits con salida temprana si está activa. Devuelve (logits, capas_usadas)."""
+        x = self.normalize(audio)
+        if self.exit_confidence <= 0:
+            return self.model.logits(x), self.model.num_layers
+        logits, depth = None, 0
+        min_layers = min(self.min_layers, self.model.num_layers) # La última capa siempre predice
+        for depth, readout in self.model.readouts(x):
+            if depth < min_layers: continue
+            logits = self.model.classify(readout)
+            if softmax(logits).max() >= self.exit_confidence:
+                break
+        return logits, depth
+
+    def predict(self, audio):
+        logits, self.last_depth = self.predict_logits(audio)
+        probs = softmax(logits)
+        pid = int(np.argmax(probs))
+        return self.model.id2label[pid], float(probs[pid])
+
+    def reset(self):
+        pass
@@ -26,6 +26,9 @@ class AvatarProfileManager:
         self.root_folder = root_folder
         self.current_profile = "Default"
         self.profiles = []
+        self.skin_files = {} # nombre en minúsculas -> ruta real, del perfil actual
+        self.image_index = {} # (emoción, boca) -> ruta ya resuelta con sus reemplazos
+        self.reported_missing = set()
         self.scan_profiles()
 
     def scan_profiles(self):
@@ -67,6 +70,8 @@ class AvatarProfileManager:
             else:
                 self.current_profile = "Default" 
 
+        self.build_image_index()
+
     def create_default_skin(self, target_dir):
         """Genera avatares de emergencia basados en TODOS los modelos posibles"""
         if not os.path.exists(target_dir):
@@ -110,47 +115,68 @@ class AvatarProfileManager:
     def set_profile(self, profile_name):
         if profile_name in self.profiles:
             self.current_profile = profile_name
+            self.build_image_index()
             print(f"👕 Perfil cambiado a: {profile_name}")
 
-    def get_image_path(self, emotion, state):
+    def build_image_index(self):
+        """Resuelve de una vez la imagen de cada (emoción, boca) del perfil actual.
+
+        Se llama al escanear o cambiar de perfil; get_image_path solo consulta
+        la tabla y nunca toca el disco mientras se renderiza.
+        """
+        skin_dir = os.path.join(self.root_folder, self.current_profile)
+        self.skin_files = {}
+        if os.path.isdir(skin_dir):
+            for f in sorted(os.listdir(skin_dir)):
+                full_path = os.path.join(skin_dir, f)
+                if f.lower().endswith(".png") and os.path.isfile(full_path):
+                    # En minúsculas: igual que os.path.exists en sistemas sin distinción de mayúsculas
+                    self.skin_files.setdefault(f.lower(), full_path)
+
+        all_possible_states = set()
+        for model in SUPPORTED_MODELS.values():
+            all_possible_states.update(model["avatar_states"])
+        self.image_index = {}
+        for emotion in sorted(all_possible_states):
+            for state in ("open", "closed"):
+                self.image_index[(emotion, state)] = self.resolve_image(emotion, state)
+
+    def resolve_image(self, emotion, state):
         """Busca la mejor imagen disponible. Si falta una, usa un reemplazo."""
-        
-        # Función auxiliar para verificar si es archivo real
-        def is_valid_file(path):
-            return os.path.exists(path) and os.path.isfile(path)
-
-        # 1. Intento exacto (Ej: happy_open.PNG)
-        filename = f"{emotion}_{state}.PNG"
-        full_path = os.path.join(self.root_folder, self.current_profile, filename)
-        if is_valid_file(full_path): return full_path
-            
-        # 2. Intento mismo emoción, estado opuesto (Ej: happy_closed.PNG)
         opp_state = "closed" if state == "open" else "open"
-        filename = f"{emotion}_{opp_state}.PNG"
-        full_path = os.path.join(self.root_folder, self.current_profile, filename)
-        if is_valid_file(full_path): return full_path
-
-        # 3. Intento neutral (Ej: neutral_open.PNG)
-        filename = f"neutral_{state}.PNG"
-        full_path = os.path.join(self.root_folder, self.current_profile, filename)
-        if is_valid_file(full_path): return full_path
-
-        # 4. Intento neutral base (Ej: neutral_closed.PNG)
-        filename = "neutral_closed.PNG"
-        full_path = os.path.join(self.root_folder, self.current_profile, filename)
-        if is_valid_file(full_path): return full_path
-            
-        # 5. Desesperación: Devolver cualquier png real que encuentre
-        skin_dir = os.path.join(self.root_folder, self.current_profile)
-        if os.path.exists(skin_dir):
-            for f in os.listdir(skin_dir):
-                if f.lower().endswith(".png"):
-                    candidate = os.path.join(skin_dir, f)
-                    if os.path.isfile(candidate): 
-                        return candidate
-        
-        # 6. Nada encontrado
-        return None
+        candidates = [
+            f"{emotion}_{state}.PNG",     # 1. Intento exacto (Ej: happy_open.PNG)
+            f"{emotion}_{opp_state}.PNG", # 2. Misma emoción, estado opuesto (Ej: happy_closed.PNG)
+            f"neutral_{state}.PNG",       # 3. Intento neutral (Ej: neutral_open.PNG)
+            "neutral_closed.PNG",         # 4. Intento neutral base
+        ]
+        for filename in candidates:
+            full_path = self.skin_files.get(filename.lower())
+            if full_path:
+                if filename != candidates[0]:
+                    self.report_missing(candidates[0], full_path)
+                return full_path
+
+        # 5. Desesperación: cualquier png real del perfil (6. o nada)
+        full_path = next(iter(self.skin_files.values()), None)
+        self.report_missing(candidates[0], full_path)
+        return full_path
+
+    def report_missing(self, filename, replacement):
+        """Avisa una sola vez por perfil y archivo, no en cada frame."""
+        key = (self.current_profile, filename)
+        if key in self.reported_missing: return
+        self.reported_missing.add(key)
+        used = os.path.basename(replacement) if replacement else "ninguna imagen"
+        print(f"⚠️ Falta {self.current_profile}/{filename}, se usa {used}.")
+
+    def get_image_path(self, emotion, state):
+        key = (emotion, state)
+        if key not in self.image_index:
+            # Emoción fuera de los modelos conocidos (forzada por atajo): se resuelve
+            # con la lista de archivos ya leída y queda en la tabla
+            self.image_index[key] = self.resolve_image(emotion, state)
+        return self.image_index[key]
 
     def export_skin_package(self, profile_name, target_file_path):
         skin_folder = os.path.join(self.root_folder, profile_name)
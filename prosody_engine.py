@@ -0,0 +1,184 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+import json
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import find_peaks
+
+RATE = 16000
+
+# Motor de emociones por prosodia: sin redes neuronales, solo NumPy/SciPy.
+# Por ventana extrae tono, energía, ritmo e inclinación espectral y los pasa
+# por un modelo lineal pequeño (editable en JSON). Pensado para equipos que
+# no pueden mover wav2vec2: cuesta unos pocos ms cada 2 s.
+
+FEATURES = ["pitch", "pitch_var", "energy", "energy_var", "rate", "tilt", "voiced"]
+
+# Modelo por defecto escrito a mano. Las características se centran y escalan
+# (z = (x - center) / scale) y cada estado puntúa con weights · z + bias.
+DEFAULT_MODEL = {
+    "states": ["neutral", "happy", "sad", "angry"],
+    "center": [0.0, 2.5, 0.0, 6.0, 4.0, -15.0, 0.5],
+    "scale":  [3.0, 1.5, 4.0, 3.0, 1.5, 6.0, 0.25],
+    "weights": [
+        [ 0.0,  0.0,  0.0,  0.0,  0.0,  0.0,  0.0],  # neutral
+        [ 1.0,  1.0,  0.5,  0.2,  0.5,  0.2,  0.2],  # happy
+        [-0.7, -0.8, -0.8, -0.3, -0.7, -0.5,  0.0],  # sad
+        [ 0.3,  0.1,  1.2,  0.4,  0.3,  0.9,  0.1],  # angry
+    ],
+    "bias": [0.5, 0.0, 0.0, -0.2],
+}
+
+FRAME = 400         # 25 ms
+HOP = 160           # 10 ms
+NFFT = 1024         # >= 2*FRAME: la autocorrelación sale de la misma FFT sin aliasing
+F0_MIN, F0_MAX = 70.0, 400.0
+VOICING_THRESHOLD = 0.45
+SILENCE_DB = -50.0
+
+class SpeakerBaseline:
+    """Media móvil del tono y la energía del hablante: las reglas trabajan en relativo."""
+    def __init__(self, alpha=0.1):
+        self.alpha = alpha
+        self.pitch = None
+        self.energy = None
+
+    def update(self, pitch, energy):
+        if self.pitch is None:
+            self.pitch, self.energy = pitch, energy
+        else:
+            self.pitch += self.alpha * (pitch - self.pitch)
+            self.energy += self.alpha * (energy - self.energy)
+
+    def reset(self):
+        self.pitch = None
+        self.energy = None
+
+class ProsodyEngine:
+    backend = "prosody"
+
+    def __init__(self, model=None, rate=RATE, baseline_alpha=0.1):
+        self.rate = rate
+        self.window = np.hanning(FRAME).astype(np.float32)
+        # Autocorrelación de la propia ventana, para corregir la caída con el lag
+        win_spec = np.fft.rfft(self.window, NFFT)
+        self.window_ac = np.fft.irfft(win_spec * np.conj(win_spec), NFFT)[:FRAME]
+        self.window_ac /= self.window_ac[0]
+        self.lag_min = int(rate / F0_MAX)
+        self.lag_max = int(rate / F0_MIN)
+        freqs = np.fft.rfftfreq(NFFT, 1.0 / rate)
+        self.low_band = (freqs >= 50) & (freqs < 1000)
+        self.high_band = (freqs >= 1000) & (freqs < 4000)
+        self.baseline = SpeakerBaseline(baseline_alpha)
+        self.load_model(model or DEFAULT_MODEL)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def load_model(self, model):
+        self.states = list(model["states"])
+        self.center = np.asarray(model["center"], dtype=np.float64)
+        self.scale = np.asarray(model["scale"], dtype=np.float64)
+        self.weights = np.asarray(model["weights"], dtype=np.float64)
+        self.bias = np.asarray(model["bias"], dtype=np.float64)
+
+    def to_dict(self):
+        return {"states": self.states, "center": self.center.tolist(), "scale": self.scale.tolist(),
+                "weights": self.weights.tolist(), "bias": self.bias.tolist()}
+
+    def reset(self):
+        self.baseline.reset()
+
+    def extract(self, audio, update_baseline=True):
+        """Vector de características (ver FEATURES) de una ventana de audio, o None si es silencio."""
+        if len(audio) < FRAME: return None
+        frames = sliding_window_view(audio, FRAME)[::HOP] * self.window
+        spec = np.fft.rfft(frames, NFFT, axis=1)
+        power = spec.real ** 2 + spec.imag ** 2
+
+        energy_db = 10.0 * np.log10(power.sum(axis=1) / NFFT + 1e-10)
+        active = energy_db > SILENCE_DB
+        if active.sum() < 3: return None
+
+        # Tono: pico de la autocorrelación normalizada dentro del rango de voz
+        ac = np.fft.irfft(power, NFFT, axis=1)[:, :FRAME]
+        ac = ac[:, self.lag_min:self.lag_max + 1] / (ac[:, :1] * self.window_ac[self.lag_min:self.lag_max + 1] + 1e-10)
+        best = ac.argmax(axis=1)
+        strength = ac[np.arange(len(ac)), best]
+        voiced = active & (strength > VOICING_THRESHOLD)
+        f0 = self.rate / (best + self.lag_min)
+
+        # Inclinación espectral: energía 1-4 kHz frente a 50 Hz-1 kHz (dB)
+        low = power[active][:, self.low_band].sum()
+        high = power[active][:, self.high_band].sum()
+        tilt = 10.0 * np.log10((high + 1e-10) / (low + 1e-10))
+
+        # Ritmo: núcleos silábicos = picos de la envolvente de energía (>= 100 ms entre sí)
+        envelope = np.convolve(energy_db, np.ones(5) / 5, mode="same")
+        peaks, _ = find_peaks(envelope, prominence=3.0, distance=10)
+        seconds_active = max(active.sum() * HOP / self.rate, 0.1)
+        rate = len(peaks) / seconds_active
+
+        energy = float(energy_db[active].mean())
+        if voiced.sum() >= 3:
+            semitones = 12.0 * np.log2(f0[voiced] / 100.0)
+            pitch, pitch_var = float(np.median(semitones)), float(semitones.std())
+        else:
+            pitch, pitch_var = self.baseline.pitch or 0.0, 0.0
+
+        if update_baseline or self.baseline.pitch is None:
+            self.baseline.update(pitch, energy)
+        return np.array([pitch - self.baseline.pitch, pitch_var, energy - self.baseline.energy,
+                         float(energy_db[active].std()), rate, tilt, voiced.sum() / len(voiced)])
+
+    def scores(self, features):
+        z = (features - self.center) / self.scale
+        return self.weights @ z + self.bias
+
+    def probabilities(self, features):
+        s = self.scores(features)
+        e = np.exp(s - s.max())
+        return e / e.sum()
+
+    def predict(self, audio):
+        """(estado, confianza) de la ventana; ("neutral", 1.0) si no hay voz."""
+        features = self.extract(audio)
+        if features is None:
+            return "neutral", 1.0
+        probs = self.probabilities(features)
+        idx = int(probs.argmax())
+        return self.states[idx], float(probs[idx])
+
+    def fit(self, features, labels, l2=1.0):
+        """
+        Ajusta los pesos por regresión ridge uno-contra-todos (sin dependencias
+        extra). features: (N, len(FEATURES)); labels: estados del avatar.
+        """
+        features = np.asarray(features, dtype=np.float64)
+        self.states = sorted(set(labels), key=lambda s: (s != "neutral", s))
+        self.center = features.mean(axis=0)
+        self.scale = features.std(axis=0) + 1e-6
+        z = (features - self.center) / self.scale
+        X = np.hstack([z, np.ones((len(z), 1))])
+        Y = np.array([[1.0 if lbl == s else -1.0 for s in self.states] for lbl in labels])
+        reg = l2 * np.eye(X.shape[1])
+        reg[-1, -1] = 0.0
+        W = np.linalg.solve(X.T @ X + reg, X.T @ Y)
+        self.weights = W[:-1].T
+        self.bias = W[-1]
@@ -0,0 +1,128 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+import math
+from collections import OrderedDict, namedtuple
+from PyQt6.QtCore import Qt, QRectF
+from PyQt6.QtGui import QTransform, QImage, QPixmap, QPainter, QColor
+from PyQt6.QtWidgets import QGraphicsScene, QGraphicsPixmapItem, QGraphicsDropShadowEffect
+
+# Caché de frames del avatar listos para pintar: cada QPixmap ya está
+# escalado al tamaño del label (en píxeles físicos), volteado si hace falta
+# y con su devicePixelRatio. Abrir/cerrar la boca o volver a una emoción ya
+# vista es cambiar de pixmap, sin decodificar el PNG ni reescalar. La sombra
+# también va horneada en el frame: se difumina una sola vez, no en cada repintado.
+
+FrameKey = namedtuple("FrameKey", "profile emotion state width height flipped dpr shadow")
+
+DEFAULT_BUDGET_MB = 64
+
+# Misma sombra que daba el QGraphicsDropShadowEffect en vivo
+SHADOW_BLUR = 20
+SHADOW_COLOR = (0, 0, 0, 150)
+SHADOW_OFFSET = 5
+
+def pixmap_bytes(pixmap):
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+def render_frame(source, width, height, flipped=False, dpr=1.0):
+    """Escala la imagen fuente al label (tamaño lógico * dpr) y la voltea si se pide."""
+    frame = source.scaled(max(1, round(width * dpr)), max(1, round(height * dpr)),
+                          Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+    if flipped:
+        # Voltear ya escalado: mismo resultado, menos píxeles que mover
+        frame = frame.transformed(QTransform().scale(-1, 1))
+    frame.setDevicePixelRatio(dpr)
+    return frame
+
+def shadow_margin(dpr=1.0):
+    """Borde transparente (en píxeles físicos) que rodea al sprite en un frame con sombra."""
+    return math.ceil((SHADOW_BLUR + SHADOW_OFFSET) * dpr)
+
+def bake_shadow(frame, dpr=1.0):
+    """Compone la sombra (máscara alfa difuminada y desplazada) bajo el sprite, una sola vez.
+
+    Usa el mismo filtro que QGraphicsDropShadowEffect, así que el resultado es
+    idéntico a la sombra en vivo. El frame crece shadow_margin(dpr) por lado.
+    """
+    margin = shadow_margin(dpr)
+    sprite = QPixmap.fromImage(frame) if isinstance(frame, QImage) else QPixmap(frame)
+    sprite.setDevicePixelRatio(1.0) # La escena trabaja en píxeles físicos
+    effect = QGraphicsDropShadowEffect()
+    effect.setBlurRadius(SHADOW_BLUR * dpr)
+    effect.setColor(QColor(*SHADOW_COLOR))
+    effect.setOffset(0, SHADOW_OFFSET * dpr)
+    item = QGraphicsPixmapItem(sprite)
+    item.setGraphicsEffect(effect)
+    scene = QGraphicsScene()
+    scene.addItem(item)
+
+    out = QImage(sprite.width() + 2 * margin, sprite.height() + 2 * margin, QImage.Format.Format_ARGB32_Premultiplied)
+    out.fill(Qt.GlobalColor.transparent)
+    target = QRectF(0, 0, out.width(), out.height())
+    painter = QPainter(out)
+    scene.render(painter, target, target.translated(-margin, -margin))
+    painter.end()
+    out.setDevicePixelRatio(dpr)
+    return out
+
+class RenderCache:
+    """LRU de frames por FrameKey con presupuesto de memoria."""
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        self.entries = OrderedDict() # FrameKey -> QPixmap
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+
+    def set_budget(self, budget_mb):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.evict()
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        pixmap = self.entries.get(key)
+        if pixmap is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return pixmap
+
+    def put(self, key, pixmap):
+        old = self.entries.pop(key, None)
+        if old is not None: self.used -= pixmap_bytes(old)
+        self.entries[key] = pixmap
+        self.used += pixmap_bytes(pixmap)
+        self.evict()
+
+    def evict(self):
+        # El frame recién insertado se conserva aunque por sí solo pase el presupuesto
+        while self.used > self.budget and len(self.entries) > 1:
+            _, pixmap = self.entries.popitem(last=False)
+            self.used -= pixmap_bytes(pixmap)
+
+    def invalidate(self, profile=None):
+        """Descarta los frames de un perfil (o todos si profile es None)."""
+        for key in [k for k in self.entries if profile is None or k.profile == profile]:
+            self.used -= pixmap_bytes(self.entries.pop(key))
+
+    def stats(self):
+        return {"frames": len(self.entries), "bytes": self.used, "budget": self.budget,
+                "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,113 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+import os
+import sys
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Uso de memoria del proceso sin dependencias obligatorias:
+#   rss    = páginas residentes (incluye las compartidas con otros procesos)
+#   shared = parte de rss respaldada por archivos (p.ej. pesos mapeados)
+#   pss    = rss repartiendo las páginas compartidas entre quienes las usan (solo Linux)
+
+def read_smaps_rollup(pid="self"):
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[2] == "kB":
+                    values[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    except OSError:
+        pass
+    return values
+
+def memory_usage(pid=None):
+    """{'rss', 'shared', 'pss'} en bytes (None si el sistema no lo expone); nunca lanza."""
+    usage = {"rss": None, "shared": None, "pss": None}
+    proc = "self" if pid is None else str(pid)
+    try:
+        with open(f"/proc/{proc}/statm", "r") as f:
+            _, resident, shared = (int(v) for v in f.read().split()[:3])
+        page = os.sysconf("SC_PAGE_SIZE")
+        usage["rss"], usage["shared"] = resident * page, shared * page
+        usage["pss"] = read_smaps_rollup(proc).get("Pss")
+        return usage
+    except OSError:
+        pass
+    if psutil is not None:
+        try:
+            info = psutil.Process(pid).memory_info()
+            usage["rss"] = info.rss
+            usage["shared"] = getattr(info, "shared", None)
+        except psutil.Error:
+            pass
+    elif pid is None:
+        try:
+            import resource
+        except ImportError:
+            return usage # Windows sin psutil: no hay de dónde leerlo
+        # Sin /proc ni psutil solo hay el pico (KB en Linux, bytes en macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        usage["rss"] = peak if sys.platform == "darwin" else peak * 1024
+    return usage
+
+def peak_memory():
+    """Pico de memoria residente del proceso en bytes (VmHWM en Linux), o None."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return psutil.Process().memory_info().peak_wset if psutil is not None and os.name == "nt" else None
+
+def release_memory():
+    """
+    Devuelve al sistema la memoria ya liberada: recolector de Python, cachés de
+    torch (solo si ya estaba importado) y, en glibc, malloc_trim.
+    """
+    import gc
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        if torch.backends.mps.is_available():
+            torch.mps.empty_cache()
+    if sys.platform.startswith("linux"):
+        try:
+            import ctypes
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+def format_bytes(value):
+    if value is None: return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{value:.0f} {unit}" if unit in ("B", "KB") else f"{value:.1f} {unit}"
+        value /= 1024
@@ -12,14 +12,19 @@ from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
                              QWidget, QPushButton, QGroupBox, QFormLayout, 
                              QRadioButton, QButtonGroup, QScrollArea, QGridLayout, QFrame,
                              QTableWidget, QTableWidgetItem, QHeaderView, 
-                             QMenu, QInputDialog, QMessageBox, QColorDialog)
+                             QMenu, QInputDialog, QMessageBox, QColorDialog, QLineEdit, QSpinBox,
+                             QFileDialog)
 from PyQt6.QtGui import QAction, QFont, QDesktopServices
-from PyQt6.QtCore import Qt, QSize, pyqtSignal, QUrl, QTimer
-from PyQt6.QtGui import QPixmap, QIcon, QColor, QPainter, QPainterPath
+from PyQt6.QtCore import Qt, QSize, pyqtSignal, QUrl, QTimer, QRegularExpression
+from PyQt6.QtGui import QPixmap, QIcon, QColor, QPainter, QPainterPath, QRegularExpressionValidator
 
 from ui_components import PillProgressBar
 from hotkey_gui import HotkeyRecorderDialog
 from core_systems import SUPPORTED_MODELS, get_model_path
+from model_registry import get_registry, read_num_layers
+from cpu_budget import available_cores, parse_core_list
+from inference_daemon import daemon_supported
+from resource_monitor import memory_usage, format_bytes
 
 # --- WIDGET PERSONALIZADO: TARJETA DE AVATAR ---
 class AvatarCard(QFrame):
@@ -156,13 +161,17 @@ class SettingsDialog(QDialog):
 
     def showEvent(self, event):
         self.main_window.audio_thread.audio_data_signal.connect(self.update_audio_bar)
+        self.update_memory_gauge()
+        self.memory_timer.start()
         super().showEvent(event)
 
-    def closeEvent(self, event):
+    def hideEvent(self, event):
+        # Par de showEvent: Esc cierra con reject() sin pasar por closeEvent
         try:
             self.main_window.audio_thread.audio_data_signal.disconnect(self.update_audio_bar)
         except: pass
-        super().closeEvent(event)
+        self.memory_timer.stop()
+        super().hideEvent(event)
 
     def update_audio_bar(self, chunk):
         try:
@@ -318,6 +327,64 @@ class SettingsDialog(QDialog):
         bounce_layout.addRow("Velocidad:", self.speed_slider)
         bounce_group.setLayout(bounce_layout)
         layout.addWidget(bounce_group)
+
+        fade_group = QGroupBox("Transiciones")
+        fade_layout = QFormLayout()
+        self.fade_cb = QCheckBox("Fundido entre estados")
+        self.fade_cb.setChecked(self.main_window.crossfade_enabled)
+        self.fade_cb.setToolTip("Los fundidos se generan en segundo plano al cargar la skin\n"
+                                "(usa más memoria; los pares que no quepan cambian en seco).")
+        self.fade_cb.toggled.connect(self.main_window.set_crossfade_enabled)
+        fade_layout.addRow(self.fade_cb)
+        self.fade_combo = QComboBox()
+        for text, value in [("Rápido (60 ms)", 60), ("Normal (90 ms)", 90), ("Suave (150 ms)", 150), ("Lento (250 ms)", 250)]:
+            self.fade_combo.addItem(text, value)
+            if value == self.main_window.crossfade_ms:
+                self.fade_combo.setCurrentIndex(self.fade_combo.count() - 1)
+        self.fade_combo.currentIndexChanged.connect(
+            lambda _: self.main_window.set_crossfade_ms(self.fade_combo.currentData()))
+        fade_layout.addRow("Duración:", self.fade_combo)
+        fade_group.setLayout(fade_layout)
+        layout.addWidget(fade_group)
+
+        skin_group = QGroupBox("Memoria de Skins")
+        skin_layout = QFormLayout()
+        self.skin_cache_combo = QComboBox()
+        for text, value in [("64 MB", 64), ("128 MB", 128), ("256 MB", 256), ("512 MB", 512)]:
+            self.skin_cache_combo.addItem(text, value)
+            if value == self.main_window.config.get("skin_cache_mb", 128):
+                self.skin_cache_combo.setCurrentIndex(self.skin_cache_combo.count() - 1)
+        self.skin_cache_combo.setToolTip("Las skins usadas hace poco se quedan decodificadas en memoria:\n"
+                                         "volver a ellas es instantáneo. La skin en pantalla nunca se descarta.")
+        self.skin_cache_combo.currentIndexChanged.connect(
+            lambda _: self.main_window.set_skin_cache_budget(self.skin_cache_combo.currentData()))
+        skin_layout.addRow("Presupuesto:", self.skin_cache_combo)
+        self.render_cache_combo = QComboBox()
+        for text, value in [("32 MB", 32), ("64 MB", 64), ("128 MB", 128), ("256 MB", 256)]:
+            self.render_cache_combo.addItem(text, value)
+            if value == self.main_window.config.get("render_cache_mb", 64):
+                self.render_cache_combo.setCurrentIndex(self.render_cache_combo.count() - 1)
+        self.render_cache_combo.setToolTip("Frames ya escalados al tamaño de la ventana (por emoción, boca y sombra):\n"
+                                           "con más memoria, volver a un estado no vuelve a escalar la imagen.")
+        self.render_cache_combo.currentIndexChanged.connect(
+            lambda _: self.main_window.set_render_cache_budget(self.render_cache_combo.currentData()))
+        skin_layout.addRow("Frames escalados:", self.render_cache_combo)
+        skin_group.setLayout(skin_layout)
+        layout.addWidget(skin_group)
+
+        shm_group = QGroupBox("Salida para OBS / Compositores")
+        shm_layout = QFormLayout()
+        shm_name = self.main_window.config_manager.get("shm_output_name", "alterego_avatar")
+        self.shm_cb = QCheckBox("Publicar frames en memoria compartida")
+        self.shm_cb.setChecked(self.main_window.shm_output is not None)
+        self.shm_cb.setToolTip("Cada frame del avatar (con transparencia) se escribe en un segmento de memoria\n"
+                               "compartida que otras apps leen sin capturar la ventana ni usar chroma key.\n"
+                               "Probar con: python tools/shm_reader.py")
+        self.shm_cb.toggled.connect(self.main_window.set_shm_output_enabled)
+        shm_layout.addRow(self.shm_cb)
+        shm_layout.addRow("Segmento:", QLabel(shm_name))
+        shm_group.setLayout(shm_layout)
+        layout.addWidget(shm_group)
         
         layout.addStretch()
         return tab
@@ -398,7 +465,8 @@ class SettingsDialog(QDialog):
 
         self.main_window.profile_manager.scan_profiles()
         profiles = self.main_window.profile_manager.profiles
-        current_profile = self.main_window.profile_manager.current_profile
+        # La skin pedida se marca ya, aunque siga decodificándose en segundo plano
+        current_profile = self.main_window.bg_manager.pending_profile or self.main_window.profile_manager.current_profile
         root_folder = self.main_window.profile_manager.root_folder
 
         # Excluir 'Default' del conteo visual
@@ -545,10 +613,11 @@ class SettingsDialog(QDialog):
             "happiness": "😄 Emoción: Felicidad",
             "sadness": "😢 Emoción: Tristeza",
             "anger": "😡 Emoción: Enojo",
-            "surprise": "😲 Emoción: Sorpresa"
+            "surprise": "😲 Emoción: Sorpresa",
+            "next_skin": "👕 Siguiente Skin"
         }
         
-        order = ["mute_toggle", "ai_mode", "neutral", "happiness", "sadness", "anger", "fear", "disgust", "surprise"]
+        order = ["mute_toggle", "ai_mode", "neutral", "happiness", "sadness", "anger", "fear", "disgust", "surprise", "next_skin"]
         
         row = 0
         for action in order:
@@ -648,10 +717,18 @@ class SettingsDialog(QDialog):
         if hasattr(self, 'lbl_model_path'):
             path = get_model_path(model_config["id"])
             if path:
-                self.lbl_model_path.setText(f"📂 {path}")
+                info = f"📂 {path}"
+                if model_config.get("revision"):
+                    size_mb = model_config.get("size_bytes", 0) / (1024 * 1024)
+                    info += f"\n🔖 {model_config['revision'][:12]} · {size_mb:.0f} MB"
+                self.lbl_model_path.setText(info)
                 self.lbl_model_path.setToolTip(path)
                 self.btn_open_model.setEnabled(True)
                 self.current_model_path = path
+            elif model_config.get("backend", "torch") != "torch":
+                self.lbl_model_path.setText("✅ Incluido en la app (no requiere descarga)")
+                self.btn_open_model.setEnabled(False)
+                self.current_model_path = None
             else:
                 self.lbl_model_path.setText("⚠️ Modelo no descargado")
                 self.btn_open_model.setEnabled(False)
@@ -662,6 +739,88 @@ class SettingsDialog(QDialog):
             emotions = ", ".join(model_config["avatar_states"])
             self.lbl_emotions.setText(f"Emociones: {emotions}")
 
+        # 3. Capas del encoder: hasta las que tiene este modelo (24 si aún no está descargado)
+        if hasattr(self, 'spin_layers'):
+            path = get_model_path(model_config["id"])
+            layers = read_num_layers(path) if path else None
+            self.spin_layers.setMaximum(layers or 24)
+            self.spin_layers.setToolTip(f"El modelo tiene {layers} capas." if layers else "")
+
+    def update_memory_gauge(self):
+        usage = memory_usage()
+        text = f"{format_bytes(usage['rss'])} residente"
+        if usage["pss"] is not None:
+            text += f" ({format_bytes(usage['pss'])} propia)"
+        self.lbl_memory.setText(f"{text} · Modelo: {self.main_window.emotion_model_status()}")
+
+    def create_cpu_budget_group(self):
+        config = self.main_window.config_manager
+        cpu_group = QGroupBox("Presupuesto de CPU")
+        cpu_layout = QFormLayout()
+
+        self.chk_cpu_budget = QCheckBox("Limitar núcleos usados por la IA")
+        self.chk_cpu_budget.setChecked(config.get("cpu_budget_enabled", False))
+        self.chk_cpu_budget.toggled.connect(lambda v: config.set("cpu_budget_enabled", v))
+        cpu_layout.addRow("", self.chk_cpu_budget)
+
+        cores = available_cores()
+        self.txt_cpu_cores = QLineEdit(str(config.get("cpu_inference_cores", "") or ""))
+        self.txt_cpu_cores.setPlaceholderText(f"Ej: 0-3 (vacío = todos, disponibles: {cores[0]}-{cores[-1]})")
+        # Solo lo que entiende parse_core_list (los dígitos ya no los roban los atajos: ver HotkeyManager)
+        self.txt_cpu_cores.setValidator(QRegularExpressionValidator(QRegularExpression(r"[0-9,\- ]*"), self.txt_cpu_cores))
+        self.txt_cpu_cores.editingFinished.connect(self.on_cpu_cores_changed)
+        cpu_layout.addRow("Núcleos IA:", self.txt_cpu_cores)
+
+        self.audio_core_combo = QComboBox()
+        self.audio_core_combo.addItem("Automático (último núcleo)", None)
+        for core in cores:
+            self.audio_core_combo.addItem(f"Núcleo {core}", core)
+            if core == config.get("cpu_audio_core"):
+                self.audio_core_combo.setCurrentIndex(self.audio_core_combo.count() - 1)
+        self.audio_core_combo.currentIndexChanged.connect(
+            lambda _: config.set("cpu_audio_core", self.audio_core_combo.currentData()))
+        cpu_layout.addRow("Núcleo de Audio:", self.audio_core_combo)
+
+        lbl_note = QLabel("Se aplica al reiniciar la aplicación.")
+        lbl_note.setStyleSheet("color: #777; font-size: 11px; font-style: italic;")
+        cpu_layout.addRow("", lbl_note)
+
+        cpu_group.setLayout(cpu_layout)
+        return cpu_group
+
+    def on_cpu_cores_changed(self):
+        cores = parse_core_list(self.txt_cpu_cores.text())
+        text = ",".join(str(c) for c in cores)
+        self.txt_cpu_cores.setText(text)
+        self.main_window.config_manager.set("cpu_inference_cores", text)
+
+    def on_encoder_depth_changed(self):
+        layers = self.spin_layers.value()
+        confidence = self.exit_combo.currentData()
+        config = self.main_window.config_manager
+        if layers == config.get("encoder_layers", 0) and confidence == config.get("early_exit_confidence", 0.0):
+            return
+        self.main_window.set_encoder_depth(layers, confidence)
+
+    def register_local_model(self):
+        path = QFileDialog.getExistingDirectory(self, "Carpeta del modelo (con config.json)")
+        if not path: return
+        name, ok = QInputDialog.getText(self, "Registrar modelo", "Nombre visible:", text=os.path.basename(path))
+        if not ok: return
+        success, result = get_registry().register_local(path, name=name.strip() or None)
+        if not success:
+            QMessageBox.warning(self, "Registrar modelo", result)
+            return
+        index = self.model_combo.findData(result)
+        if index < 0:
+            self.model_combo.addItem(SUPPORTED_MODELS[result]["name"], result)
+            index = self.model_combo.count() - 1
+        self.model_combo.setCurrentIndex(index)
+
+    def open_calibration(self):
+        from calibration_dialog import CalibrationDialog
+        CalibrationDialog(self.main_window).exec()
+
     def open_model_folder(self):
         if hasattr(self, 'current_model_path') and self.current_model_path:
             QDesktopServices.openUrl(QUrl.fromLocalFile(self.current_model_path))
@@ -702,9 +861,15 @@ class SettingsDialog(QDialog):
         self.btn_open_model.setToolTip("Abrir en Explorador")
         self.btn_open_model.clicked.connect(self.open_model_folder)
         
+        self.btn_register_model = QPushButton("➕")
+        self.btn_register_model.setFixedSize(30, 30)
+        self.btn_register_model.setToolTip("Registrar modelo local")
+        self.btn_register_model.clicked.connect(self.register_local_model)
+
         path_layout = QHBoxLayout()
         path_layout.addWidget(self.lbl_model_path)
         path_layout.addWidget(self.btn_open_model)
+        path_layout.addWidget(self.btn_register_model)
         
         ai_layout.addRow(QLabel("Ruta del Modelo:"))
         ai_layout.addRow(path_layout)
@@ -715,6 +880,104 @@ class SettingsDialog(QDialog):
         
         ai_layout.addRow(QLabel("Emociones Soportadas:"))
         ai_layout.addRow(self.lbl_emotions)
+
+        # Profundidad del encoder (menos capas = menos latencia, algo menos de precisión)
+        config = self.main_window.config_manager
+        self.spin_layers = QSpinBox()
+        self.spin_layers.setRange(0, 24)
+        self.spin_layers.setSpecialValueText("Todas")
+        self.spin_layers.setValue(config.get("encoder_layers", 0))
+        self.spin_layers.editingFinished.connect(self.on_encoder_depth_changed)
+        ai_layout.addRow("Capas del Encoder:", self.spin_layers)
+
+        self.exit_combo = QComboBox()
+        for text, value in [("Desactivada", 0.0), ("Confianza 95%", 0.95), ("Confianza 90%", 0.9),
+                            ("Confianza 80%", 0.8), ("Confianza 70%", 0.7)]:
+            self.exit_combo.addItem(text, value)
+            if value == config.get("early_exit_confidence", 0.0):
+                self.exit_combo.setCurrentIndex(self.exit_combo.count() - 1)
+        self.exit_combo.currentIndexChanged.connect(lambda _: self.on_encoder_depth_changed())
+        ai_layout.addRow("Salida Temprana:", self.exit_combo)
+
+        self.cascade_combo = QComboBox()
+        for text, value in [("Desactivada", 0.0), ("Confianza 90%", 0.9), ("Confianza 80%", 0.8),
+                            ("Confianza 70%", 0.7), ("Confianza 60%", 0.6)]:
+            self.cascade_combo.addItem(text, value)
+            if value == config.get("cascade_confidence", 0.0):
+                self.cascade_combo.setCurrentIndex(self.cascade_combo.count() - 1)
+        self.cascade_combo.currentIndexChanged.connect(
+            lambda _: self.main_window.set_cascade_confidence(self.cascade_combo.currentData()))
+        self.cascade_combo.setToolTip("Emoción provisional por prosodia al instante; el modelo\n"
+                                      "solo se ejecuta cuando la prosodia duda o cambia.")
+        ai_layout.addRow("Cascada Rápida:", self.cascade_combo)
+
+        self.hop_combo = QComboBox()
+        for text, value in [("2.0 s (sin solapamiento)", 2.0), ("1.0 s", 1.0), ("0.5 s", 0.5), ("0.25 s", 0.25)]:
+            self.hop_combo.addItem(text, value)
+            if value == config.get("emotion_hop_seconds", 2.0):
+                self.hop_combo.setCurrentIndex(self.hop_combo.count() - 1)
+        self.hop_combo.currentIndexChanged.connect(lambda _: self.main_window.set_emotion_hop(self.hop_combo.currentData()))
+        ai_layout.addRow("Análisis cada:", self.hop_combo)
+
+        self.precision_combo = QComboBox()
+        for text, value in [("fp32 (original)", "fp32"), ("Automática (int8 en CPU, fp16 en GPU)", "auto"),
+                            ("int8 (CPU)", "int8"), ("fp16 (GPU)", "fp16")]:
+            self.precision_combo.addItem(text, value)
+            if value == config.get("model_precision", "fp32"):
+                self.precision_combo.setCurrentIndex(self.precision_combo.count() - 1)
+        self.precision_combo.currentIndexChanged.connect(
+            lambda _: self.main_window.set_model_precision(self.precision_combo.currentData()))
+        self.precision_combo.setToolTip("Las variantes int8/fp16 solo se usan si al construirlas dan las mismas\n"
+                                        "predicciones que fp32 en la comprobación de paridad; si no, se usa fp32.\n"
+                                        "La paridad se mide con audio sintético: elegirlas puede cambiar algo las emociones.")
+        ai_layout.addRow("Precisión:", self.precision_combo)
+
+        self.runtime_combo = QComboBox()
+        for text, value in [("PyTorch", "torch"), ("NumPy (sin torch, solo fp32)", "numpy")]:
+            self.runtime_combo.addItem(text, value)
+            if value == config.get("inference_runtime", "torch"):
+                self.runtime_combo.setCurrentIndex(self.runtime_combo.count() - 1)
+        self.runtime_combo.setToolTip("NumPy evita importar torch: arranque más rápido y menos RAM.\n"
+                                      "Si el modelo no es compatible se usa PyTorch.")
+        self.runtime_combo.currentIndexChanged.connect(
+            lambda _: self.main_window.set_inference_runtime(self.runtime_combo.currentData()))
+        ai_layout.addRow("Motor:", self.runtime_combo)
+
+        self.chk_daemon = QCheckBox("Mantener el modelo cargado entre sesiones")
+        self.chk_daemon.setChecked(config.get("inference_daemon", False))
+        self.chk_daemon.setToolTip("Un proceso en segundo plano conserva el modelo en memoria:\n"
+                                   "tras el primer arranque la app abre en menos de un segundo.\n"
+                                   "Se cierra solo tras una hora sin uso.")
+        self.chk_daemon.setEnabled(daemon_supported())
+        self.chk_daemon.toggled.connect(self.main_window.set_inference_daemon)
+        ai_layout.addRow("Daemon:", self.chk_daemon)
+
+        self.idle_combo = QComboBox()
+        for text, value in [("Nunca", 0), ("1 min", 1), ("5 min", 5), ("15 min", 15), ("30 min", 30)]:
+            self.idle_combo.addItem(text, value)
+            if value == config.get("idle_unload_minutes", 5):
+                self.idle_combo.setCurrentIndex(self.idle_combo.count() - 1)
+        self.idle_combo.currentIndexChanged.connect(
+            lambda _: self.main_window.set_idle_unload_minutes(self.idle_combo.currentData()))
+        self.idle_combo.setToolTip("Tiempo en modo manual (emociones por atajos) tras el cual\n"
+                                   "se descarga el modelo. Vuelve a cargarse al activar el modo IA.")
+        ai_layout.addRow("Descargar sin IA tras:", self.idle_combo)
+
+        self.lbl_memory = QLabel()
+        self.lbl_memory.setStyleSheet("color: #aaa; font-size: 11px;")
+        ai_layout.addRow("Memoria:", self.lbl_memory)
+        self.memory_timer = QTimer(self)
+        self.memory_timer.setInterval(2000)
+        self.memory_timer.timeout.connect(self.update_memory_gauge)
+
+        self.btn_calibrate = QPushButton("🎯 Calibrar con mi voz...")
+        self.btn_calibrate.setToolTip("Graba clips por emoción y reentrena solo la cabeza del modelo (se guarda en la skin)")
+        self.btn_calibrate.clicked.connect(self.open_calibration)
+        ai_layout.addRow("Calibración:", self.btn_calibrate)
+
+        lbl_depth = QLabel("Útil en CPUs lentas. Mide el impacto con tools/evaluate_depth.py.")
+        lbl_depth.setStyleSheet("color: #777; font-size: 11px; font-style: italic;")
+        ai_layout.addRow("", lbl_depth)
         
         # Inicializar info con el modelo actual
         self.update_model_info(current_model)
@@ -722,6 +985,8 @@ class SettingsDialog(QDialog):
         ai_group.setLayout(ai_layout)
         layout.addWidget(ai_group)
 
+        layout.addWidget(self.create_cpu_budget_group())
+
         path_group = QGroupBox("Ubicación del Proyecto")
         path_layout = QVBoxLayout()
         current_path = os.getcwd()
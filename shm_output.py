@@ -0,0 +1,188 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+import struct
+import ctypes
+from multiprocessing import shared_memory
+
+from resource_monitor import format_bytes
+
+# Salida de frames por memoria compartida (POSIX shm en Linux/macOS) para OBS,
+# compositores o herramientas de captura: sin captura de ventana ni chroma key.
+#
+# Disposición del segmento (little-endian):
+#   Cabecera (128 bytes)
+#     magic      8s  b"AEGOSHM1"
+#     version    I   1
+#     state      I   1 = activo, 0 = cerrado (el lector debe volver a abrir)
+#     counter    Q   frames publicados; sube después de cambiar front
+#     front      I   slot con el último frame completo
+#     slots      I   2 (doble buffer)
+#     capacity   Q   bytes de píxeles por slot
+#     por slot (24 bytes, desde el byte 40): width I, height I, stride I, format I, frame Q
+#   Slots de píxeles, desde el byte 128, alineados a 64 bytes.
+#
+# Formato 1 = RGBA8888 premultiplicado (bytes R, G, B, A). El escritor pinta
+# siempre en el slot de atrás y solo entonces lo publica, así un lector que lee
+# front nunca ve un frame a medias. Tras publicar, el front anterior pasa a ser
+# el slot de atrás y el siguiente frame se pinta encima: si counter cambió
+# mientras se leía, la copia puede estar mezclada y hay que releer.
+
+MAGIC = b"AEGOSHM1"
+VERSION = 1
+FORMAT_RGBA8888_PREMULTIPLIED = 1
+SLOTS = 2
+HEADER_SIZE = 128
+DEFAULT_NAME = "alterego_avatar"
+
+_HEADER = struct.Struct("<8sIIQIIQ") # magic, version, state, counter, front, slots, capacity
+_SLOT = struct.Struct("<IIIIQ") # width, height, stride, format, frame
+_SLOT_TABLE = _HEADER.size # 40: la tabla de slots va justo después
+_COUNTER_OFFSET = 16
+
+def _align(n, to=64):
+    return (n + to - 1) // to * to
+
+def slot_offset(index, capacity):
+    return HEADER_SIZE + index * _align(capacity)
+
+class ShmFrameWriter:
+    """Publica frames del avatar en un doble buffer de memoria compartida."""
+
+    def __init__(self, name=DEFAULT_NAME):
+        self.name = name
+        self.shm = None
+        self.capacity = 0
+        self.counter = 0
+        self.front = 0
+        self.pending = None # (slot, width, height, stride) del frame en curso
+        self.image = None
+
+    def ensure_capacity(self, nbytes):
+        """Crea el segmento (o uno más grande, avisando a los lectores) si el frame no cabe."""
+        if self.shm is not None and nbytes <= self.capacity: return
+        self.close()
+        capacity = _align(int(nbytes * 1.25)) # Margen para no recrear en cada resize
+        try:
+            self.shm = shared_memory.SharedMemory(self.name, create=True, size=slot_offset(SLOTS, capacity))
+        except FileExistsError:
+            # Quedó de una ejecución que no cerró bien: se reemplaza
+            stale = shared_memory.SharedMemory(self.name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(self.name, create=True, size=slot_offset(SLOTS, capacity))
+        self.capacity = capacity
+        self.front = 0
+        _HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, 1, self.counter, self.front, SLOTS, capacity)
+        print(f"📡 Salida por memoria compartida: {self.name} ({format_bytes(slot_offset(SLOTS, capacity))})")
+
+    def begin_frame(self, width, height, dpr=1.0):
+        """QImage (RGBA premultiplicado) que pinta directamente en el slot de atrás, sin copias."""
+        from PyQt6 import sip
+        from PyQt6.QtGui import QImage
+        stride = width * 4
+        self.ensure_capacity(stride * height)
+        slot = 1 - self.front
+        pointer = ctypes.c_char.from_buffer(self.shm.buf, slot_offset(slot, self.capacity))
+        address = ctypes.addressof(pointer)
+        del pointer # No dejar exportado el buffer: impediría cerrar el segmento
+        self.image = QImage(sip.voidptr(address), width, height, stride, QImage.Format.Format_RGBA8888_Premultiplied)
+        self.image.setDevicePixelRatio(dpr)
+        self.pending = (slot, width, height, stride)
+        return self.image
+
+    def commit(self):
+        """Publica el frame pintado: primero su descripción, luego front y al final counter."""
+        if self.pending is None: return
+        self.image = None # El QImage apunta a memoria compartida: no debe sobrevivir al frame
+        slot, width, height, stride = self.pending
+        self.pending = None
+        self.counter += 1
+        _SLOT.pack_into(self.shm.buf, _SLOT_TABLE + slot * _SLOT.size,
+                        width, height, stride, FORMAT_RGBA8888_PREMULTIPLIED, self.counter)
+        struct.pack_into("<I", self.shm.buf, _COUNTER_OFFSET + 8, slot)
+        struct.pack_into("<Q", self.shm.buf, _COUNTER_OFFSET, self.counter)
+        self.front = slot
+
+    def close(self):
+        """Marca el segmento como cerrado (los lectores vuelven a abrir) y lo elimina."""
+        if self.shm is None: return
+        self.image = self.pending = None
+        struct.pack_into("<I", self.shm.buf, 12, 0)
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = None
+
+class ShmFrameReader:
+    """Lector de referencia: da acceso sin copias al último frame publicado."""
+
+    def __init__(self, name=DEFAULT_NAME):
+        self.shm = attach(name)
+        magic, version, _, _, _, slots, capacity = _HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.shm.close()
+            raise ValueError(f"{name} no es una salida de (AI)terEgo compatible")
+        self.slots, self.capacity = slots, capacity
+
+    def is_open(self):
+        """False si el escritor cerró o recreó el segmento (hay que volver a abrir)."""
+        return _HEADER.unpack_from(self.shm.buf, 0)[2] == 1
+
+    def counter(self):
+        return struct.unpack_from("<Q", self.shm.buf, _COUNTER_OFFSET)[0]
+
+    def latest(self):
+        """(counter, width, height, stride, memoryview de los píxeles) del frame publicado, o None.
+
+        El memoryview apunta a la memoria compartida: es válido solo hasta que
+        el escritor publique el siguiente frame; para conservarlo, usar read().
+        """
+        counter = self.counter()
+        if counter == 0: return None
+        front = struct.unpack_from("<I", self.shm.buf, _COUNTER_OFFSET + 8)[0]
+        width, height, stride, fmt, _ = _SLOT.unpack_from(self.shm.buf, _SLOT_TABLE + front * _SLOT.size)
+        start = slot_offset(front, self.capacity)
+        return counter, width, height, stride, self.shm.buf[start:start + stride * height]
+
+    def read(self):
+        """Copia consistente del último frame: (counter, width, height, stride, bytes), o None."""
+        while True:
+            frame = self.latest()
+            if frame is None: return None
+            counter, width, height, stride, pixels = frame
+            data = bytes(pixels)
+            pixels.release()
+            # Si el escritor publicó mientras copiábamos, ya pudo empezar a pintar en este slot
+            if self.counter() == counter: return counter, width, height, stride, data
+
+    def close(self):
+        self.shm.close()
+
+def attach(name):
+    """Abre un segmento existente sin que el resource_tracker de Python lo borre al salir."""
+    try:
+        return shared_memory.SharedMemory(name, track=False) # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
@@ -0,0 +1,152 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+import os
+from collections import OrderedDict
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from PyQt6.QtGui import QImage
+
+# Decodificación de skins fuera del hilo GUI. Al cambiar de skin se leen
+# todos sus PNG en un QThread (QImage, a diferencia de QPixmap, se puede usar
+# fuera del hilo GUI) y solo entonces se activa, así el primer frame de cada
+# estado no se decodifica en mitad de un stream. Las skins usadas hace poco
+# se quedan decodificadas en un LRU con presupuesto de memoria.
+
+DEFAULT_BUDGET_MB = 128
+
+def skin_files(folder):
+    if not os.path.isdir(folder): return []
+    return sorted(f for f in os.listdir(folder)
+                  if f.lower().endswith(".png") and os.path.isfile(os.path.join(folder, f)))
+
+def decode_skin(folder):
+    """{ruta: QImage} de cada PNG de la carpeta, en el formato que QPainter pinta más rápido."""
+    images = {}
+    for name in skin_files(folder):
+        path = os.path.join(folder, name)
+        image = QImage(path)
+        if not image.isNull():
+            images[path] = image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+    return images
+
+def skin_bytes(images):
+    return sum(img.sizeInBytes() for img in images.values())
+
+class SkinDecodeThread(QThread):
+    decoded_signal = pyqtSignal(str, int, object) # perfil, generación, {ruta: QImage}
+
+    def __init__(self, profile, folder, generation):
+        super().__init__()
+        self.profile = profile
+        self.folder = folder
+        self.generation = generation
+
+    def run(self):
+        self.decoded_signal.emit(self.profile, self.generation, decode_skin(self.folder))
+
+class SkinLoader(QObject):
+    """LRU de skins decodificadas (entre perfiles) que decodifica las nuevas en segundo plano."""
+    skin_ready = pyqtSignal(str)
+
+    def __init__(self, root_folder, budget_mb=DEFAULT_BUDGET_MB):
+        super().__init__()
+        self.root_folder = root_folder
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.skins = OrderedDict() # perfil -> {ruta: QImage}
+        self.sizes = {}
+        self.threads = {} # perfil -> SkinDecodeThread en curso
+        self.running = [] # Referencias hasta que terminan (incluye decodificaciones ya obsoletas)
+        self.generations = {} # sube al invalidar: descarta decodificaciones obsoletas
+        self.active = None # La skin en pantalla nunca se expulsa
+
+    def folder(self, profile):
+        return os.path.join(self.root_folder, profile)
+
+    def set_budget(self, budget_mb):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.evict()
+
+    def used(self):
+        return sum(self.sizes.values())
+
+    def is_ready(self, profile):
+        return profile in self.skins
+
+    def request(self, profile):
+        """True si la skin ya está decodificada; si no, la decodifica en segundo plano y emite skin_ready."""
+        if profile in self.skins:
+            self.skins.move_to_end(profile)
+            return True
+        generation = self.generations.get(profile, 0)
+        current = self.threads.get(profile)
+        if current is None or current.generation != generation:
+            thread = SkinDecodeThread(profile, self.folder(profile), generation)
+            thread.decoded_signal.connect(self.on_decoded)
+            thread.finished.connect(lambda t=thread: self.on_finished(t))
+            self.threads[profile] = thread
+            self.running.append(thread)
+            thread.start()
+        return False
+
+    def on_finished(self, thread):
+        self.running.remove(thread)
+        if self.threads.get(thread.profile) is thread:
+            del self.threads[thread.profile]
+
+    def load_now(self, profile):
+        """Decodificación síncrona (solo al arrancar, cuando aún no hay nada que mostrar)."""
+        if profile not in self.skins:
+            self.store(profile, decode_skin(self.folder(profile)))
+        self.skins.move_to_end(profile)
+
+    def on_decoded(self, profile, generation, images):
+        if generation != self.generations.get(profile, 0): return
+        self.store(profile, images)
+        self.skin_ready.emit(profile)
+
+    def store(self, profile, images):
+        self.skins[profile] = images
+        self.sizes[profile] = skin_bytes(images)
+        self.evict()
+
+    def set_active(self, profile):
+        self.active = profile
+        self.evict()
+
+    def evict(self):
+        for profile in list(self.skins):
+            if self.used() <= self.budget: break
+            if profile == self.active or profile == next(reversed(self.skins)): continue
+            del self.skins[profile]
+            del self.sizes[profile]
+
+    def invalidate(self, profile):
+        """Los PNG de la skin cambiaron: se vuelve a decodificar en la próxima petición."""
+        self.generations[profile] = self.generations.get(profile, 0) + 1
+        self.skins.pop(profile, None)
+        self.sizes.pop(profile, None)
+
+    def image(self, profile, path):
+        images = self.skins.get(profile)
+        return images.get(path) if images is not None else None
+
+    def shutdown(self):
+        for thread in list(self.running):
+            thread.wait()
+
+    def stats(self):
+        return {"skins": list(self.skins), "bytes": self.used(), "budget": self.budget,
+                "decoding": list(self.threads)}
@@ -0,0 +1,102 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+import numpy as np
+import torch
+from torch import nn
+
+RATE = 16000
+STUDENTS_DIR = "student_models"
+
+# Modelo "alumno": una CNN pequeña sobre log-mel destilada de los modelos
+# wav2vec2 (ver tools/distill_student.py). ~25k parámetros, unos pocos ms por ventana
+# en CPU.
+
+def mel_filterbank(n_mels, n_fft, rate, fmin=50.0, fmax=None):
+    """Banco de filtros triangulares en escala mel (HTK), forma (n_mels, n_fft // 2 + 1)."""
+    fmax = fmax or rate / 2
+    to_mel = lambda f: 2595.0 * np.log10(1.0 + f / 700.0)
+    to_hz = lambda m: 700.0 * (10.0 ** (m / 2595.0) - 1.0)
+    edges = to_hz(np.linspace(to_mel(fmin), to_mel(fmax), n_mels + 2))
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / rate)
+    lower = (freqs[None, :] - edges[:-2, None]) / (edges[1:-1, None] - edges[:-2, None])
+    upper = (edges[2:, None] - freqs[None, :]) / (edges[2:, None] - edges[1:-1, None])
+    return np.maximum(0.0, np.minimum(lower, upper)).astype(np.float32)
+
+class LogMel(nn.Module):
+    """Audio (B, N) -> log-mel normalizado por ventana (B, 1, n_mels, frames)."""
+    def __init__(self, n_mels=40, n_fft=400, hop=160, rate=RATE):
+        super().__init__()
+        self.n_fft = n_fft
+        self.hop = hop
+        self.register_buffer("window", torch.hann_window(n_fft))
+        self.register_buffer("mel", torch.from_numpy(mel_filterbank(n_mels, n_fft, rate)))
+
+    def forward(self, audio):
+        spec = torch.stft(audio, self.n_fft, self.hop, window=self.window, return_complex=True)
+        mel = torch.matmul(self.mel, spec.abs() ** 2)
+        logmel = torch.log(mel + 1e-6)
+        mean = logmel.mean(dim=(1, 2), keepdim=True)
+        std = logmel.std(dim=(1, 2), keepdim=True)
+        return ((logmel - mean) / (std + 1e-5)).unsqueeze(1)
+
+class StudentCNN(nn.Module):
+    def __init__(self, num_states, n_mels=40, channels=(16, 32, 64)):
+        super().__init__()
+        self.frontend = LogMel(n_mels)
+        layers, c_in = [], 1
+        for c_out in channels:
+            layers += [nn.Conv2d(c_in, c_out, 3, padding=1), nn.BatchNorm2d(c_out), nn.ReLU(), nn.MaxPool2d(2)]
+            c_in = c_out
+        self.body = nn.Sequential(*layers)
+        self.head = nn.Linear(c_in, num_states)
+
+    def forward(self, audio):
+        x = self.body(self.frontend(audio))
+        return self.head(x.mean(dim=(2, 3)))
+
+class StudentEngine:
+    """Backend 'student' para EmotionThread: predict(audio) -> (estado, confianza)."""
+    backend = "student"
+
+    def __init__(self, model, states):
+        self.model = model.eval()
+        self.states = list(states)
+
+    @classmethod
+    def load(cls, path):
+        data = torch.load(path, map_location="cpu", weights_only=True)
+        model = StudentCNN(len(data["states"]), **data.get("config", {}))
+        model.load_state_dict(data["state_dict"])
+        return cls(model, data["states"])
+
+    @staticmethod
+    def save(path, model, states, config=None, meta=None):
+        torch.save({"states": list(states), "config": config or {}, "meta": meta or {},
+                    "state_dict": model.state_dict()}, path)
+
+    def reset(self):
+        pass
+
+    def probabilities(self, audio):
+        with torch.no_grad():
+            logits = self.model(torch.from_numpy(np.ascontiguousarray(audio, dtype=np.float32)).unsqueeze(0))
+        return torch.softmax(logits[0], dim=-1).numpy()
+
+    def predict(self, audio):
+        probs = self.probabilities(audio)
+        idx = int(probs.argmax())
+        return self.states[idx], float(probs[idx])
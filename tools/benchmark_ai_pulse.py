@@ -0,0 +1,183 @@
+"""
+(AI)terEgo - Benchmark del pulso del modo IA
+Compara el pulso anterior (regenerar la hoja de estilos del botón en cada paso
+y llamar a setStyleSheet desde un QTimer de 50 ms) con el brillo pintado de
+GlowButton movido por FrameClock, tanto en cada refresco de pantalla como a su
+propio ritmo de 50 ms (el de la app). Mide el costo por paso (solo el cambio, y
+cambio + repintado del botón) y el uso de CPU con cada pulso corriendo de verdad
+durante unos segundos (tiempo de CPU de alta resolución, no os.times).
+
+Uso:
+    python tools/benchmark_ai_pulse.py
+    python tools/benchmark_ai_pulse.py --steps 2000 --seconds 10 --refresh 144
+    QT_QPA_PLATFORM=offscreen python tools/benchmark_ai_pulse.py --json reporte.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtWidgets import QApplication, QWidget, QHBoxLayout, QPushButton
+from PyQt6.QtCore import QTimer, QEventLoop
+
+from ui_components import GlowButton, FrameClock
+
+BASE_STYLE = """
+    QPushButton {
+        background-color: rgba(255,255,255,200);
+        border-radius: 18px;
+        border: none;
+        font-size: 16px;
+    }
+    QPushButton:hover { background-color: rgba(255,255,255,255); }
+"""
+
+def pulse_levels():
+    """Intensidad 0-100-0 como la del modo IA (pasos de 5)."""
+    level, direction = 0, 1
+    while True:
+        yield level
+        level += 5 * direction
+        if level >= 100: level, direction = 100, -1
+        elif level <= 0: level, direction = 0, 1
+
+class ClockPulse:
+    """Lo que hace animate_ai_pulse: alfa continuo según dt, repintado solo en pasos de 5."""
+    def __init__(self, button):
+        self.button, self.alpha, self.direction = button, 0.0, 1
+
+    def __call__(self, dt):
+        self.alpha += 100 * dt * self.direction
+        if self.alpha >= 100: self.alpha, self.direction = 100, -1
+        elif self.alpha <= 0: self.alpha, self.direction = 0, 1
+        self.button.set_glow(int(self.alpha) // 5 * 5)
+
+def stylesheet_step(button, level):
+    # Lo que hacía animate_ai_pulse en cada tick
+    button.setStyleSheet(f"""
+        QPushButton {{
+            background-color: rgba(255,255,255,200);
+            border-radius: 18px;
+            border: 2px solid rgba(0, 200, 255, {level});
+            background-color: rgba(255, 255, 255, {50 + level});
+            font-size: 16px;
+        }}
+        QPushButton:hover {{ background-color: rgba(255,255,255,255); }}
+    """)
+
+def painted_step(button, level):
+    button.set_glow(level)
+
+AI_PULSE_INTERVAL_MS = 50 # El de main.py (importar main cargaría toda la app)
+
+# modo -> (botón, paso, intervalo en el reloj: ms, "refresh" o None = QTimer propio de 50 ms)
+MODES = {
+    "stylesheet": (QPushButton, stylesheet_step, None),
+    "painted_refresh": (GlowButton, painted_step, "refresh"),
+    "painted": (GlowButton, painted_step, AI_PULSE_INTERVAL_MS),
+}
+
+DOCK_STYLE = """
+    QWidget {
+        background-color: rgba(30, 30, 30, 220);
+        border-radius: 30px;
+        border: 1px solid rgba(255, 255, 255, 30);
+    }
+"""
+
+def make_dock(button_class):
+    """Réplica del dock inferior: contenedor con estilo y la fila de botones de emoción."""
+    dock = QWidget()
+    dock.setFixedHeight(60)
+    dock.setStyleSheet(DOCK_STYLE)
+    layout = QHBoxLayout(dock)
+    button = button_class("🤖")
+    button.setFixedSize(36, 36)
+    button.setStyleSheet(BASE_STYLE)
+    layout.addWidget(button)
+    for emoji in ["😐", "😄", "😢", "😠", "😨", "🤢", "😲"]:
+        other = QPushButton(emoji)
+        other.setFixedSize(36, 36)
+        other.setStyleSheet(BASE_STYLE)
+        layout.addWidget(other)
+    dock.show()
+    return dock, button
+
+def cpu_seconds():
+    # process_time tiene resolución de µs; os.times va en ticks de 10 ms y aplanaba las diferencias
+    return time.process_time()
+
+def per_step(app, mode, steps, paint):
+    """Microsegundos por paso: solo el cambio (paint=False) o cambio + repintado síncrono."""
+    button_class, step, _ = MODES[mode]
+    dock, button = make_dock(button_class)
+    app.processEvents()
+    levels = pulse_levels()
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        step(button, next(levels))
+        if paint: button.repaint()
+    elapsed = time.perf_counter() - t0
+    dock.close()
+    return elapsed / steps * 1e6
+
+def realtime(app, mode, seconds, refresh):
+    """% de CPU con el pulso corriendo como en la app; el resto del proceso está ocioso."""
+    button_class, step, interval = MODES[mode]
+    dock, button = make_dock(button_class)
+    app.processEvents()
+    if interval is None:
+        levels = pulse_levels()
+        timer = QTimer()
+        timer.timeout.connect(lambda: step(button, next(levels)))
+        begin, end = (lambda: timer.start(50)), timer.stop
+    else:
+        clock = FrameClock(refresh)
+        pulse = ClockPulse(button)
+        begin = lambda: clock.start("ai_pulse", pulse, None if interval == "refresh" else interval)
+        end = lambda: clock.stop("ai_pulse")
+    loop = QEventLoop()
+    QTimer.singleShot(int(seconds * 1000), loop.quit)
+    c0, t0 = cpu_seconds(), time.perf_counter()
+    begin()
+    loop.exec()
+    end()
+    cpu = (cpu_seconds() - c0) / (time.perf_counter() - t0) * 100
+    dock.close()
+    return cpu
+
+def main():
+    parser = argparse.ArgumentParser(description="Pulso IA: setStyleSheet por tick vs brillo pintado")
+    parser.add_argument("--steps", type=int, default=1000, help="Pasos medidos por modo")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duración de la medición de CPU por modo")
+    parser.add_argument("--refresh", type=float, default=60.0, help="Hz de la pantalla para el modo painted_refresh")
+    parser.add_argument("--json", default=None, help="Guardar el reporte en este archivo")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    report = {"steps": args.steps, "seconds": args.seconds, "refresh_hz": args.refresh,
+              "platform": app.platformName(), "modes": {}}
+    for mode in MODES: per_step(app, mode, 50, True) # Calentamiento
+
+    print(f"{'Modo':<17}{'Cambio':>12}{'+ Repintado':>14}{'CPU':>9}")
+    for mode in MODES:
+        change = per_step(app, mode, args.steps, False)
+        total = per_step(app, mode, args.steps, True)
+        cpu = realtime(app, mode, args.seconds, args.refresh)
+        report["modes"][mode] = {"change_us": change, "step_us": total, "cpu_percent": cpu}
+        print(f"{mode:<17}{change:>10.1f}µs{total:>12.1f}µs{cpu:>8.2f}%")
+    old, new = report["modes"]["stylesheet"], report["modes"]["painted"]
+    print(f"\n⚡ Brillo pintado a {AI_PULSE_INTERVAL_MS} ms: cambio {old['change_us'] / new['change_us']:.0f}x más barato, "
+          f"CPU {old['cpu_percent']:.2f}% → {new['cpu_percent']:.2f}%.")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"\n💾 Reporte guardado en {args.json}")
+
+if __name__ == "__main__":
+    main()
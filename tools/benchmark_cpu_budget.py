@@ -0,0 +1,147 @@
+"""
+(AI)terEgo - Benchmark del presupuesto de CPU
+Mide la latencia de inferencia y el jitter de captura de audio con y sin
+presupuesto de CPU (afinidad + tamaño de pools de torch).
+
+Uso:
+    python tools/benchmark_cpu_budget.py --cores 0-3 --audio-core 7 --stress 4
+
+Cada configuración corre en un subproceso propio porque los pools de torch
+(en especial interop) solo se pueden configurar una vez por proceso.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+import multiprocessing
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cpu_budget import CpuBudget
+
+RATE = 16000
+CHUNK_SIZE = 1024
+WINDOW_SECONDS = 2.0
+
+def build_model(model_key):
+    """Modelo real si está en caché, si no un wav2vec2-base aleatorio (misma forma)."""
+    import torch
+    from transformers import Wav2Vec2Config, Wav2Vec2ForSequenceClassification
+    if model_key:
+        from core_systems import SUPPORTED_MODELS, is_model_cached, load_emotion_model
+        config = SUPPORTED_MODELS[model_key]
+        if is_model_cached(config["id"]):
+            return load_emotion_model(config)[1].eval()
+        print(f"⚠️ {model_key} no está descargado, usando wav2vec2-base aleatorio.", file=sys.stderr)
+    return Wav2Vec2ForSequenceClassification(Wav2Vec2Config(num_labels=6)).eval()
+
+def burn_cpu(stop_at):
+    """Carga artificial que simula OBS/encoder compitiendo por CPU."""
+    x = 0
+    while time.time() < stop_at:
+        x = (x * 1103515245 + 12345) % 2147483648
+
+def capture_loop(stop_event, budget, jitter_ms):
+    """Imita AudioMonitorThread: despierta cada chunk y procesa un poco de audio."""
+    if budget: budget.apply_audio()
+    period = CHUNK_SIZE / RATE
+    chunk = np.random.default_rng(0).standard_normal(CHUNK_SIZE).astype(np.float32)
+    next_tick = time.perf_counter() + period
+    while not stop_event.is_set():
+        delay = next_tick - time.perf_counter()
+        if delay > 0: time.sleep(delay)
+        jitter_ms.append((time.perf_counter() - next_tick) * 1000)
+        np.sqrt(np.mean(chunk ** 2))
+        next_tick += period
+
+def run_child(args):
+    # La carga se lanza antes de fijar afinidad: un hijo hereda la del proceso y
+    # quedaría compitiendo solo en los núcleos de inferencia, no en toda la máquina
+    stop_at = time.time() + 3600
+    stressors = [multiprocessing.Process(target=burn_cpu, args=(stop_at,), daemon=True) for _ in range(args.stress)]
+    for p in stressors: p.start()
+
+    import torch
+    budget = None
+    if args.budget:
+        budget = CpuBudget(enabled=True, inference_cores=args.cores, audio_core=args.audio_core,
+                           torch_threads=args.threads, interop_threads=1)
+        budget.apply_inference()
+
+    model = build_model(args.model)
+    audio = torch.randn(1, int(RATE * WINDOW_SECONDS))
+
+    stop_event = threading.Event()
+    jitter_ms = []
+    capture = threading.Thread(target=capture_loop, args=(stop_event, budget, jitter_ms))
+    capture.start()
+
+    latencies = []
+    with torch.no_grad():
+        for i in range(args.warmup + args.iterations):
+            t0 = time.perf_counter()
+            model(audio)
+            if i >= args.warmup:
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+    stop_event.set()
+    capture.join()
+    for p in stressors: p.terminate()
+
+    lat = np.array(latencies)
+    jit = np.array(jitter_ms)
+    print(json.dumps({
+        "budget": bool(args.budget),
+        "inference_cores": budget.inference_cores if budget else None,
+        "audio_core": budget.audio_core if budget else None,
+        "torch_threads": torch.get_num_threads(),
+        "latency_mean_ms": float(lat.mean()),
+        "latency_p95_ms": float(np.percentile(lat, 95)),
+        "jitter_mean_ms": float(jit.mean()),
+        "jitter_p95_ms": float(np.percentile(jit, 95)),
+        "jitter_max_ms": float(jit.max()),
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del presupuesto de CPU de (AI)terEgo")
+    parser.add_argument("--model", default=None, help="Clave de SUPPORTED_MODELS (por defecto wav2vec2-base aleatorio)")
+    parser.add_argument("--cores", default="", help="Núcleos de inferencia, ej: 0-3")
+    parser.add_argument("--audio-core", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=0, help="Threads de torch (0 = uno por núcleo)")
+    parser.add_argument("--stress", type=int, default=0, help="Procesos de carga artificial")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--budget", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_child(args)
+
+    base_cmd = [sys.executable, os.path.abspath(__file__), "--child",
+                "--cores", args.cores, "--threads", str(args.threads),
+                "--stress", str(args.stress), "--iterations", str(args.iterations),
+                "--warmup", str(args.warmup)]
+    if args.model: base_cmd += ["--model", args.model]
+    if args.audio_core is not None: base_cmd += ["--audio-core", str(args.audio_core)]
+
+    results = []
+    for with_budget in (False, True):
+        cmd = base_cmd + (["--budget"] if with_budget else [])
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    print(f"{'Modo':<16}{'Threads':>8}{'Lat. media':>12}{'Lat. p95':>10}{'Jitter medio':>14}{'Jitter p95':>12}{'Jitter máx':>12}")
+    for r in results:
+        name = "Con presupuesto" if r["budget"] else "Sin presupuesto"
+        print(f"{name:<16}{r['torch_threads']:>8}{r['latency_mean_ms']:>10.1f}ms{r['latency_p95_ms']:>8.1f}ms"
+              f"{r['jitter_mean_ms']:>12.2f}ms{r['jitter_p95_ms']:>10.2f}ms{r['jitter_max_ms']:>10.2f}ms")
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
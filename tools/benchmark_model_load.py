@@ -0,0 +1,106 @@
+"""
+(AI)terEgo - Benchmark de carga del modelo
+Compara from_pretrained (copia los pesos a memoria nueva) con la carga mapeada
+en memoria (safetensors): tiempo de carga, memoria residente (RSS), memoria
+compartida y PSS, tras cargar y tras la primera inferencia. Con --instances N
+lanza N procesos a la vez para ver cuánta memoria comparten.
+
+Uso:
+    python tools/benchmark_model_load.py --model english
+    python tools/benchmark_model_load.py --model english --instances 3
+
+Cada medición corre en un subproceso propio para partir siempre de cero.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resource_monitor import memory_usage, format_bytes
+
+MODES = ["pretrained", "mmap"]
+
+def child(model_key, mode, hold):
+    t0 = time.perf_counter()
+    import torch
+    from core_systems import SUPPORTED_MODELS, RATE, is_model_cached, load_emotion_model
+    import_s = time.perf_counter() - t0
+    config = SUPPORTED_MODELS[model_key]
+    if not is_model_cached(config["id"]):
+        print(json.dumps({"error": f"{model_key} no está descargado"}))
+        return
+    base = memory_usage()
+
+    t0 = time.perf_counter()
+    _, model = load_emotion_model(config, mmap=(mode == "mmap"))
+    load_s = time.perf_counter() - t0
+    loaded = memory_usage()
+
+    t0 = time.perf_counter()
+    with torch.no_grad():
+        model(torch.zeros(1, RATE * 2))
+    first_s = time.perf_counter() - t0
+    warm = memory_usage()
+
+    # Con varias instancias, medir cuando todas tienen el modelo cargado
+    if hold: time.sleep(hold)
+    held = memory_usage()
+    print(json.dumps({
+        "mode": mode, "import_s": import_s, "load_s": load_s, "first_inference_s": first_s,
+        "rss_base": base["rss"], "rss_loaded": loaded["rss"], "rss_warm": warm["rss"],
+        "shared_warm": warm["shared"], "pss_warm": held["pss"],
+    }))
+
+def run_children(model_key, mode, instances, hold):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", "--model", model_key, "--mode", mode,
+           "--hold", str(hold if instances > 1 else 0)]
+    procs = [subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+             for _ in range(instances)]
+    results = []
+    for p in procs:
+        out, _ = p.communicate()
+        lines = [l for l in out.splitlines() if l.startswith("{")]
+        if lines: results.append(json.loads(lines[-1]))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo y memoria de carga: from_pretrained vs mmap")
+    parser.add_argument("--model", default="spanish")
+    parser.add_argument("--instances", type=int, default=1, help="Procesos simultáneos por modo")
+    parser.add_argument("--hold", type=float, default=5.0, help="Segundos que cada instancia espera antes de medir PSS")
+    parser.add_argument("--json", default=None, help="Guardar el reporte en este archivo")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", default="mmap", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.model, args.mode, args.hold)
+        return
+
+    report = {"model": args.model, "instances": args.instances, "modes": {}}
+    # Calentar: la primera carga mapeada puede convertir el .bin y llenar la caché de páginas
+    run_children(args.model, "mmap", 1, 0)
+
+    print(f"\n{'Modo':<12}{'Carga':>9}{'1ª inf.':>9}{'RSS carga':>12}{'RSS total':>12}{'Compartida':>12}{'PSS':>11}")
+    for mode in MODES:
+        results = run_children(args.model, mode, args.instances, args.hold)
+        if not results or "error" in results[0]:
+            sys.exit(f"❌ {results[0]['error'] if results else 'El subproceso falló'}")
+        report["modes"][mode] = results
+        for r in results:
+            print(f"{mode:<12}{r['load_s']:>8.2f}s{r['first_inference_s']:>8.2f}s"
+                  f"{format_bytes(r['rss_loaded'] - r['rss_base']):>12}{format_bytes(r['rss_warm']):>12}"
+                  f"{format_bytes(r['shared_warm']):>12}{format_bytes(r['pss_warm']):>11}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"\n💾 Reporte guardado en {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+(AI)terEgo - Benchmark del motor NumPy frente a torch
+Compara el camino de torch (transformers + pesos mapeados) con el motor NumPy
+(numpy_engine.py) para un modelo wav2vec2: tiempo de import, tiempo de carga,
+memoria residente (RSS) y latencia por ventana. Antes comprueba que los logits
+de ambos coincidan dentro de la tolerancia, capa a capa.
+
+Uso:
+    python tools/benchmark_numpy_engine.py --model spanish
+    python tools/benchmark_numpy_engine.py --model english --windows 50 --atol 1e-3
+    python tools/benchmark_numpy_engine.py --model spanish --json reporte.json
+
+Cada medición corre en un subproceso propio para partir siempre de cero.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resource_monitor import memory_usage, peak_memory, format_bytes
+
+RATE = 16000
+MODES = ["torch", "numpy"]
+
+def test_windows(count, seconds):
+    rng = np.random.default_rng(0)
+    return [(rng.standard_normal(int(RATE * seconds)) * 0.1).astype(np.float32) for _ in range(count)]
+
+def load_torch(config):
+    import torch
+    from emotion_models import load_emotion_model, FastFeatureExtractor
+    feat, model = load_emotion_model(config)
+    def predict(audio):
+        fast = FastFeatureExtractor(len(audio), torch.device("cpu"), getattr(feat, "do_normalize", True))
+        with torch.no_grad():
+            return model(fast((audio,))).logits[0].numpy()
+    return predict
+
+def load_numpy(config):
+    from numpy_engine import NumpyEngine
+    engine = NumpyEngine.load(config)
+    if engine is None: return None
+    return lambda audio: engine.model.logits(engine.normalize(audio))
+
+def child(model_key, mode, windows, seconds):
+    base = memory_usage()["rss"]
+    t0 = time.perf_counter()
+    from model_registry import SUPPORTED_MODELS, get_registry
+    if mode == "torch":
+        import torch, transformers
+    else:
+        import numpy_engine
+    import_s = time.perf_counter() - t0
+    get_registry()
+    config = SUPPORTED_MODELS.get(model_key)
+    if config is None or not config.get("path"):
+        print(json.dumps({"error": f"{model_key} no está descargado"}))
+        return
+    imported = memory_usage()["rss"]
+
+    t0 = time.perf_counter()
+    predict = (load_torch if mode == "torch" else load_numpy)(config)
+    load_s = time.perf_counter() - t0
+    if predict is None:
+        print(json.dumps({"error": "el motor NumPy no soporta este modelo"}))
+        return
+    loaded = memory_usage()["rss"]
+
+    audio = test_windows(windows, seconds)
+    t0 = time.perf_counter()
+    predict(audio[0])
+    first_s = time.perf_counter() - t0
+    latencies = []
+    for window in audio:
+        t0 = time.perf_counter()
+        predict(window)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    print(json.dumps({
+        "mode": mode, "import_s": import_s, "load_s": load_s, "first_inference_s": first_s,
+        "latency_mean_ms": float(np.mean(latencies)), "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "rss_base": base, "rss_imported": imported, "rss_loaded": loaded,
+        "rss_end": memory_usage()["rss"], "peak_rss": peak_memory(),
+        "torch_imported": "torch" in sys.modules,
+    }))
+
+def parity(model_key, windows, seconds, atol):
+    """Máxima diferencia de logits torch vs NumPy, con el modelo completo y en cada profundidad."""
+    import torch
+    from model_registry import SUPPORTED_MODELS, get_registry
+    from wav2vec2_runtime import logits_per_depth
+    from emotion_models import load_emotion_model, FastFeatureExtractor
+    from numpy_engine import NumpyEngine
+    get_registry()
+    config = SUPPORTED_MODELS[model_key]
+    engine = NumpyEngine.load(config)
+    if engine is None:
+        print(json.dumps({"error": "el motor NumPy no soporta este modelo"}))
+        return
+    _, model = load_emotion_model(config)
+    worst, worst_depth, same_label = 0.0, 0.0, 0
+    audio = test_windows(windows, seconds)
+    for window in audio:
+        fast = FastFeatureExtractor(len(window), torch.device("cpu"), engine.do_normalize)
+        with torch.no_grad():
+            input_values = fast((window,))
+            ref = model(input_values).logits[0].numpy()
+            per_depth = logits_per_depth(model, input_values)
+        x = engine.normalize(window)
+        got = engine.model.logits(x)
+        worst = max(worst, float(np.abs(ref - got).max()))
+        same_label += int(np.argmax(ref) == np.argmax(got))
+        for depth, readout in engine.model.readouts(x):
+            diff = np.abs(per_depth[depth - 1][0].numpy() - engine.model.classify(readout)).max()
+            worst_depth = max(worst_depth, float(diff))
+    print(json.dumps({"max_abs_diff": worst, "max_abs_diff_per_depth": worst_depth,
+                      "same_label": same_label, "windows": len(audio), "ok": max(worst, worst_depth) <= atol}))
+
+def run_child(args, extra):
+    cmd = [sys.executable, os.path.abspath(__file__), "--model", args.model,
+           "--windows", str(args.windows), "--seconds", str(args.seconds), "--atol", str(args.atol)] + extra
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+    return json.loads(lines[-1]) if lines else {"error": "el subproceso falló"}
+
+def main():
+    parser = argparse.ArgumentParser(description="Motor NumPy vs torch: paridad, arranque, memoria y latencia")
+    parser.add_argument("--model", default="spanish")
+    parser.add_argument("--windows", type=int, default=20, help="Ventanas medidas por modo")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Duración de cada ventana")
+    parser.add_argument("--atol", type=float, default=1e-3, help="Tolerancia en los logits")
+    parser.add_argument("--json", default=None, help="Guardar el reporte en este archivo")
+    parser.add_argument("--child", default=None, choices=MODES + ["parity"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == "parity":
+        parity(args.model, min(args.windows, 5), args.seconds, args.atol)
+        return
+    if args.child:
+        child(args.model, args.child, args.windows, args.seconds)
+        return
+
+    # La primera carga mapeada convierte el .bin a safetensors si hace falta
+    check = run_child(args, ["--child", "parity"])
+    if "error" in check:
+        sys.exit(f"❌ {check['error']}")
+    print(f"🔎 Paridad: |Δlogits| máx {check['max_abs_diff']:.2e} (por capa {check['max_abs_diff_per_depth']:.2e}), "
+          f"misma etiqueta {check['same_label']}/{check['windows']} → {'OK' if check['ok'] else 'FUERA DE TOLERANCIA'}")
+    report = {"model": args.model, "window_seconds": args.seconds, "parity": check, "modes": {}}
+
+    print(f"\n{'Motor':<8}{'Import':>9}{'Carga':>9}{'1ª inf.':>9}{'Media':>9}{'p95':>9}{'RSS import':>12}{'RSS total':>12}{'Pico':>11}")
+    for mode in MODES:
+        r = run_child(args, ["--child", mode])
+        if "error" in r:
+            sys.exit(f"❌ {mode}: {r['error']}")
+        report["modes"][mode] = r
+        print(f"{mode:<8}{r['import_s']:>8.2f}s{r['load_s']:>8.2f}s{r['first_inference_s']:>8.2f}s"
+              f"{r['latency_mean_ms']:>7.1f}ms{r['latency_p95_ms']:>7.1f}ms"
+              f"{format_bytes(r['rss_imported'] - r['rss_base']):>12}{format_bytes(r['rss_end']):>12}"
+              f"{format_bytes(r['peak_rss']):>11}")
+    if report["modes"]["numpy"]["torch_imported"]:
+        print("⚠️ El motor NumPy terminó importando torch.")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"\n💾 Reporte guardado en {args.json}")
+    if not check["ok"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
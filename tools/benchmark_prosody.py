@@ -0,0 +1,113 @@
+"""
+(AI)terEgo - Benchmark del motor de prosodia
+Mide la latencia por ventana del motor ligero (y su % de un núcleo) y su acuerdo
+con los modelos wav2vec2 descargados sobre una carpeta de clips etiquetados.
+Opcionalmente ajusta el modelo lineal con esos clips y lo guarda en JSON.
+
+Uso:
+    python tools/benchmark_prosody.py --clips ruta/a/clips
+    python tools/benchmark_prosody.py --clips ruta/a/clips --fit prosody_model.json
+    (clips/happy/*.wav, clips/sad/*.wav, ... una subcarpeta por emoción)
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+from core_systems import SUPPORTED_MODELS, RATE, EMOTION_WINDOW_SECONDS, is_model_cached, load_emotion_model
+from clip_dataset import load_labelled_clips, fit_window, project_state
+from prosody_engine import ProsodyEngine
+
+def teacher_states(config, windows):
+    feat, model = load_emotion_model(config)
+    model.eval()
+    states = []
+    with torch.no_grad():
+        for audio in windows:
+            inp = feat(audio, sampling_rate=RATE, return_tensors="pt").input_values
+            pid = int(torch.argmax(model(inp).logits, dim=-1).item())
+            states.append(config["mapping"].get(str(model.config.id2label[pid]).lower(), "neutral"))
+    return states
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia y acuerdo del motor de prosodia")
+    parser.add_argument("--clips", required=True, help="Carpeta con subcarpetas por emoción")
+    parser.add_argument("--model-file", default=None, help="Modelo lineal en JSON (por defecto, el incluido)")
+    parser.add_argument("--fit", default=None, help="Ajustar el modelo lineal con los clips y guardarlo aquí")
+    parser.add_argument("--compare", default=None, help="Modelos wav2vec2 a comparar (por defecto, los descargados)")
+    parser.add_argument("--json", default=None, help="Guardar el reporte en este archivo")
+    args = parser.parse_args()
+
+    prosody_config = SUPPORTED_MODELS["prosody"]
+    engine = ProsodyEngine.from_file(args.model_file) if args.model_file else ProsodyEngine()
+    points = int(RATE * EMOTION_WINDOW_SECONDS)
+
+    clips = [(state, fit_window(audio, points)) for _, state, audio in load_labelled_clips(args.clips)]
+    if not clips:
+        sys.exit("❌ No hay clips en la carpeta indicada.")
+    windows = [audio for _, audio in clips]
+    print(f"🎧 {len(clips)} clips de referencia")
+
+    if args.fit:
+        # La línea base del hablante avanza como en una sesión real (clips en orden)
+        pairs = [(engine.extract(audio), project_state(state, prosody_config)) for state, audio in clips]
+        pairs = [(f, s) for f, s in pairs if f is not None and s is not None]
+        engine.fit([f for f, _ in pairs], [s for _, s in pairs])
+        with open(args.fit, "w") as f:
+            json.dump(engine.to_dict(), f, indent=4)
+        print(f"💾 Modelo lineal ajustado con {len(pairs)} clips: {args.fit}")
+        engine.reset()
+
+    preds, latencies = [], []
+    for audio in windows:
+        t0 = time.perf_counter()
+        preds.append(engine.predict(audio)[0])
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    truths = [project_state(state, prosody_config) for state, _ in clips]
+    scored = [(p, t) for p, t in zip(preds, truths) if t is not None]
+    report = {
+        "clips": len(clips),
+        "latency_ms": float(np.mean(latencies)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        # Una ventana por salto de EMOTION_WINDOW_SECONDS
+        "core_percent": float(np.mean(latencies)) / (EMOTION_WINDOW_SECONDS * 1000) * 100,
+        "accuracy": float(np.mean([p == t for p, t in scored])) if scored else None,
+        "agreement": {},
+    }
+
+    compare = args.compare.split(",") if args.compare else [
+        k for k, c in SUPPORTED_MODELS.items() if c.get("backend", "torch") == "torch" and is_model_cached(c["id"])]
+    for key in compare:
+        config = SUPPORTED_MODELS[key]
+        t0 = time.perf_counter()
+        teacher = teacher_states(config, windows)
+        teacher_ms = (time.perf_counter() - t0) * 1000 / len(windows)
+        pairs = [(p, project_state(t, prosody_config)) for p, t in zip(preds, teacher)]
+        pairs = [(p, t) for p, t in pairs if t is not None]
+        report["agreement"][key] = {
+            "agreement": float(np.mean([p == t for p, t in pairs])) if pairs else None,
+            "teacher_latency_ms": teacher_ms,
+        }
+
+    print(f"\n⏱️ Prosodia: {report['latency_ms']:.2f} ms/ventana (p95 {report['latency_p95_ms']:.2f} ms) "
+          f"= {report['core_percent']:.3f}% de un núcleo")
+    if report["accuracy"] is not None:
+        print(f"🎯 Precisión vs etiquetas: {report['accuracy']*100:.1f}%")
+    for key, row in report["agreement"].items():
+        agreement = f"{row['agreement']*100:.1f}%" if row["agreement"] is not None else "-"
+        print(f"🤝 Acuerdo con {key}: {agreement} (el modelo tarda {row['teacher_latency_ms']:.1f} ms/ventana)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"\n💾 Reporte guardado en {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+(AI)terEgo - Benchmark de la sombra del avatar
+Compara la sombra en vivo (QGraphicsDropShadowEffect sobre el widget del avatar,
+que vuelve a difuminar todo el sprite en cada repintado) con la sombra horneada
+en el frame (render_cache.bake_shadow, una vez por frame cacheado). Mide el
+costo de cada repintado durante el rebote, el costo único de hornear y la
+diferencia de píxeles entre ambas sombras.
+
+Uso:
+    python tools/benchmark_shadow.py
+    python tools/benchmark_shadow.py --image avatars/Default/happy_open.PNG --size 500 --frames 300
+    QT_QPA_PLATFORM=offscreen python tools/benchmark_shadow.py --json reporte.json
+"""
+
+import os
+import sys
+import json
+import time
+import math
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtWidgets import QApplication, QWidget, QGraphicsDropShadowEffect
+from PyQt6.QtGui import QImage, QPixmap, QPainter, QColor, QRegion
+from PyQt6.QtCore import Qt, QPoint
+
+from ui_components import AvatarWidget
+from render_cache import render_frame, bake_shadow, shadow_margin, SHADOW_BLUR, SHADOW_COLOR, SHADOW_OFFSET
+
+def test_sprite(path):
+    if path:
+        image = QImage(path)
+        if image.isNull(): sys.exit(f"❌ No se pudo leer {path}")
+        return image
+    # Sin imagen: un círculo como el de la skin Default
+    image = QImage(250, 250, QImage.Format.Format_ARGB32_Premultiplied)
+    image.fill(Qt.GlobalColor.transparent)
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    painter.setBrush(QColor("#00E64D"))
+    painter.setPen(Qt.PenStyle.NoPen)
+    painter.drawEllipse(10, 10, 230, 230)
+    painter.end()
+    return image
+
+def live_widget(frame, size):
+    widget = AvatarWidget()
+    widget.resize(size, size)
+    effect = QGraphicsDropShadowEffect()
+    effect.setBlurRadius(SHADOW_BLUR)
+    effect.setColor(QColor(*SHADOW_COLOR))
+    effect.setOffset(0, SHADOW_OFFSET)
+    widget.setGraphicsEffect(effect)
+    widget.set_frame(QPixmap.fromImage(frame))
+    return widget
+
+def baked_widget(frame, size):
+    widget = AvatarWidget()
+    widget.resize(size, size)
+    widget.set_frame(QPixmap.fromImage(bake_shadow(frame)), shadow_margin())
+    return widget
+
+def bounce_cost(widget, frames):
+    """Milisegundos por repintado con el desplazamiento del rebote cambiando en cada frame."""
+    widget.show()
+    QApplication.processEvents()
+    t0 = time.perf_counter()
+    for i in range(frames):
+        widget.set_offset(abs(math.sin(i * 0.3)) * 10)
+        widget.repaint()
+    elapsed = time.perf_counter() - t0
+    widget.hide()
+    return elapsed / frames * 1000
+
+def capture(widget):
+    """Lo que pinta el widget (con su efecto, si tiene) sobre fondo transparente.
+
+    Se captura a través de un contenedor: el efecto se aplica cuando el padre pinta al hijo.
+    """
+    parent = QWidget()
+    parent.resize(widget.size())
+    widget.setParent(parent)
+    image = QImage(widget.size(), QImage.Format.Format_ARGB32_Premultiplied)
+    image.fill(Qt.GlobalColor.transparent)
+    parent.render(image, QPoint(), QRegion(), QWidget.RenderFlag.DrawChildren)
+    widget.setParent(None)
+    return image
+
+def pixel_diff(a, b):
+    """Máxima diferencia por canal entre dos capturas del mismo tamaño."""
+    import numpy as np
+    def arr(img):
+        img = img.convertToFormat(QImage.Format.Format_ARGB32)
+        ptr = img.constBits()
+        ptr.setsize(img.sizeInBytes())
+        return np.frombuffer(ptr, np.uint8).reshape(img.height(), img.bytesPerLine())[:, :img.width() * 4].astype(int)
+    return int(np.abs(arr(a) - arr(b)).max())
+
+def main():
+    parser = argparse.ArgumentParser(description="Sombra del avatar: efecto en vivo vs horneada en el frame")
+    parser.add_argument("--image", default=None, help="PNG del avatar (por defecto, un círculo de prueba)")
+    parser.add_argument("--size", type=int, default=500, help="Tamaño del widget del avatar")
+    parser.add_argument("--frames", type=int, default=200, help="Repintados medidos por modo")
+    parser.add_argument("--json", default=None, help="Guardar el reporte en este archivo")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    # Margen para que la sombra de abajo no quede recortada en ninguna de las dos capturas
+    frame = render_frame(test_sprite(args.image), args.size - 60, args.size - 60)
+
+    t0 = time.perf_counter()
+    for _ in range(10): bake_shadow(frame)
+    bake_ms = (time.perf_counter() - t0) / 10 * 1000
+
+    live, baked = live_widget(frame, args.size), baked_widget(frame, args.size)
+    baked.set_offset(30)
+    live.set_offset(30)
+    diff = pixel_diff(capture(live), capture(baked))
+
+    report = {"size": args.size, "frames": args.frames, "platform": app.platformName(),
+              "bake_ms": bake_ms, "max_channel_diff": diff, "modes": {}}
+    for name, widget in [("live", live), ("baked", baked)]:
+        bounce_cost(widget, 20) # Calentamiento
+        report["modes"][name] = {"repaint_ms": bounce_cost(widget, args.frames)}
+
+    print(f"{'Sombra':<10}{'Repintado':>12}")
+    for name, row in report["modes"].items():
+        print(f"{name:<10}{row['repaint_ms']:>10.2f}ms")
+    print(f"\n🔥 Hornear la sombra de un frame: {bake_ms:.2f} ms (una vez, al entrar en la caché)")
+    print(f"🔎 Diferencia máxima de píxel entre ambas sombras: {diff}/255")
+    live_ms, baked_ms = report["modes"]["live"]["repaint_ms"], report["modes"]["baked"]["repaint_ms"]
+    print(f"⚡ Cada repintado con sombra horneada es {live_ms / baked_ms:.1f}x más barato.")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"\n💾 Reporte guardado en {args.json}")
+
+if __name__ == "__main__":
+    main()
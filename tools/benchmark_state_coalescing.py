@@ -0,0 +1,118 @@
+"""
+(AI)terEgo - Benchmark del render agrupado por frame
+Reproduce un flujo de cambios como el de una sesión real (boca por cada bloque
+de audio, emociones del modelo, hotkeys) y lo pinta de dos formas: un render
+por cambio, como antes, o con AvatarStateStore, que agrupa los cambios de un
+mismo frame de pantalla en un solo render. Cada render escala el frame desde
+la imagen original (el peor caso: fallo de la caché de render).
+
+Uso:
+    python tools/benchmark_state_coalescing.py
+    python tools/benchmark_state_coalescing.py --seconds 5 --chunk-ms 10 --hz 60
+    QT_QPA_PLATFORM=offscreen python tools/benchmark_state_coalescing.py --json reporte.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtGui import QImage, QPainter, QColor
+from PyQt6.QtCore import Qt, QTimer, QEventLoop
+
+from avatar_state import AvatarState, AvatarStateStore
+from render_cache import render_frame
+
+EMOTIONS = ["neutral", "happy", "sad", "angry", "surprise"]
+
+def test_sprite():
+    image = QImage(1000, 1000, QImage.Format.Format_ARGB32_Premultiplied)
+    image.fill(Qt.GlobalColor.transparent)
+    painter = QPainter(image)
+    painter.setBrush(QColor("#00E64D"))
+    painter.drawEllipse(40, 40, 920, 920)
+    painter.end()
+    return image
+
+def event_stream(seconds, chunk_ms, seed=0):
+    """[(ms, cambios)]: la boca por bloque de audio y, a veces en el mismo bloque, una emoción."""
+    rng = random.Random(seed)
+    events, speaking, t = [], False, 0.0
+    while t < seconds * 1000:
+        if rng.random() < 0.35:
+            speaking = not speaking
+            events.append((t, {"speaking": speaking}))
+        if rng.random() < 0.05:
+            events.append((t, {"emotion": rng.choice(EMOTIONS)}))
+        t += chunk_ms
+    return events
+
+def replay(events, apply):
+    """Aplica los cambios a su hora, con el bucle de eventos de Qt corriendo entre medio."""
+    loop = QEventLoop()
+    t0 = time.perf_counter()
+    for at, changes in events:
+        wait = at / 1000 - (time.perf_counter() - t0)
+        if wait > 0:
+            QTimer.singleShot(round(wait * 1000), loop.quit)
+            loop.exec()
+        apply(changes)
+    QTimer.singleShot(50, loop.quit) # El último frame pendiente
+    loop.exec()
+
+def run(events, size, hz, coalesce):
+    source = test_sprite()
+    renders, cost = [0], [0.0]
+
+    def render(state):
+        t = time.perf_counter()
+        render_frame(source, size, size, state.flipped)
+        cost[0] += time.perf_counter() - t
+        renders[0] += 1
+
+    store = AvatarStateStore(AvatarState("neutral", False, False, False, False), hz)
+    store.render_requested.connect(lambda: render(store.take()))
+    def apply(changes):
+        # Sin agrupar (como antes): cada cambio llamaba a update_avatar directamente
+        if store.update(**changes) and not coalesce:
+            render(store.take())
+    replay(events, apply)
+    stats = store.stats()
+    return {"changes": stats["mutations"], "renders": renders[0], "render_ms": cost[0] * 1000,
+            "coalesced": stats["coalesced"]}
+
+def main():
+    parser = argparse.ArgumentParser(description="Render por cambio vs render agrupado por frame de pantalla")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Duración del flujo de cambios")
+    parser.add_argument("--chunk-ms", type=float, default=10.0, help="Milisegundos entre bloques de audio")
+    parser.add_argument("--hz", type=float, default=60.0, help="Frecuencia de refresco de la pantalla")
+    parser.add_argument("--size", type=int, default=500, help="Tamaño del avatar en pantalla")
+    parser.add_argument("--json", default=None, help="Guardar el reporte en este archivo")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    events = event_stream(args.seconds, args.chunk_ms)
+    report = {"seconds": args.seconds, "chunk_ms": args.chunk_ms, "hz": args.hz, "size": args.size,
+              "events": len(events), "platform": app.platformName(), "modes": {}}
+
+    print(f"{'Modo':<12}{'Cambios':>9}{'Renders':>9}{'Tiempo':>12}")
+    for name, coalesce in [("direct", False), ("coalesced", True)]:
+        row = run(events, args.size, args.hz, coalesce)
+        report["modes"][name] = row
+        print(f"{name:<12}{row['changes']:>9}{row['renders']:>9}{row['render_ms']:>10.1f}ms")
+    old, new = report["modes"]["direct"], report["modes"]["coalesced"]
+    print(f"\n⚡ Agrupando por frame: {old['renders'] - new['renders']} renders ahorrados "
+          f"({old['render_ms'] / max(new['render_ms'], 1e-9):.1f}x menos tiempo de render).")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"\n💾 Reporte guardado en {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+(AI)terEgo - Destilación de un modelo alumno
+Pasa los modelos wav2vec2 (maestros) por un corpus local de WAVs, guarda sus
+etiquetas blandas en caché y entrena en CPU una CNN log-mel pequeña que imita
+su promedio. El alumno queda registrado como modelo seleccionable en la app.
+Funciona sin conexión: los maestros se cargan desde el registro local.
+
+Uso:
+    python tools/distill_student.py --corpus ruta/a/wavs
+    python tools/distill_student.py --corpus ruta/a/wavs --teachers spanish,english --epochs 30
+    (cualquier estructura de carpetas; cada WAV se corta en ventanas de 2 s)
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+# Nunca tocar la red: todo sale del caché local
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+from core_systems import (SUPPORTED_MODELS, RATE, EMOTION_WINDOW_SECONDS, VOLUME_THRESHOLD,
+                          is_model_cached, load_emotion_model)
+from clip_dataset import load_wav, project_state
+from model_registry import get_registry
+from student_model import StudentCNN, StudentEngine, STUDENTS_DIR
+
+def corpus_windows(folder, points, hop):
+    """Lista de (clave, audio) con las ventanas con voz de todos los WAV del corpus."""
+    windows = []
+    for dirpath, _, filenames in os.walk(folder):
+        for f in sorted(filenames):
+            if not f.lower().endswith(".wav"): continue
+            path = os.path.join(dirpath, f)
+            audio = load_wav(path)
+            if len(audio) < points:
+                audio = np.pad(audio, (0, points - len(audio)))
+            rel = os.path.relpath(path, folder)
+            mtime = int(os.path.getmtime(path))
+            for start in range(0, len(audio) - points + 1, hop):
+                window = audio[start:start + points]
+                if np.sqrt(np.mean(window ** 2)) < VOLUME_THRESHOLD: continue
+                windows.append((f"{rel}:{mtime}:{start}", window))
+    return windows
+
+def teacher_logits(key, windows, cache_dir):
+    """Logits del maestro por ventana, reutilizando los ya calculados (caché por revisión)."""
+    config = SUPPORTED_MODELS[key]
+    revision = config.get("revision") or "unknown"
+    cache_path = os.path.join(cache_dir, f"{key}-{revision}.npz")
+    cached = {}
+    if os.path.exists(cache_path):
+        data = np.load(cache_path)
+        cached = dict(zip(data["keys"].tolist(), data["logits"]))
+
+    missing = [(k, w) for k, w in windows if k not in cached]
+    latency_ms = None
+    if missing:
+        print(f"👩‍🏫 {key}: {len(missing)} ventanas nuevas ({len(windows) - len(missing)} en caché)")
+        feat, model = load_emotion_model(config)
+        model.eval()
+        times = []
+        with torch.no_grad():
+            for i, (k, window) in enumerate(missing):
+                t0 = time.perf_counter()
+                inp = feat(window, sampling_rate=RATE, return_tensors="pt").input_values
+                cached[k] = model(inp).logits[0].numpy()
+                times.append((time.perf_counter() - t0) * 1000)
+                if (i + 1) % 50 == 0: print(f"   {i + 1}/{len(missing)}")
+        latency_ms = float(np.mean(times))
+        keys = list(cached.keys())
+        np.savez(cache_path, keys=np.array(keys), logits=np.stack([cached[k] for k in keys]))
+        labels = [str(model.config.id2label[i]).lower() for i in range(len(model.config.id2label))]
+        with open(os.path.splitext(cache_path)[0] + ".json", "w") as f:
+            json.dump({"labels": labels, "latency_ms": latency_ms}, f)
+    with open(os.path.splitext(cache_path)[0] + ".json", "r") as f:
+        meta = json.load(f)
+    return np.stack([cached[k] for k, _ in windows]), meta["labels"], meta["latency_ms"]
+
+def project_soft_labels(logits, labels, config, target_config, states, temperature):
+    """Probabilidades sobre las etiquetas del maestro -> distribución sobre los estados del alumno."""
+    z = logits / temperature
+    probs = np.exp(z - z.max(axis=1, keepdims=True))
+    probs /= probs.sum(axis=1, keepdims=True)
+    projection = np.zeros((len(labels), len(states)), dtype=np.float32)
+    for i, label in enumerate(labels):
+        state = project_state(config["mapping"].get(label, "neutral"), target_config)
+        if state in states:
+            projection[i, states.index(state)] = 1.0
+    out = probs @ projection
+    return out / np.maximum(out.sum(axis=1, keepdims=True), 1e-8)
+
+def main():
+    parser = argparse.ArgumentParser(description="Destila una CNN log-mel desde los modelos wav2vec2")
+    parser.add_argument("--corpus", required=True, help="Carpeta con WAVs (sesiones grabadas, clips...)")
+    parser.add_argument("--teachers", default=None, help="Maestros separados por coma (por defecto, los descargados)")
+    parser.add_argument("--name", default="student", help="Nombre del alumno registrado")
+    parser.add_argument("--epochs", type=int, default=25)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--lr", type=float, default=3e-3)
+    parser.add_argument("--temperature", type=float, default=2.0)
+    parser.add_argument("--window-hop", type=float, default=1.0, help="Salto entre ventanas del corpus (s)")
+    parser.add_argument("--cache-dir", default=os.path.join(STUDENTS_DIR, "soft_labels"))
+    parser.add_argument("--json", default=None, help="Guardar el reporte en este archivo")
+    args = parser.parse_args()
+
+    teachers = args.teachers.split(",") if args.teachers else [
+        k for k, c in SUPPORTED_MODELS.items() if c.get("backend", "torch") == "torch" and is_model_cached(c["id"])]
+    for key in teachers:
+        if key not in SUPPORTED_MODELS or not is_model_cached(SUPPORTED_MODELS[key]["id"]):
+            sys.exit(f"❌ El maestro '{key}' no está descargado. Ábrelo una vez en la app.")
+    if not teachers:
+        sys.exit("❌ No hay modelos wav2vec2 descargados para usar como maestros.")
+
+    # El alumno usa los estados del primer maestro; los demás se proyectan a ese espacio
+    target_config = SUPPORTED_MODELS[teachers[0]]
+    states = list(target_config["avatar_states"])
+    points = int(RATE * EMOTION_WINDOW_SECONDS)
+    os.makedirs(args.cache_dir, exist_ok=True)
+
+    windows = corpus_windows(args.corpus, points, int(RATE * args.window_hop))
+    if len(windows) < 10:
+        sys.exit("❌ El corpus tiene muy pocas ventanas con voz.")
+    print(f"🎧 {len(windows)} ventanas con voz")
+
+    soft, teacher_latency, teacher_hard = [], {}, {}
+    for key in teachers:
+        logits, labels, latency = teacher_logits(key, windows, args.cache_dir)
+        config = SUPPORTED_MODELS[key]
+        soft.append(project_soft_labels(logits, labels, config, target_config, states, args.temperature))
+        teacher_hard[key] = project_soft_labels(logits, labels, config, target_config, states, 1.0).argmax(axis=1)
+        teacher_latency[key] = latency
+    targets = torch.from_numpy(np.mean(soft, axis=0).astype(np.float32))
+    audio = torch.from_numpy(np.stack([w for _, w in windows]).astype(np.float32))
+
+    # Validación: ~10% de las ventanas, fijo por semilla
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(windows))
+    n_val = max(1, len(windows) // 10)
+    val_idx, train_idx = order[:n_val], order[n_val:]
+
+    torch.manual_seed(0)
+    model = StudentCNN(len(states))
+    optimizer = torch.optim.Adam(model.parameters(), lr=args.lr)
+    scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, args.epochs)
+    print(f"🎓 Entrenando alumno ({sum(p.numel() for p in model.parameters())} parámetros, {len(train_idx)} ventanas)")
+    for epoch in range(args.epochs):
+        model.train()
+        perm = torch.from_numpy(rng.permutation(train_idx))
+        losses = []
+        for i in range(0, len(perm), args.batch_size):
+            batch = perm[i:i + args.batch_size]
+            gain = torch.empty(len(batch), 1).uniform_(0.5, 1.5) # Robustez al volumen del micrófono
+            log_probs = torch.log_softmax(model(audio[batch] * gain) / args.temperature, dim=-1)
+            loss = torch.nn.functional.kl_div(log_probs, targets[batch], reduction="batchmean")
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            losses.append(loss.item())
+        scheduler.step()
+        if (epoch + 1) % 5 == 0 or epoch == 0:
+            print(f"   época {epoch + 1}/{args.epochs}: pérdida {np.mean(losses):.4f}")
+
+    # Reporte sobre validación
+    model.eval()
+    engine = StudentEngine(model, states)
+    val_windows = [windows[i][1] for i in val_idx]
+    preds, times = [], []
+    for window in val_windows:
+        t0 = time.perf_counter()
+        preds.append(states.index(engine.predict(window)[0]))
+        times.append((time.perf_counter() - t0) * 1000)
+    preds = np.array(preds)
+    report = {
+        "windows": len(windows),
+        "validation": int(n_val),
+        "states": states,
+        "teachers": teachers,
+        "agreement_ensemble": float(np.mean(preds == targets[val_idx].numpy().argmax(axis=1))),
+        "agreement": {k: float(np.mean(preds == teacher_hard[k][val_idx])) for k in teachers},
+        "student_latency_ms": float(np.mean(times)),
+        "student_latency_p95_ms": float(np.percentile(times, 95)),
+        "teacher_latency_ms": teacher_latency,
+    }
+
+    os.makedirs(STUDENTS_DIR, exist_ok=True)
+    path = os.path.join(STUDENTS_DIR, f"{args.name}.pt")
+    StudentEngine.save(path, model, states, meta={"teachers": teachers, "report": report})
+    key = f"student_{args.name}"
+    get_registry().register_engine(key, f"Alumno ligero ({args.name})", "student", path, states,
+                                   teachers=teachers)
+
+    print(f"\n🤝 Acuerdo con el promedio de maestros: {report['agreement_ensemble']*100:.1f}%")
+    for k, v in report["agreement"].items():
+        teacher_ms = teacher_latency[k]
+        timing = f" (maestro {teacher_ms:.1f} ms/ventana)" if teacher_ms else ""
+        print(f"🤝 Acuerdo con {k}: {v*100:.1f}%{timing}")
+    print(f"⏱️ Alumno: {report['student_latency_ms']:.2f} ms/ventana (p95 {report['student_latency_p95_ms']:.2f} ms)")
+    print(f"💾 Alumno guardado en {path} y registrado como '{key}'")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"💾 Reporte guardado en {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+(AI)terEgo - Evaluación de todos los backends de emoción
+Pasa cada backend seleccionable (modelos wav2vec2 descargados en cada precisión,
+prosodia, estudiantes destilados...) por una carpeta de clips etiquetados y
+reporta precisión, matriz de confusión contra los estados del avatar, latencia
+media/p95/p99 por ventana, pico de memoria y factor de tiempo real (RTF).
+
+Uso:
+    python tools/evaluate_backends.py --clips ruta/a/clips
+    python tools/evaluate_backends.py --clips ruta/a/clips --backends spanish,prosody --precisions fp32,int8
+    python tools/evaluate_backends.py --clips ruta/a/clips --json reporte.json
+    (clips/happy/*.wav, clips/sad/*.wav, ... una subcarpeta por emoción)
+
+Cada backend corre en un subproceso propio para que el pico de memoria sea solo suyo.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_systems import SUPPORTED_MODELS, RATE, EMOTION_WINDOW_SECONDS, is_model_cached
+from emotion_backends import is_engine_backend, load_engine
+from clip_dataset import load_labelled_clips, fit_window, project_state
+from resource_monitor import memory_usage, peak_memory, format_bytes
+
+def load_predictor(config, precision):
+    """Función audio -> estado del avatar, por el mismo camino que usa la app."""
+    if is_engine_backend(config):
+        engine = load_engine(config)
+        engine.reset()
+        return lambda audio: config["mapping"].get(engine.predict(audio)[0], "neutral")
+    from inference_daemon import DaemonSession
+    session = DaemonSession(config, {"precision": precision, "mmap": True})
+    return lambda audio: config["mapping"].get(session.predict(audio)[0], "neutral")
+
+def child(model_key, precision, clips_dir):
+    config = SUPPORTED_MODELS[model_key]
+    points = int(RATE * EMOTION_WINDOW_SECONDS)
+    clips = [(state, fit_window(audio, points)) for _, state, audio in load_labelled_clips(clips_dir)]
+    base = memory_usage()["rss"]
+
+    t0 = time.perf_counter()
+    predict = load_predictor(config, precision)
+    load_s = time.perf_counter() - t0
+    predict(clips[0][1]) # Calentamiento (no cuenta en la latencia)
+
+    preds, latencies = [], []
+    for _, audio in clips:
+        t0 = time.perf_counter()
+        preds.append(predict(audio))
+        latencies.append((time.perf_counter() - t0) * 1000)
+    print(json.dumps({"preds": preds, "latencies_ms": latencies, "load_s": load_s,
+                      "rss_base": base, "peak_rss": peak_memory(), "rss_end": memory_usage()["rss"]}))
+
+def candidates(keys, precisions):
+    """(nombre, clave, precisión) por cada backend disponible; los wav2vec2 una vez por precisión."""
+    out = []
+    for key in keys:
+        config = SUPPORTED_MODELS[key]
+        if not is_model_cached(config["id"]):
+            print(f"ℹ️ {key} no está descargado, se omite.")
+            continue
+        if is_engine_backend(config):
+            out.append((key, key, "fp32"))
+        else:
+            out.extend((f"{key}@{p}", key, p) for p in precisions)
+    return out
+
+def prepare_variants(entries):
+    """Construye antes las variantes que falten, para no medir su construcción."""
+    from artifact_cache import get_artifact_cache
+    from emotion_models import build_missing_variants
+    ready = []
+    for name, key, precision in entries:
+        config = SUPPORTED_MODELS[key]
+        if precision != "fp32" and not is_engine_backend(config):
+            build_missing_variants(config, [precision])
+            if get_artifact_cache().lookup(config, "torch", precision) is None:
+                print(f"ℹ️ {name}: variante no disponible en esta máquina, se omite.")
+                continue
+        ready.append((name, key, precision))
+    return ready
+
+def run_child(model_key, precision, clips_dir):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", "--clips", clips_dir,
+           "--model", model_key, "--precision", precision]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+    return json.loads(lines[-1]) if lines else None
+
+def score(config, truths, result):
+    """Precisión y matriz de confusión en el espacio de estados del modelo."""
+    states = list(config["avatar_states"])
+    index = {s: i for i, s in enumerate(states)}
+    matrix = np.zeros((len(states), len(states)), dtype=int)
+    hits = total = 0
+    for truth, pred in zip(truths, result["preds"]):
+        expected = project_state(truth, config)
+        if expected is None: continue
+        total += 1
+        hits += expected == pred
+        if pred in index:
+            matrix[index[expected], index[pred]] += 1
+    lat = np.array(result["latencies_ms"])
+    window_ms = EMOTION_WINDOW_SECONDS * 1000
+    return {
+        "states": states,
+        "scored_clips": total,
+        "accuracy": hits / total if total else None,
+        "confusion": matrix.tolist(), # filas = real, columnas = predicho
+        "latency_mean_ms": float(lat.mean()),
+        "latency_p95_ms": float(np.percentile(lat, 95)),
+        "latency_p99_ms": float(np.percentile(lat, 99)),
+        "rtf": float(lat.mean() / window_ms), # < 1: más rápido que tiempo real
+        "load_s": result["load_s"],
+        "peak_rss": result["peak_rss"],
+        "model_rss": result["rss_end"] - result["rss_base"],
+    }
+
+def print_confusion(name, row):
+    states = row["states"]
+    print(f"\n{name} (filas = real, columnas = predicho)")
+    print(" " * 10 + "".join(f"{s[:8]:>9}" for s in states))
+    for state, counts in zip(states, row["confusion"]):
+        print(f"{state[:10]:<10}" + "".join(f"{c:>9}" for c in counts))
+
+def main():
+    parser = argparse.ArgumentParser(description="Precisión vs latencia de cada backend de emoción")
+    parser.add_argument("--clips", required=True, help="Carpeta con subcarpetas por emoción")
+    parser.add_argument("--backends", default=None, help="Claves a evaluar (por defecto, todas las disponibles)")
+    parser.add_argument("--precisions", default="fp32,int8", help="Precisiones para los modelos wav2vec2")
+    parser.add_argument("--json", default=None, help="Guardar el reporte en este archivo")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--model", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--precision", default="fp32", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.model, args.precision, args.clips)
+        return
+
+    clips = load_labelled_clips(args.clips)
+    if not clips:
+        sys.exit("❌ No hay clips en la carpeta indicada.")
+    truths = [state for _, state, _ in clips]
+    keys = args.backends.split(",") if args.backends else list(SUPPORTED_MODELS.keys())
+    unknown = [k for k in keys if k not in SUPPORTED_MODELS]
+    if unknown:
+        sys.exit(f"❌ Backends desconocidos: {', '.join(unknown)}")
+    entries = prepare_variants(candidates(keys, args.precisions.split(",")))
+    print(f"🎧 {len(clips)} clips · {len(entries)} backends")
+
+    report = {
+        "clips": len(clips),
+        "window_seconds": EMOTION_WINDOW_SECONDS,
+        "machine": {"platform": platform.platform(), "processor": platform.processor(),
+                    "cpus": os.cpu_count(), "python": platform.python_version()},
+        "backends": {},
+    }
+    print(f"\n{'Backend':<22}{'Acierto':>10}{'Media':>9}{'p95':>9}{'p99':>9}{'RTF':>8}{'Pico RAM':>11}")
+    for name, key, precision in entries:
+        result = run_child(key, precision, args.clips)
+        if result is None:
+            print(f"{name:<22}{'falló':>10}")
+            report["backends"][name] = {"error": "el subproceso falló"}
+            continue
+        row = score(SUPPORTED_MODELS[key], truths, result)
+        row.update({"model": key, "precision": precision})
+        report["backends"][name] = row
+        accuracy = f"{row['accuracy']*100:.1f}%" if row["accuracy"] is not None else "-"
+        print(f"{name:<22}{accuracy:>10}{row['latency_mean_ms']:>7.1f}ms{row['latency_p95_ms']:>7.1f}ms"
+              f"{row['latency_p99_ms']:>7.1f}ms{row['rtf']:>8.3f}{format_bytes(row['peak_rss']):>11}")
+
+    for name, row in report["backends"].items():
+        if "confusion" in row: print_confusion(name, row)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"\n💾 Reporte guardado en {args.json}")
+
+if __name__ == "__main__":
+    main()
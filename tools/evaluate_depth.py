@@ -0,0 +1,116 @@
+"""
+(AI)terEgo - Evaluación de profundidad del encoder
+Reporta precisión y latencia del modelo truncado a cada número de capas, y de
+la salida temprana por confianza, sobre una carpeta de clips de referencia.
+
+Uso:
+    python tools/evaluate_depth.py --model english --clips ruta/a/clips
+    (clips/happy/*.wav, clips/sad/*.wav, ... una subcarpeta por emoción)
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+from core_systems import SUPPORTED_MODELS, RATE, EMOTION_WINDOW_SECONDS, is_model_cached, load_emotion_model
+from clip_dataset import load_labelled_clips, fit_window, project_state
+from wav2vec2_runtime import logits_per_depth, run_with_early_exit, supports_depth_control
+
+def load_model(config):
+    if not is_model_cached(config["id"]):
+        sys.exit(f"❌ El modelo {config['id']} no está descargado. Ábrelo una vez en la app.")
+    feat, model = load_emotion_model(config)
+    return feat, model.eval()
+
+def to_state(model, config, logits):
+    lbl = str(model.config.id2label[int(torch.argmax(logits, dim=-1).item())]).lower()
+    return config["mapping"].get(lbl, "neutral")
+
+def time_call(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return float(np.mean(times))
+
+def main():
+    parser = argparse.ArgumentParser(description="Precisión/latencia por profundidad del encoder")
+    parser.add_argument("--model", default="spanish", choices=list(SUPPORTED_MODELS.keys()))
+    parser.add_argument("--clips", required=True, help="Carpeta con subcarpetas por emoción")
+    parser.add_argument("--thresholds", default="0.95,0.9,0.8,0.7", help="Umbrales de salida temprana")
+    parser.add_argument("--min-layers", type=int, default=4, help="Capas mínimas antes de permitir salir")
+    parser.add_argument("--repeats", type=int, default=5, help="Repeticiones para medir latencia")
+    parser.add_argument("--json", default=None, help="Guardar el reporte en este archivo")
+    args = parser.parse_args()
+
+    config = SUPPORTED_MODELS[args.model]
+    feat, model = load_model(config)
+    if not supports_depth_control(model):
+        sys.exit("❌ Este modelo no permite ajustar la profundidad del encoder.")
+
+    points = int(RATE * EMOTION_WINDOW_SECONDS)
+    clips = []
+    for path, state, audio in load_labelled_clips(args.clips):
+        target = project_state(state, config)
+        if target is None: continue
+        inp = feat(fit_window(audio, points), sampling_rate=RATE, return_tensors="pt").input_values
+        clips.append((target, inp))
+    if not clips:
+        sys.exit("❌ No hay clips utilizables para este modelo.")
+    print(f"🎧 {len(clips)} clips de referencia")
+
+    # Una pasada por clip da la predicción de todas las profundidades
+    with torch.no_grad():
+        per_clip = [logits_per_depth(model, inp) for _, inp in clips]
+    truths = [t for t, _ in clips]
+    total_layers = len(per_clip[0])
+    full_preds = [to_state(model, config, logits[-1]) for logits in per_clip]
+    sample = clips[0][1]
+
+    rows = []
+    with torch.no_grad():
+        for depth in range(total_layers, 0, -1):
+            preds = [to_state(model, config, logits[depth - 1]) for logits in per_clip]
+            latency = time_call(lambda: run_with_early_exit(model, sample, 0.0, depth), args.repeats)
+            rows.append({
+                "mode": f"{depth} capas",
+                "layers": depth,
+                "accuracy": float(np.mean([p == t for p, t in zip(preds, truths)])),
+                "agreement_full": float(np.mean([p == f for p, f in zip(preds, full_preds)])),
+                "latency_ms": latency,
+            })
+
+        for threshold in [float(t) for t in args.thresholds.split(",") if t]:
+            preds, depths, latencies = [], [], []
+            for _, inp in clips:
+                t0 = time.perf_counter()
+                logits, depth = run_with_early_exit(model, inp, threshold, args.min_layers)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                preds.append(to_state(model, config, logits))
+                depths.append(depth)
+            rows.append({
+                "mode": f"salida {threshold:.2f}",
+                "layers": float(np.mean(depths)),
+                "accuracy": float(np.mean([p == t for p, t in zip(preds, truths)])),
+                "agreement_full": float(np.mean([p == f for p, f in zip(preds, full_preds)])),
+                "latency_ms": float(np.mean(latencies)),
+            })
+
+    print(f"\n{'Modo':<16}{'Capas':>8}{'Precisión':>12}{'Acuerdo':>10}{'Latencia':>12}")
+    for r in rows:
+        print(f"{r['mode']:<16}{r['layers']:>8.1f}{r['accuracy']*100:>11.1f}%{r['agreement_full']*100:>9.1f}%{r['latency_ms']:>10.1f}ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"model": args.model, "clips": len(clips), "rows": rows}, f, indent=4)
+        print(f"\n💾 Reporte guardado en {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+(AI)terEgo - Lector de la salida por memoria compartida
+Lector de referencia de shm_output: se conecta al segmento que publica la app
+(Ajustes → Visual → Salida para OBS / Compositores), mide los frames por segundo
+que llegan y puede guardar el último frame como PNG con su transparencia.
+Si la app recrea o cierra el segmento, el lector vuelve a conectarse.
+
+Uso:
+    python tools/shm_reader.py
+    python tools/shm_reader.py --seconds 10 --name alterego_avatar
+    python tools/shm_reader.py --save frame.png --json reporte.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shm_output import ShmFrameReader, DEFAULT_NAME
+
+def connect(name, timeout):
+    """Abre el segmento, esperando hasta timeout segundos a que la app lo cree."""
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            return ShmFrameReader(name)
+        except FileNotFoundError:
+            if time.perf_counter() >= deadline: return None
+            time.sleep(0.1)
+
+def save_png(frame, path):
+    from PyQt6.QtGui import QImage
+    counter, width, height, stride, data = frame
+    image = QImage(data, width, height, stride, QImage.Format.Format_RGBA8888_Premultiplied)
+    # QImage no copia los bytes: se guarda antes de que data salga de alcance
+    if not image.save(path): sys.exit(f"❌ No se pudo guardar {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Lee los frames que la app publica en memoria compartida")
+    parser.add_argument("--name", default=DEFAULT_NAME, help="Nombre del segmento de memoria compartida")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Tiempo de observación")
+    parser.add_argument("--poll", type=float, default=1.0, help="Milisegundos entre lecturas")
+    parser.add_argument("--save", default=None, help="Guardar el último frame en este PNG")
+    parser.add_argument("--json", default=None, help="Guardar el reporte en este archivo")
+    args = parser.parse_args()
+
+    reader = connect(args.name, args.seconds)
+    if reader is None: sys.exit(f"❌ No existe el segmento '{args.name}': ¿está activada la salida en la app?")
+    print(f"📡 Conectado a {args.name}")
+
+    frames, reconnects, last, latest = 0, 0, 0, None # last=0: también el frame ya publicado
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < args.seconds:
+        if not reader.is_open():
+            # El escritor cerró o agrandó el segmento: hay que volver a abrirlo
+            reader.close()
+            reader = connect(args.name, max(0.0, args.seconds - (time.perf_counter() - t0)))
+            if reader is None: break
+            reconnects += 1
+            last = 0
+            continue
+        counter = reader.counter()
+        if counter != last:
+            latest = reader.read()
+            frames += 1
+            last = counter
+        time.sleep(args.poll / 1000)
+    elapsed = time.perf_counter() - t0
+    if reader is not None: reader.close()
+
+    report = {"name": args.name, "seconds": elapsed, "frames": frames, "fps": frames / elapsed,
+              "reconnects": reconnects, "counter": last}
+    if latest is not None:
+        report.update(width=latest[1], height=latest[2], stride=latest[3])
+    print(f"🎞️ {frames} frames en {elapsed:.1f} s ({report['fps']:.1f} fps), {reconnects} reconexiones")
+    if latest is None:
+        print("⏸️ No llegó ningún frame (el avatar solo se publica cuando cambia)")
+    else:
+        print(f"🖼️ Último frame: #{latest[0]} de {latest[1]}x{latest[2]} px")
+        if args.save:
+            save_png(latest, args.save)
+            print(f"💾 Frame guardado en {args.save}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"\n💾 Reporte guardado en {args.json}")
+
+if __name__ == "__main__":
+    main()
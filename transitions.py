@@ -0,0 +1,175 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+from collections import namedtuple
+from PyQt6.QtCore import Qt, QObject, QThread, QTimer, QPointF, pyqtSignal
+from PyQt6.QtGui import QImage, QPainter
+
+from render_cache import render_frame, bake_shadow
+
+# Fundidos precalculados entre estados del avatar. Al cargar la skin (o cambiar
+# tamaño, volteo o sombra) un QThread genera, para cada par de estados, unos
+# pocos frames intermedios ya mezclados. Durante la transición solo se pintan
+# esos frames: el costo por frame es el de un frame normal, sin componer nada.
+# Los frames finales de cada estado se preparan antes en el hilo GUI, uno por
+# vuelta del bucle de eventos: la sombra horneada usa QGraphicsScene y QPixmap,
+# que solo pueden usarse en ese hilo. El QThread solo mezcla QImage.
+
+TRANSITION_FRAMES = 4 # Frames intermedios por transición
+DEFAULT_BUDGET_MB = 96
+
+# Todo lo que cambia el aspecto de los frames; si cambia, se regeneran
+TransitionContext = namedtuple("TransitionContext", "profile width height flipped dpr shadow states")
+
+def avatar_states(emotions):
+    return [(emotion, mouth) for emotion in emotions for mouth in ("closed", "open")]
+
+def state_pairs(emotions):
+    """Pares de estados por prioridad: boca (lo más frecuente), luego emociones con la misma boca."""
+    pairs = [((e, "closed"), (e, "open")) for e in emotions]
+    for mouth in ("closed", "open"):
+        pairs += [((a, mouth), (b, mouth)) for i, a in enumerate(emotions) for b in emotions[i + 1:]]
+    return pairs
+
+def crossfade(a, b, steps, dpr=1.0):
+    """Frames intermedios de a -> b (sin incluir los extremos).
+
+    Los frames pueden tener distinto tamaño (cada imagen conserva su aspecto):
+    se mezclan en un lienzo común apoyados abajo y centrados, como los pinta AvatarWidget.
+    """
+    w, h = max(a.width(), b.width()), max(a.height(), b.height())
+
+    def faded(image, opacity):
+        canvas = QImage(w, h, QImage.Format.Format_ARGB32_Premultiplied)
+        canvas.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(canvas)
+        painter.setOpacity(opacity)
+        painter.drawImage(QPointF((w - image.width()) / 2, h - image.height()), image)
+        painter.end()
+        return canvas
+
+    out = []
+    for i in range(1, steps + 1):
+        t = i / (steps + 1)
+        # Premultiplicado: (1-t)·a + t·b. La suma va sin opacidad: con Plus, Qt la aplicaría dos veces
+        canvas = faded(a, 1 - t)
+        painter = QPainter(canvas)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Plus)
+        painter.drawImage(0, 0, faded(b, t))
+        painter.end()
+        canvas.setDevicePixelRatio(dpr)
+        out.append(canvas)
+    return out
+
+class TransitionBuilderThread(QThread):
+    built_signal = pyqtSignal(int, object, object) # generación, {estado: frame}, {(a, b): [frames]}
+
+    def __init__(self, context, frames, budget, generation):
+        super().__init__()
+        self.context = context
+        self.frames = frames # {(emoción, boca): QImage final}, preparados en el hilo GUI
+        self.budget = budget
+        self.generation = generation
+
+    def run(self):
+        c = self.context
+        frames = self.frames
+        sequences, used = {}, 0
+        for a, b in state_pairs(list(c.states)):
+            if a not in frames or b not in frames: continue
+            if self.isInterruptionRequested(): return
+            sequence = crossfade(frames[a], frames[b], TRANSITION_FRAMES, c.dpr)
+            size = sum(img.sizeInBytes() for img in sequence)
+            if used + size > self.budget: break # Sin presupuesto: el resto de pares corta en seco
+            sequences[(a, b)] = sequence
+            used += size
+        self.built_signal.emit(self.generation, frames, sequences)
+
+class TransitionCache(QObject):
+    """Fundidos del contexto actual (skin, tamaño, volteo, sombra); se generan en segundo plano."""
+    ready = pyqtSignal(object) # {estado: frame final} del contexto recién generado
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        super().__init__()
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.context = None # Contexto de los fundidos guardados
+        self.building = None # Contexto en construcción
+        self.sequences = {}
+        self.generation = 0
+        self.running = []
+        self.pending = [] # (estado, fuente) cuyo frame final falta preparar
+        self.frames = {}
+        self.bake_timer = QTimer(self)
+        self.bake_timer.setSingleShot(True)
+        self.bake_timer.timeout.connect(self.prepare_next)
+
+    def build(self, context, sources):
+        if context == self.context or context == self.building: return
+        self.clear()
+        self.building = context
+        self.pending = list(sources.items())
+        self.bake_timer.start(0)
+
+    def prepare_next(self):
+        """Prepara un frame final por vuelta (unos ms con sombra) y, con todos listos, lanza la mezcla."""
+        c = self.building
+        if c is None: return
+        if self.pending:
+            state, source = self.pending.pop(0)
+            # Mismo camino que render_avatar, para que el último frame coincida exacto
+            frame = render_frame(source, c.width, c.height, c.flipped, c.dpr)
+            self.frames[state] = bake_shadow(frame, c.dpr) if c.shadow else frame
+            self.bake_timer.start(0)
+            return
+        frames, self.frames = self.frames, {}
+        thread = TransitionBuilderThread(c, frames, self.budget, self.generation)
+        thread.built_signal.connect(self.on_built)
+        thread.finished.connect(lambda t=thread: self.running.remove(t))
+        self.running.append(thread)
+        thread.start()
+
+    def on_built(self, generation, frames, sequences):
+        if generation != self.generation: return
+        self.context, self.building = self.building, None
+        self.sequences = sequences
+        self.ready.emit(frames)
+
+    def clear(self):
+        """Descarta los fundidos (y cualquier construcción en curso)."""
+        self.generation += 1
+        self.bake_timer.stop()
+        self.pending, self.frames = [], {}
+        for thread in self.running:
+            thread.requestInterruption()
+        self.context = self.building = None
+        self.sequences = {}
+
+    def sequence(self, context, a, b):
+        """Frames intermedios de a -> b, o None si no hay fundido para ese par en este contexto."""
+        if context != self.context: return None
+        if (a, b) in self.sequences: return self.sequences[(a, b)]
+        reverse = self.sequences.get((b, a))
+        return reverse[::-1] if reverse is not None else None
+
+    def shutdown(self):
+        for thread in list(self.running):
+            thread.requestInterruption()
+            thread.wait()
+
+    def stats(self):
+        return {"pairs": len(self.sequences),
+                "bytes": sum(img.sizeInBytes() for seq in self.sequences.values() for img in seq),
+                "budget": self.budget, "building": self.building is not None}
@@ -15,8 +15,8 @@ __maintainer__ = "JJaroll"
 __status__ = "Production"
 
 from PyQt6.QtWidgets import QWidget, QDialog, QVBoxLayout, QLabel, QTextEdit, QPushButton, QHBoxLayout
-from PyQt6.QtGui import QPainter, QBrush, QColor, QPen, QFont
-from PyQt6.QtCore import Qt, QRect, QPoint
+from PyQt6.QtGui import QPainter, QBrush, QColor, QPen, QFont, QImage
+from PyQt6.QtCore import Qt, QRect, QRectF, QPoint, QPointF, QObject, QTimer, QElapsedTimer
 
 class PillProgressBar(QWidget):
     def __init__(self, parent=None):
@@ -61,6 +61,165 @@ class PillProgressBar(QWidget):
             painter.setBrush(QBrush(self._color))
             painter.drawRoundedRect(progress_rect, radius, radius)
 
+class FrameClock(QObject):
+    """Un único reloj de animación al ritmo de refresco de la pantalla.
+
+    Cada animación se registra con start(nombre, callback(dt), intervalo_ms) y
+    se quita con stop(nombre); sin animaciones activas el timer se detiene del
+    todo. Sin intervalo la animación corre en cada refresco; con intervalo (p.ej.
+    el pulso IA a 50 ms) solo se la llama a ese ritmo, y si es la única activa
+    el timer tampoco late más rápido.
+    pause() detiene el timer sin olvidar las animaciones (ventana oculta);
+    resume() las retoma sin contar el tiempo que estuvo en pausa.
+    """
+    def __init__(self, refresh_rate=60.0):
+        super().__init__()
+        self.animators = {} # nombre -> [callback, intervalo_ms o None, segundos acumulados]
+        # Single-shot rearmado en cada tick: al cambiar el intervalo se respeta el
+        # tiempo ya transcurrido (setInterval reiniciaría la cuenta desde cero)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+        self.elapsed = QElapsedTimer()
+        self.interval = None # ms entre ticks mientras hay animaciones
+        self.paused = False
+        self.set_refresh_rate(refresh_rate)
+
+    def set_refresh_rate(self, hz):
+        self.frame_ms = 1000 / (hz if hz and hz > 0 else 60.0)
+        self.reschedule()
+
+    def start(self, name, callback, interval_ms=None):
+        waited = self.animators[name][2] if name in self.animators else 0.0
+        self.animators[name] = [callback, interval_ms, waited]
+        self.reschedule()
+
+    def stop(self, name):
+        if self.animators.pop(name, None) is None: return # No estaba: no se toca el timer
+        self.reschedule()
+
+    def reschedule(self):
+        """El timer late al ritmo de la animación más exigente (o se para si no hay ninguna)."""
+        if self.paused or not self.animators:
+            self.timer.stop()
+            return
+        interval = max(1, round(min(entry[1] or self.frame_ms for entry in self.animators.values())))
+        if self.timer.isActive():
+            if interval == self.interval: return
+            # Cuenta desde el último tick, no desde ahora: un start/stop frecuente no lo aplaza
+            remaining = interval - self.elapsed.elapsed()
+        else:
+            self.elapsed.start()
+            remaining = interval
+        self.interval = interval
+        self.timer.start(max(0, remaining))
+
+    def pause(self):
+        self.paused = True
+        self.timer.stop()
+
+    def resume(self):
+        self.paused = False
+        self.reschedule()
+
+    def is_running(self, name=None):
+        return name in self.animators if name else self.timer.isActive()
+
+    def tick(self):
+        dt = self.elapsed.restart() / 1000.0
+        self.timer.start(self.interval) # Antes de las animaciones: pueden pararlo o cambiarlo
+        # Medio tick de margen: un timer que despierta un poco antes no salta un paso
+        slack = self.interval / 2000.0
+        for entry in list(self.animators.values()):
+            callback, interval, waited = entry
+            waited += dt
+            if interval is None or waited >= interval / 1000.0 - slack:
+                entry[2] = 0.0
+                callback(waited)
+            else:
+                entry[2] = waited
+
+class AvatarWidget(QWidget):
+    """Pinta el frame ya escalado del avatar (abajo y centrado) desplazado en vertical.
+
+    El rebote solo mueve el frame con el QPainter: no cambia márgenes ni
+    obliga a recalcular el layout. margin es el borde que añade una sombra
+    horneada alrededor del sprite (el sprite sigue apoyado abajo).
+    frame_listener, si se asigna, se llama cada vez que cambia lo que se ve.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pixmap = None
+        self._margin = 0.0
+        self._offset = 0.0
+        self.frame_listener = None
+
+    def set_frame(self, pixmap, margin=0.0):
+        self._pixmap = pixmap
+        self._margin = margin
+        self.changed()
+
+    def set_offset(self, offset):
+        # A píxel físico: los ticks que no mueven ningún píxel no repintan
+        dpr = self.devicePixelRatioF()
+        offset = round(offset * dpr) / dpr
+        if offset != self._offset:
+            self._offset = offset
+            self.changed()
+
+    def changed(self):
+        self.update()
+        if self.frame_listener is not None:
+            self.frame_listener()
+
+    def paintEvent(self, event):
+        self.paint_frame(QPainter(self))
+
+    def paint_frame(self, painter):
+        """Pinta el frame actual en coordenadas del widget (pantalla o salida externa)."""
+        if self._pixmap is None or self._pixmap.isNull(): return
+        size = self._pixmap.deviceIndependentSize()
+        painter.translate(0, -self._offset)
+        pos = QPointF((self.width() - size.width()) / 2, self.height() - size.height() + self._margin)
+        # Los frames de los fundidos llegan como QImage desde su hilo
+        if isinstance(self._pixmap, QImage):
+            painter.drawImage(pos, self._pixmap)
+        else:
+            painter.drawPixmap(pos, self._pixmap)
+
+class GlowButton(QPushButton):
+    """Botón con un brillo pintado (borde cian + fondo que se aclara) para el modo IA.
+
+    set_glow solo repinta el rectángulo del botón: la hoja de estilos base
+    nunca se regenera ni se vuelve a aplicar.
+    """
+    def __init__(self, text="", parent=None):
+        super().__init__(text, parent)
+        self._glow = None # None = sin brillo (se pinta como un QPushButton normal)
+
+    def set_glow(self, level):
+        """Intensidad 0-100, o None para apagar el brillo."""
+        if level != self._glow:
+            self._glow = level
+            self.update()
+
+    def paintEvent(self, event):
+        if self._glow is None:
+            super().paintEvent(event)
+            return
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        rect = QRectF(self.rect()).adjusted(1, 1, -1, -1)
+        radius = rect.height() / 2
+        background = 255 if self.underMouse() else 50 + self._glow
+        painter.setBrush(QBrush(QColor(255, 255, 255, background)))
+        painter.setPen(QPen(QColor(0, 200, 255, self._glow), 2))
+        painter.drawRoundedRect(rect, radius, radius)
+        painter.setFont(self.font())
+        painter.setPen(self.palette().buttonText().color())
+        painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, self.text())
+
 class TutorialOverlay(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -0,0 +1,295 @@
+"""
+(AI)terEgo
+-----------
+Una aplicación de avatar virtual controlada por voz e Inteligencia Artificial.
+
+Desarrollado por: JJaroll
+GitHub: https://github.com/JJaroll
+Fecha: 10/02/2026
+Licencia: MIT
+"""
+
+__author__ = "JJaroll"
+__version__ = "1.0.0"
+__maintainer__ = "JJaroll"
+__status__ = "Production"
+
+import numpy as np
+import torch
+
+# Utilidades para ejecutar los modelos wav2vec2 "por partes": encoder capa a
+# capa, cabeza de clasificación aparte. Sirve tanto para EhcalabresModel como
+# para Wav2Vec2ForSequenceClassification (SomosNLP).
+
+def supports_depth_control(model):
+    """La salida temprana solo tiene sentido si la cabeza usa la última capa."""
+    backbone = getattr(model, "wav2vec2", None)
+    if backbone is None: return False
+    if getattr(model.config, "use_weighted_layer_sum", False): return False
+    return getattr(backbone, "adapter", None) is None
+
+def truncate_encoder(model, num_layers):
+    """Se queda con las primeras N capas del transformer (libera el resto)."""
+    encoder = model.wav2vec2.encoder
+    total = len(encoder.layers)
+    if num_layers <= 0 or num_layers >= total:
+        return total
+    encoder.layers = encoder.layers[:num_layers]
+    model.config.num_hidden_layers = num_layers
+    return num_layers
+
+def project_features(backbone, extract_features):
+    """(B, C, T) del encoder convolucional -> (B, T, hidden) listo para el transformer."""
+    projected = backbone.feature_projection(extract_features.transpose(1, 2))
+    return projected[0] if isinstance(projected, tuple) else projected
+
+def encoder_readouts(encoder, hidden_states):
+    """
+    Recorre el transformer capa a capa y entrega (profundidad, estados) tras cada
+    capa. Para la variante StableLayerNorm (XLS-R) aplica la normalización final
+    a cada lectura, tal como haría el encoder completo al terminar.
+    """
+    stable = encoder.__class__.__name__.endswith("StableLayerNorm")
+    hidden_states = hidden_states + encoder.pos_conv_embed(hidden_states)
+    if not stable:
+        hidden_states = encoder.layer_norm(hidden_states)
+    hidden_states = encoder.dropout(hidden_states)
+
+    for depth, layer in enumerate(encoder.layers, start=1):
+        out = layer(hidden_states)
+        hidden_states = out[0] if isinstance(out, tuple) else out
+        yield depth, encoder.layer_norm(hidden_states) if stable else hidden_states
+
+def pooled_embedding(hidden_states):
+    """Mean pooling sobre el eje temporal (igual que ambas cabezas)."""
+    return torch.mean(hidden_states, dim=1)
+
+def classify_hidden(model, hidden_states):
+    """Aplica la cabeza del modelo a los estados del transformer."""
+    if hasattr(model, "projector"):
+        # Wav2Vec2ForSequenceClassification: proyección -> media -> lineal
+        return model.classifier(pooled_embedding(model.projector(hidden_states)))
+    # EhcalabresModel: media -> dense/tanh/output
+    return model.classifier(pooled_embedding(hidden_states))
+
+def classify_pooled(model, pooled):
+    """
+    Cabeza a partir del embedding ya promediado. En SomosNLP el projector es
+    afín y conmuta con la media, así que el resultado es idéntico.
+    """
+    if hasattr(model, "projector"):
+        return model.classifier(model.projector(pooled))
+    return model.classifier(pooled)
+
+def head_module_names(model):
+    """Módulos que forman la cabeza (lo único que se reentrena al calibrar)."""
+    return ["projector", "classifier"] if hasattr(model, "projector") else ["classifier"]
+
+def classify_features(model, extract_features):
+    """Pasada completa del transformer + cabeza a partir de los frames convolucionales."""
+    backbone = model.wav2vec2
+    outputs = backbone.encoder(project_features(backbone, extract_features))
+    return classify_hidden(model, outputs[0])
+
+def run_with_early_exit(model, input_values, exit_confidence, min_layers=1, extract_features=None):
+    """
+    Ejecuta el modelo deteniéndose en la primera capa (>= min_layers) cuya
+    predicción supere exit_confidence. Devuelve (logits, capas_usadas).
+    Si se entregan extract_features (p.ej. desde ConvFeatureCache) se omite
+    el encoder convolucional. min_layers se limita a las capas que tenga el
+    encoder (truncado o no): la última capa siempre da una predicción.
+    """
+    backbone = model.wav2vec2
+    min_layers = min(min_layers, len(backbone.encoder.layers))
+    if extract_features is None:
+        extract_features = backbone.feature_extractor(input_values)
+    hidden_states = project_features(backbone, extract_features)
+    logits, depth = None, 0
+    for depth, readout in encoder_readouts(backbone.encoder, hidden_states):
+        if depth < min_layers: continue
+        logits = classify_hidden(model, readout)
+        if torch.softmax(logits, dim=-1).max().item() >= exit_confidence:
+            break
+    return logits, depth
+
+def logits_per_depth(model, input_values):
+    """Una sola pasada que devuelve los logits que daría el modelo truncado a cada profundidad."""
+    backbone = model.wav2vec2
+    hidden_states = project_features(backbone, backbone.feature_extractor(input_values))
+    return [classify_hidden(model, readout) for _, readout in encoder_readouts(backbone.encoder, hidden_states)]
+
+class ConvFeatureCache:
+    """
+    Caché incremental del encoder convolucional para ventanas solapadas.
+
+    Los frames del encoder convolucional viven en una grilla global: el frame k
+    depende solo de las muestras [k*stride, k*stride + campo_receptivo). Si las
+    ventanas empiezan siempre en múltiplos del stride (320 muestras = 20 ms),
+    los frames de la ventana anterior siguen siendo válidos y solo hay que
+    calcular los que tocan muestras nuevas.
+
+    El extractor normaliza cada ventana con su propia media y desviación, y el
+    sesgo de la primera convolución y sus LayerNorm no son invariantes a ese
+    cambio, así que un frame reutilizado solo es válido mientras las
+    estadísticas no se muevan. Todo el historial se normaliza con unas mismas
+    estadísticas de referencia; en cada ventana se mide cuánto se alejan las
+    actuales (escala y desplazamiento, MAX_SCALE_DRIFT y MAX_OFFSET_DRIFT) y,
+    si se pasan, se descartan los frames y se recalcula la ventana entera con
+    las nuevas. Así el error de cualquier ventana queda acotado, también con
+    cambios de volumen del habla real. check_equivalence() además comprueba,
+    una vez por modelo, que con esa cota predice como la pasada completa.
+
+    Solo aplica a modelos con feat_extract_norm="layer" (XLS-R/large): el
+    GroupNorm de los modelos base normaliza sobre todo el eje temporal.
+    """
+    MAX_PROB_DIFF = 0.05 # Diferencia máxima de probabilidad por clase frente a la pasada completa
+    CHECK_HOPS = 4 # Ventanas que se comparan en check_equivalence (la primera siempre coincide)
+    MAX_SCALE_DRIFT = 0.05 # Cambio relativo de la desviación antes de recalcular todo
+    MAX_OFFSET_DRIFT = 0.05 # Cambio de la media (en desviaciones actuales) antes de recalcular todo
+
+    def __init__(self, model, window_len, device):
+        config = model.config
+        self.model = model
+        self.device = device
+        self.window_len = window_len
+        self.stride = int(np.prod(config.conv_stride))
+        self.receptive_field = 1
+        for kernel, stride in reversed(list(zip(config.conv_kernel, config.conv_stride))):
+            self.receptive_field = (self.receptive_field - 1) * stride + kernel
+        self.num_frames = (window_len - self.receptive_field) // self.stride + 1
+
+        # Historial de muestras ya normalizadas: cubre [hist_end - window_len, hist_end)
+        self.history = np.zeros(window_len, dtype=np.float32)
+        self.frames = None
+        self.frames_start = 0
+        self.hist_end = None
+        self.ref_mean = 0.0 # Estadísticas con que está normalizado el historial
+        self.ref_inv_std = 1.0
+
+        # Contadores para medir el ahorro
+        self.frames_computed = 0
+        self.frames_reused = 0
+        self.renormalized = 0 # Ventanas recalculadas enteras porque cambió el volumen
+
+    @staticmethod
+    def supports(model, window_len):
+        config = getattr(model, "config", None)
+        if config is None or getattr(config, "feat_extract_norm", "group") != "layer":
+            return False
+        return window_len % int(np.prod(config.conv_stride)) == 0
+
+    def reset(self):
+        self.frames = None
+        self.hist_end = None
+
+    def align(self, sample_index):
+        """Último fin de ventana alineado a la grilla de frames."""
+        return sample_index - sample_index % self.stride
+
+    def drifted(self, mean, inv_std):
+        """Las estadísticas de la ventana se alejaron de las del historial más de la cota."""
+        scale = inv_std / self.ref_inv_std
+        offset = abs(mean - self.ref_mean) * inv_std
+        return abs(scale - 1.0) > self.MAX_SCALE_DRIFT or offset > self.MAX_OFFSET_DRIFT
+
+    def samples_needed(self, window_end, mean, inv_std):
+        """Cuántas muestras crudas (terminando en window_end) hay que normalizar."""
+        window_start = window_end - self.window_len
+        if self.hist_end is None or self.hist_end <= window_start or self.hist_end > window_end:
+            return self.window_len
+        if self.drifted(mean, inv_std):
+            return self.window_len
+        return window_end - self.hist_end
+
+    def ingest(self, window_end, raw_segments, mean, inv_std):
+        """
+        Normaliza las muestras nuevas dentro del historial (barato, sin torch).
+        raw_segments debe contener exactamente samples_needed(window_end, mean, inv_std)
+        muestras. Con la ventana entera se toman mean/inv_std como nueva referencia;
+        si no, las muestras nuevas usan la referencia, como el resto del historial.
+        """
+        new_len = sum(len(s) for s in raw_segments)
+        if new_len == 0: return
+        if new_len >= self.window_len:
+            if self.frames is not None: self.renormalized += 1
+            self.frames = None
+            self.ref_mean, self.ref_inv_std = mean, inv_std
+            new_len = self.window_len
+        else:
+            self.history[:-new_len] = self.history[new_len:]
+
+        pos = self.window_len - new_len
+        for seg in raw_segments:
+            out = self.history[pos:pos + len(seg)]
+            np.subtract(seg, self.ref_mean, out=out)
+            np.multiply(out, self.ref_inv_std, out=out)
+            pos += len(seg)
+        self.hist_end = window_end
+
+    def window_frames(self):
+        """
+        Calcula solo los frames que faltan y devuelve los de la ventana
+        completa, forma (1, C, F).
+        """
+        window_start = self.hist_end - self.window_len
+        first = window_start // self.stride
+        last = first + self.num_frames - 1
+
+        if self.frames is not None:
+            drop = first - self.frames_start
+            self.frames = self.frames[:, :, drop:] if drop < self.frames.shape[2] else None
+        have = 0 if self.frames is None else self.frames.shape[2]
+        new_first = first + have
+
+        if new_first <= last:
+            seg_start = new_first * self.stride - window_start
+            seg_end = last * self.stride + self.receptive_field - window_start
+            segment = torch.from_numpy(self.history[seg_start:seg_end]).unsqueeze(0).to(self.device)
+            new_frames = self.model.wav2vec2.feature_extractor(segment)
+            self.frames = new_frames if self.frames is None else torch.cat((self.frames, new_frames), dim=2)
+            self.frames_computed += last - new_first + 1
+        self.frames_reused += have
+        self.frames_start = first
+        return self.frames
+
+    def check_equivalence(self, hop, rate=16000):
+        """
+        Compara la ruta con caché contra la pasada completa real (ventana cruda
+        normalizada entera, como el extractor) en una señal de prueba con
+        sílabas y volumen variable. Usa una caché aparte: no toca el estado de
+        esta. Corre varias pasadas del modelo: llamarla desde el hilo de
+        inferencia, no desde la UI. Devuelve {'windows', 'frame_rel_err',
+        'top1_agreement', 'max_prob_diff', 'renormalized', 'passed'}.
+        """
+        probe = ConvFeatureCache(self.model, self.window_len, self.device)
+        eps = 1e-7 # Mismo épsilon que el extractor
+        total = self.window_len + self.CHECK_HOPS * hop
+        t = np.arange(total) / rate
+        rng = np.random.default_rng(0)
+        tone = sum(np.sin(2 * np.pi * 140 * k * t) / k for k in range(1, 6))
+        syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) # ~4 sílabas por segundo
+        # Volumen que oscila poco (se reutilizan frames dentro de la cota) y luego sube de golpe (se recalcula)
+        loudness = 0.2 + 0.004 * np.sin(2 * np.pi * 0.3 * t)
+        loudness[self.window_len + 2 * hop:] *= 1.5
+        audio = (tone * syllables * loudness + rng.standard_normal(total) * 0.01).astype(np.float32)
+
+        frame_err, agree, max_diff, windows = 0.0, 0, 0.0, 0
+        with torch.no_grad():
+            for i in range(self.CHECK_HOPS + 1):
+                end = self.window_len + i * hop
+                raw = audio[end - self.window_len:end]
+                mean, inv_std = raw.mean(), 1.0 / np.sqrt(raw.var() + eps)
+                needed = probe.samples_needed(end, mean, inv_std)
+                probe.ingest(end, [audio[end - needed:end]], mean, inv_std)
+                cached = probe.window_frames()
+                if i == 0: continue
+                full_input = torch.from_numpy((raw - mean) * inv_std).unsqueeze(0).to(self.device)
+                full = self.model.wav2vec2.feature_extractor(full_input)
+                frame_err = max(frame_err, float((cached - full).norm() / full.norm()))
+                p_cached = torch.softmax(classify_features(self.model, cached).float(), dim=-1)
+                p_full = torch.softmax(self.model(full_input).logits.float(), dim=-1)
+                agree += int(p_cached.argmax() == p_full.argmax())
+                max_diff = max(max_diff, float((p_cached - p_full).abs().max()))
+                windows += 1
+        return {"windows": windows, "frame_rel_err": frame_err, "top1_agreement": agree / windows,
+                "max_prob_diff": max_diff, "renormalized": probe.renormalized, "passed": agree == windows and max_diff <= self.MAX_PROB_DIFF}